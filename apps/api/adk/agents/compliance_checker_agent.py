@@ -7,7 +7,11 @@ Fetches processed data, checks against policy rules, creates violations, and log
 from typing import Dict, List
 
 from adk.tools.tools_registry import get_adk_tools
-from services.rule_engine import evaluate_rules
+from adk.tools.unit_of_work import release
+from services.match_cache import match_cache_from_tools
+from services.rule_engine import document_sections, get_compiled_rule_set, run_rules
+from services.semantic_index import index_enabled, semantic_index_violations
+from services.triage import triage_rules
 
 
 class ComplianceCheckerADKAgent:
@@ -15,7 +19,9 @@ class ComplianceCheckerADKAgent:
         self.name = "Compliance Checker"
         self.tools = get_adk_tools()
 
-    def check_compliance(self, processed_id: int) -> Dict:
+    def check_compliance(
+        self, processed_id: int, mode: str = "full", run_id: int | None = None
+    ) -> Dict:
         """
         Run compliance check on processed data.
         Steps:
@@ -24,6 +30,9 @@ class ComplianceCheckerADKAgent:
         3. Apply rules to detect violations
         4. Create violation entries
         5. Log actions
+
+        In "triage" mode rules run in order of expected risk and stop once
+        the risk score is certain to be capped; the result is then partial.
         """
         # 1. Fetch processed data
         processed = self.tools["get_processed_data_by_id"](processed_id)
@@ -42,32 +51,87 @@ class ComplianceCheckerADKAgent:
         if not rules or "error" in rules:
             return {"error": "policy_rules not found"}
 
-        violations_created: List[Dict] = []
+        # Compiled once per rule-set version and shared across checks
+        rule_set = get_compiled_rule_set(
+            rules, org_id=org_id, workspace_id=workspace_id
+        )
 
         # 3. Apply rules across normalized sections
-        structured = processed.get("structured", {})
-        sections = structured.get("sections", [])
-
-        if not sections:
-            fallback_text = str(structured.get("full_content") or structured.get("raw_content") or "")
-            sections = [{"chunk_id": None, "label": "raw", "text": fallback_text}]
-
-        detected = evaluate_rules(rules, sections)
-
-        for match in detected:
-            violation = self.tools["create_violation"](
+        sections = document_sections(processed.get("structured", {}))
+
+        # Sections whose text was already checked under this rule set reuse
+        # the stored hits instead of being scanned again
+        match_cache = match_cache_from_tools(self.tools)
+        # Commit what the run wrote so far: evaluation can take a while, and
+        # a tool failing after it must not take earlier writes with it
+        release()
+        triage = None
+        if mode == "triage":
+            evaluation = triage = triage_rules(
+                rule_set,
+                sections,
+                hit_rates=self.tools["get_policy_rule_hit_rates"](
+                    org_id=org_id, workspace_id=workspace_id
+                ),
+            )
+        else:
+            evaluation = run_rules(rule_set, sections, match_cache=match_cache)
+        detected = evaluation.violations
+        partial = triage is not None and triage.saturated
+
+        # Guarded regex rules that blew their time budget were skipped;
+        # only overruns of their own count towards quarantine, not waits
+        # for a saturated machine
+        overruns = [
+            skipped["rule_id"]
+            for skipped in evaluation.skipped
+            if not skipped.get("under_load")
+        ]
+        if overruns:
+            self.tools["record_policy_rule_timeouts"](overruns)
+
+        # Per-rule wall time, sections scanned, matches and cache hits
+        if evaluation.rule_stats:
+            self.tools["record_policy_rule_stats"](
+                evaluation.rule_stats, org_id=org_id, workspace_id=workspace_id
+            )
+        if index_enabled() and not partial:
+            detected += semantic_index_violations(
+                rule_set,
+                self.tools["search_similar_sections"],
                 processed_id=processed_id,
-                rule=match.get("rule") or "unknown",
-                severity=match.get("severity") or "medium",
-                details={
-                    "rule_id": match.get("rule_id"),
-                    "evidence": match.get("evidence"),
-                    "location": match.get("location"),
-                    "confidence": match.get("confidence"),
-                    "recommended_fix": match.get("recommended_fix"),
-                },
+                org_id=org_id,
+                workspace_id=workspace_id,
             )
-            violations_created.append(violation)
+
+        # 4. Create violation entries with one bulk insert
+        created = self.tools["create_violations_bulk"](
+            processed_id=processed_id,
+            violations=[
+                {
+                    "rule": match.get("rule") or "unknown",
+                    "severity": match.get("severity") or "medium",
+                    "details": {
+                        "rule_id": match.get("rule_id"),
+                        "evidence": match.get("evidence"),
+                        "location": match.get("location"),
+                        "confidence": match.get("confidence"),
+                        "recommended_fix": match.get("recommended_fix"),
+                    },
+                }
+                for match in detected
+            ],
+            org_id=org_id,
+            workspace_id=workspace_id,
+            run_id=run_id,
+        )
+        # A failed insert must fail the step, not read as no violations
+        if "error" in created:
+            return {"error": created["error"], "processed_id": processed_id}
+        violations_created: List[Dict] = [
+            {"id": violation_id, "processed_id": processed_id}
+            for violation_id in created.get("ids", [])
+        ]
 
         # 5. Log Action
         self.tools["log_agent_action"](
@@ -76,10 +140,29 @@ class ComplianceCheckerADKAgent:
             details={
                 "processed_id": processed_id,
                 "violations_count": len(violations_created),
+                "rule_set_version": rule_set.version,
+                "match_cache_hits": match_cache.hits,
+                "match_cache_misses": match_cache.misses,
+                "skipped_rules": evaluation.skipped,
+                "mode": mode,
+                "triage": triage.summary() if triage is not None else None,
             },
         )
 
-        return {"processed_id": processed_id, "violations": violations_created}
-
-    def run(self, processed_id: int) -> Dict:
-        return self.check_compliance(processed_id=processed_id)
+        return {
+            "processed_id": processed_id,
+            "violations": violations_created,
+            "rule_set_version": rule_set.version,
+            "skipped_rules": evaluation.skipped,
+            "rule_stats": evaluation.rule_stats,
+            "mode": mode,
+            "partial": partial,
+            "triage": triage.summary() if triage is not None else None,
+        }
+
+    def run(
+        self, processed_id: int, mode: str = "full", run_id: int | None = None
+    ) -> Dict:
+        return self.check_compliance(
+            processed_id=processed_id, mode=mode, run_id=run_id
+        )
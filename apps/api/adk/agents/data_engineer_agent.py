@@ -7,9 +7,16 @@ Fetches raw data, processed it into structured format, stores processed data, an
 import json
 from datetime import datetime, timezone
 from hashlib import sha256
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List
 
 from adk.tools.tools_registry import get_adk_tools
+from services.chunking import chunk_fingerprint, chunk_rows, section_rows
+from services.ingest import CSV_COLUMNAR, Row, iter_blob_rows, iter_csv_cells
+from services.semantic_index import embed_sections, index_enabled
+
+
+# Inline payload fields of legacy raw_data rows, left out of raw_payload
+_PAYLOAD_KEYS = ("raw_text", "parsed_json", "csv_rows")
 
 
 class DataEngineerADKAgent:
@@ -17,19 +24,28 @@ class DataEngineerADKAgent:
         self.name = "Data Engineer"
         self.tools = get_adk_tools()
 
-    def _build_sections(self, rows: Iterable[Tuple[str, str]], raw_id: int) -> List[Dict]:
+    def _build_sections(self, rows: Iterable[Row], raw_id: int) -> List[Dict]:
         sections = []
-        for index, (label, text) in enumerate(rows):
+        # Small adjacent rows share a section; spans map it back to the rows
+        for index, (label, text, fields, spans) in enumerate(chunk_rows(rows)):
             chunk_base = f"{raw_id}:{index}:{label}:{text}"
             chunk_id = sha256(chunk_base.encode()).hexdigest()[:16]
-            sections.append(
-                {
-                    "chunk_id": chunk_id,
-                    "index": index,
-                    "label": label,
-                    "text": text,
-                }
-            )
+            section = {
+                "chunk_id": chunk_id,
+                "index": index,
+                "label": label,
+                "text": text,
+                # Content-only digest: identical text in another upload
+                # shares rule-match cache entries
+                "fingerprint": chunk_fingerprint(text, spans),
+            }
+            # CSV rows carry their column names so column-scoped rules can
+            # be routed to them.
+            if fields is not None:
+                section["fields"] = fields
+            if spans is not None:
+                section["spans"] = spans
+            sections.append(section)
         return sections
 
     def _normalize_from_raw(self, content: Dict, raw_id: int) -> Dict:
@@ -42,29 +58,47 @@ class DataEngineerADKAgent:
             "file_name": content.get("file_name"),
         }
 
-        rows: List[Tuple[str, str]] = []
-
-        if file_type == "json" and "parsed_json" in content:
-            parsed_json = content.get("parsed_json")
-            if isinstance(parsed_json, dict):
-                for key, value in parsed_json.items():
-                    rows.append((f"json.{key}", f"{value}"))
-            elif isinstance(parsed_json, list):
-                for index, entry in enumerate(parsed_json):
-                    rows.append((f"json[{index}]", f"{entry}"))
-        elif file_type == "csv" and "csv_rows" in content:
-            csv_rows = content.get("csv_rows", [])
-            if isinstance(csv_rows, list):
-                for index, row in enumerate(csv_rows):
-                    rows.append((f"csv.row.{index}", json.dumps(row)))
-
-        if not rows:
-            for index, line in enumerate(str(raw_text).splitlines()):
-                if not line.strip():
-                    continue
-                rows.append((f"text.line.{index}", line.strip()))
-
-        sections = self._build_sections(rows, raw_id)
+        rows: List[Row] = []
+
+        if content.get("blob_digest"):
+            # Uploads live in the blob store and are parsed as they are read
+            sections = self._build_sections(iter_blob_rows(content), raw_id)
+        else:
+            if file_type in ("json", "ndjson") and "parsed_json" in content:
+                parsed_json = content.get("parsed_json")
+                if isinstance(parsed_json, dict):
+                    for key, value in parsed_json.items():
+                        rows.append((f"json.{key}", f"{value}", None))
+                elif isinstance(parsed_json, list):
+                    for index, entry in enumerate(parsed_json):
+                        rows.append((f"json[{index}]", f"{entry}", None))
+            elif file_type == "csv" and "csv_rows" in content:
+                csv_rows = content.get("csv_rows", [])
+                if (
+                    CSV_COLUMNAR
+                    and isinstance(csv_rows, list)
+                    and all(isinstance(row, dict) for row in csv_rows)
+                ):
+                    rows.extend(iter_csv_cells(csv_rows))
+                elif isinstance(csv_rows, list):
+                    for index, row in enumerate(csv_rows):
+                        rows.append(
+                            (
+                                f"csv.row.{index}",
+                                json.dumps(row),
+                                [str(key) for key in row.keys()]
+                                if isinstance(row, dict)
+                                else None,
+                            )
+                        )
+
+            if not rows:
+                for index, line in enumerate(str(raw_text).splitlines()):
+                    if not line.strip():
+                        continue
+                    rows.append((f"text.line.{index}", line.strip(), None))
+
+            sections = self._build_sections(rows, raw_id)
 
         return {
             "metadata": metadata,
@@ -73,12 +107,17 @@ class DataEngineerADKAgent:
             "normalized_fields": {
                 "raw_id": raw_id,
                 "section_count": len(sections),
-                "char_count": len(str(raw_text)),
+                "char_count": content.get("size_bytes")
+                if content.get("blob_digest")
+                else len(str(raw_text)),
+            },
+            # The payload itself stays in raw_data or the blob store
+            "raw_payload": {
+                key: value for key, value in content.items() if key not in _PAYLOAD_KEYS
             },
-            "raw_payload": content,
         }
 
-    def process_raw_data(self, raw_id: int) -> Dict:
+    def process_raw_data(self, raw_id: int, run_id: int | None = None) -> Dict:
         """
         Full processing pipeline:
         1. Fetch raw data
@@ -106,12 +145,28 @@ class DataEngineerADKAgent:
         if db is None:
             return {"error": "'create_processed_data' tool not available", "raw_id": raw_id}
 
-        processed_result = db(raw_id=raw_id, structured=structured_data)
+        processed_result = db(
+            raw_id=raw_id,
+            structured=structured_data,
+            blob_digest=content.get("blob_digest"),
+            run_id=run_id,
+        )
         if not processed_result or "id" not in processed_result:
             return {"error": "failed to store processed data", "raw_id": raw_id}
 
         processed_id = processed_result["id"]
 
+        # Index row embeddings for nearest-neighbour semantic rules, so a
+        # match still points at its line, row or key
+        sections = structured_data["sections"]
+        if index_enabled() and sections:
+            rows = list(section_rows(sections))
+            self.tools["create_section_embeddings"](
+                processed_id=processed_id,
+                sections=rows,
+                **embed_sections(rows),
+            )
+
         # 4. Log Agent Action
         self.tools["log_agent_action"](
             agent_name=self.name,
@@ -121,5 +176,5 @@ class DataEngineerADKAgent:
 
         return {"processed_id": processed_id, "structured": structured_data}
 
-    def run(self, raw_id: int) -> Dict:
-        return self.process_raw_data(raw_id=raw_id)
+    def run(self, raw_id: int, run_id: int | None = None) -> Dict:
+        return self.process_raw_data(raw_id=raw_id, run_id=run_id)
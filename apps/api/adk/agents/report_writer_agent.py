@@ -125,9 +125,18 @@ class ReportWriterADKAgent:
 
         # 3. Build summary
         violation_count = len(violations)
+        existing_content = report.get("content") if isinstance(report, dict) else None
+        partial = isinstance(existing_content, dict) and bool(
+            existing_content.get("partial")
+        )
         summary = (
             f"Compliance review completed. " f"{violation_count} violation(s) detected."
         )
+        if partial:
+            summary = (
+                "Triage review stopped once the risk score reached its cap. "
+                f"{violation_count} violation(s) detected before stopping."
+            )
 
         violations_table = self._build_violation_rows(violations)
         top_risks = self._build_top_risks(violations)
@@ -135,7 +144,6 @@ class ReportWriterADKAgent:
         audit_excerpt = self._build_audit_excerpt(violations)
 
         # 4. Build structured content
-        existing_content = report.get("content") if isinstance(report, dict) else None
         content = {
             "report_id": report_id,
             "processed_id": processed_id,
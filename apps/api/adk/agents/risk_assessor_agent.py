@@ -16,7 +16,9 @@ class RiskAssessorADKAgent:
         self.name = "Risk Assessor"
         self.tools = get_adk_tools()
 
-    def assess_risk(self, processed_id: int) -> Dict:
+    def assess_risk(
+        self, processed_id: int, partial: bool = False, run_id: int | None = None
+    ) -> Dict:
         # 1. Fetch violations
         violations = self.tools["get_violations_by_processed_id"](processed_id)
 
@@ -32,6 +34,9 @@ class RiskAssessorADKAgent:
             f"Risk Tier: {tier}. Risk Score: {score}. "
             f"Total Violations: {len(violations)}."
         )
+        if partial:
+            # Triage stopped once the score was certain to be capped
+            summary = f"Partial (triage) review. {summary}"
 
         content = {
             "processed_id": processed_id,
@@ -40,11 +45,16 @@ class RiskAssessorADKAgent:
             "risk_score": score,
             "risk_tier": tier,
             "risk_breakdown": risk["breakdown"],
+            "partial": partial,
         }
 
         # 4. Create report
         report = self.tools["create_report"](
-            processed_id=processed_id, score=score, summary=summary, content=content
+            processed_id=processed_id,
+            score=score,
+            summary=summary,
+            content=content,
+            run_id=run_id,
         )
 
         # 5. Log Action
@@ -60,5 +70,9 @@ class RiskAssessorADKAgent:
 
         return {"processed_id": processed_id, "report_id": report["id"], "score": score}
 
-    def run(self, processed_id: int) -> Dict:
-        return self.assess_risk(processed_id=processed_id)
+    def run(
+        self, processed_id: int, partial: bool = False, run_id: int | None = None
+    ) -> Dict:
+        return self.assess_risk(
+            processed_id=processed_id, partial=partial, run_id=run_id
+        )
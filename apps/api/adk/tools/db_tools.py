@@ -1,21 +1,50 @@
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
-
-from db import SessionLocal
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from adk.tools.unit_of_work import (
+    checkpoint,
+    close_session,
+    defer,
+    keep,
+    open_session,
+    save,
+)
+from db import json_dumps
 from models import (
     ADKRun,
     ADKRunStep,
     AgentLog,
     PolicyRule,
     PolicyRuleAudit,
+    PolicyRuleStats,
     PolicyRuleVersion,
     ProcessedData,
     RawData,
     Report,
+    SectionEmbedding,
+    SectionMatchCacheEntry,
     Violation,
 )
-from sqlalchemy import Integer, cast, text
+from sqlalchemy import (
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from services.blob_store import BlobNotFound, read_blob_text
+from services.regex_safety import validate_rule_pattern
+from services.match_cache import MATCH_CACHE_TTL_DAYS, ttl_sweep_due
+from services.rule_engine import invalidate_compiled_rule_set, rule_set_fingerprint
 from services.run_updates import run_update_manager
 
 
@@ -45,10 +74,28 @@ def _apply_org_workspace_filters(
     return query
 
 
+def _get_scoped(
+    db: Session, model, row_id: int, org_id: int | None, workspace_id: int | None
+):
+    """
+    A row by primary key, read from the session's identity map when it was
+    loaded before (within a unit of work), else with one SELECT.
+    """
+    row = db.get(model, row_id)
+    if row is None:
+        return None
+    keep(db, row)
+    if org_id is not None and row.org_id != org_id:
+        return None
+    if workspace_id is not None and row.workspace_id != workspace_id:
+        return None
+    return row
+
+
 def _get_org_workspace_for_raw(
     db: Session, raw_id: int
 ) -> Optional[tuple[int, int]]:
-    raw = db.query(RawData).filter(RawData.id == raw_id).first()
+    raw = _get_scoped(db, RawData, raw_id, None, None)
     if not raw:
         return None
     return raw.org_id, raw.workspace_id
@@ -82,6 +129,8 @@ def _serialize_run(run: ADKRun) -> Dict:
         "processed_id": run.processed_id,
         "report_id": run.report_id,
         "status": run.status,
+        "batch_id": run.batch_id,
+        "rule_set_version": run.rule_set_version,
         "error": run.error,
         "error_code": run.error_code,
         "created_at": run.created_at.isoformat(),
@@ -107,9 +156,7 @@ def _serialize_run(run: ADKRun) -> Dict:
 def _get_org_workspace_for_processed(
     db: Session, processed_id: int
 ) -> Optional[tuple[int, int]]:
-    processed = (
-        db.query(ProcessedData).filter(ProcessedData.id == processed_id).first()
-    )
+    processed = _get_scoped(db, ProcessedData, processed_id, None, None)
     if not processed:
         return None
     return processed.org_id, processed.workspace_id
@@ -121,12 +168,10 @@ def _get_org_workspace_for_processed(
 def get_raw_data_by_id(
     raw_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
-        query = db.query(RawData).filter(RawData.id == raw_id)
-        query = _apply_org_workspace_filters(query, RawData, org_id, workspace_id)
-        r = query.first()
+        r = _get_scoped(db, RawData, raw_id, org_id, workspace_id)
 
         if r is None:
             return {"error": "not_found"}
@@ -136,23 +181,53 @@ def get_raw_data_by_id(
             "org_id": r.org_id,
             "workspace_id": r.workspace_id,
             "content": r.content,
+            "blob_digest": r.blob_digest,
             "created_at": (
                 r.created_at.isoformat() if r.created_at is not None else None
             ),
         }
     finally:
-        db.close()
+        close_session(db)
+
+
+def get_raw_text(
+    raw_id: int,
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    max_chars: int | None = None,
+) -> Dict:
+    """The text of a raw upload, read from the blob store or inline content."""
+    raw = get_raw_data_by_id(raw_id, org_id=org_id, workspace_id=workspace_id)
+    if "error" in raw:
+        return raw
+
+    content = raw.get("content")
+    if raw.get("blob_digest"):
+        try:
+            return {
+                "raw_id": raw_id,
+                "text": read_blob_text(raw["blob_digest"], max_chars=max_chars),
+            }
+        except BlobNotFound:
+            # Uploads to a non-persistent blob store keep their text inline
+            if not (isinstance(content, dict) and "raw_text" in content):
+                return {"error": "blob_not_found", "blob_digest": raw["blob_digest"]}
+
+    text_value = (
+        str(content.get("raw_text", "")) if isinstance(content, dict) else str(content)
+    )
+    if max_chars is not None:
+        text_value = text_value[:max_chars]
+    return {"raw_id": raw_id, "text": text_value}
 
 
 def get_processed_data_by_id(
     processed_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
-        query = db.query(ProcessedData).filter(ProcessedData.id == processed_id)
-        query = _apply_org_workspace_filters(query, ProcessedData, org_id, workspace_id)
-        p = query.first()
+        p = _get_scoped(db, ProcessedData, processed_id, org_id, workspace_id)
 
         if p is None:
             return {"error": "not_found"}
@@ -162,18 +237,47 @@ def get_processed_data_by_id(
             "org_id": p.org_id,
             "workspace_id": p.workspace_id,
             "structured": p.structured,
+            "blob_digest": p.blob_digest,
             "created_at": (
                 p.created_at.isoformat() if p.created_at is not None else None
             ),
         }
     finally:
-        db.close()
+        close_session(db)
+
+
+def list_processed_data_batch(
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    after_id: int = 0,
+    limit: int = 200,
+) -> List[Dict]:
+    """Processed documents in id order, one keyset page at a time."""
+    db: Session = open_session()
+
+    try:
+        query = db.query(ProcessedData).filter(ProcessedData.id > after_id)
+        query = _apply_org_workspace_filters(query, ProcessedData, org_id, workspace_id)
+        rows = query.order_by(ProcessedData.id).limit(limit).all()
+
+        return [
+            {
+                "id": p.id,
+                "org_id": p.org_id,
+                "workspace_id": p.workspace_id,
+                "run_id": p.run_id,
+                "structured": p.structured,
+            }
+            for p in rows
+        ]
+    finally:
+        close_session(db)
 
 
 def get_policy_rules(
     org_id: int | None = None, workspace_id: int | None = None
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(PolicyRule)
@@ -196,6 +300,8 @@ def get_policy_rules(
                 "remediation": r.remediation,
                 "version": r.version,
                 "is_active": bool(r.is_active),
+                "timeout_count": r.timeout_count or 0,
+                "quarantined": bool(r.quarantined),
                 "created_at": (
                     r.created_at.isoformat() if r.created_at is not None else None
                 ),
@@ -206,13 +312,13 @@ def get_policy_rules(
             for r in rules
         ]
     finally:
-        db.close()
+        close_session(db)
 
 
 def get_policy_rule_by_id(
     rule_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(PolicyRule).filter(PolicyRule.id == rule_id)
         query = _apply_org_workspace_filters(query, PolicyRule, org_id, workspace_id)
@@ -222,6 +328,8 @@ def get_policy_rule_by_id(
 
         return {
             "id": rule.id,
+            "org_id": rule.org_id,
+            "workspace_id": rule.workspace_id,
             "name": rule.name,
             "description": rule.description,
             "severity": rule.severity,
@@ -232,6 +340,8 @@ def get_policy_rule_by_id(
             "remediation": rule.remediation,
             "version": rule.version,
             "is_active": bool(rule.is_active),
+            "timeout_count": rule.timeout_count or 0,
+            "quarantined": bool(rule.quarantined),
             "created_at": (
                 rule.created_at.isoformat() if rule.created_at is not None else None
             ),
@@ -240,13 +350,13 @@ def get_policy_rule_by_id(
             ),
         }
     finally:
-        db.close()
+        close_session(db)
 
 
 def list_policy_rule_versions(
     rule_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(PolicyRuleVersion).filter(
             PolicyRuleVersion.rule_id == rule_id
@@ -273,19 +383,112 @@ def list_policy_rule_versions(
             for v in versions
         ]
     finally:
-        db.close()
+        close_session(db)
+
+
+def _serialize_rule_stats(rule: PolicyRule, stats: PolicyRuleStats | None) -> Dict:
+    runs = stats.runs if stats is not None else 0
+    total_wall_ms = stats.total_wall_ms if stats is not None else 0.0
+    return {
+        "rule_id": rule.id,
+        "rule": rule.name,
+        "pattern_type": rule.pattern_type,
+        "runs": runs,
+        "total_wall_ms": round(total_wall_ms, 3),
+        "avg_wall_ms": round(total_wall_ms / runs, 3) if runs else 0.0,
+        "max_wall_ms": round(stats.max_wall_ms, 3) if stats is not None else 0.0,
+        "last_wall_ms": round(stats.last_wall_ms, 3) if stats is not None else 0.0,
+        "sections_scanned": stats.sections_scanned if stats is not None else 0,
+        "matches": stats.matches if stats is not None else 0,
+        "cache_hits": stats.cache_hits if stats is not None else 0,
+        "last_run_at": (
+            stats.last_run_at.isoformat()
+            if stats is not None and stats.last_run_at is not None
+            else None
+        ),
+    }
+
+
+def get_policy_rule_stats(
+    rule_id: int, org_id: int | None = None, workspace_id: int | None = None
+) -> Dict:
+    db: Session = open_session()
+    try:
+        query = db.query(PolicyRule).filter(PolicyRule.id == rule_id)
+        query = _apply_org_workspace_filters(query, PolicyRule, org_id, workspace_id)
+        rule = query.first()
+        if rule is None:
+            return {"error": "not_found"}
+
+        stats = (
+            db.query(PolicyRuleStats).filter(PolicyRuleStats.rule_id == rule_id).first()
+        )
+        return _serialize_rule_stats(rule, stats)
+    finally:
+        close_session(db)
+
+
+def list_expensive_policy_rules(
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    limit: int = 10,
+    metric: str = "avg_wall_ms",
+) -> List[Dict]:
+    """Rules ordered by recorded evaluation cost, most expensive first."""
+    db: Session = open_session()
+    try:
+        if metric == "total_wall_ms":
+            order = PolicyRuleStats.total_wall_ms
+        elif metric == "max_wall_ms":
+            order = PolicyRuleStats.max_wall_ms
+        else:
+            order = PolicyRuleStats.total_wall_ms / func.greatest(PolicyRuleStats.runs, 1)
+
+        query = db.query(PolicyRule, PolicyRuleStats).join(
+            PolicyRuleStats, PolicyRuleStats.rule_id == PolicyRule.id
+        )
+        query = _apply_org_workspace_filters(query, PolicyRule, org_id, workspace_id)
+        rows = query.order_by(order.desc(), PolicyRule.id).limit(limit).all()
+        return [_serialize_rule_stats(rule, stats) for rule, stats in rows]
+    finally:
+        close_session(db)
+
+
+def get_policy_rule_hit_rates(
+    org_id: int | None = None, workspace_id: int | None = None
+) -> Dict[int, float]:
+    """Matches per section evaluated, from the recorded rule stats."""
+    db: Session = open_session()
+    try:
+        query = db.query(PolicyRuleStats)
+        query = _apply_org_workspace_filters(query, PolicyRuleStats, org_id, workspace_id)
+        return {
+            stats.rule_id: stats.matches / (stats.sections_scanned + stats.cache_hits)
+            for stats in query.all()
+            if stats.sections_scanned + stats.cache_hits
+        }
+    finally:
+        close_session(db)
 
 
 def get_violations_by_processed_id(
-    processed_id: int, org_id: int | None = None, workspace_id: int | None = None
+    processed_id: int,
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    rule_id: int | None = None,
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(Violation).filter(
-            cast(text("violations.details ->> 'processed_id'"), Integer)
-            == processed_id
+            Violation.processed_id == processed_id, Violation.retired_at.is_(None)
         )
+        if rule_id is not None:
+            # Matches the (processed_id, details -> 'rule_id') index
+            query = query.filter(
+                literal_column("violations.details -> 'rule_id'", JSONB)
+                == cast(rule_id, JSONB)
+            )
         query = _apply_org_workspace_filters(query, Violation, org_id, workspace_id)
         violations = query.all()
 
@@ -302,13 +505,93 @@ def get_violations_by_processed_id(
             for v in violations
         ]
     finally:
-        db.close()
+        close_session(db)
+
+
+# One HNSW scan yields at most hnsw.ef_search rows, before the org,
+# workspace and score filters drop any; raised to at least the limit
+# (pgvector caps it at 1000)
+PGVECTOR_EF_SEARCH = int(os.getenv("PGVECTOR_EF_SEARCH", "200"))
+# "relaxed_order" or "strict_order" on pgvector 0.8+, which keeps scanning
+# the index until enough rows pass the filters; empty leaves it off
+PGVECTOR_ITERATIVE_SCAN = os.getenv("PGVECTOR_ITERATIVE_SCAN", "")
+
+
+def _widen_hnsw_scan(db: Session, limit: int) -> None:
+    """Size the HNSW scans of the current transaction for `limit` rows."""
+    settings = {"hnsw.ef_search": str(min(1000, max(limit, PGVECTOR_EF_SEARCH)))}
+    if PGVECTOR_ITERATIVE_SCAN:
+        settings["hnsw.iterative_scan"] = PGVECTOR_ITERATIVE_SCAN
+    for name, value in settings.items():
+        db.execute(
+            text("SELECT set_config(:name, :value, true)"),
+            {"name": name, "value": value},
+        )
+
+
+def search_similar_sections(
+    embedding: List[float],
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    processed_id: int | None = None,
+    min_score: float = 0.75,
+    limit: int = 100,
+) -> List[Dict]:
+    """
+    Nearest sections by cosine similarity. Across a workspace the HNSW
+    index serves the query; within one document every section is scored
+    exactly, since filtering the index's candidates down to one document
+    can leave too few.
+    """
+    db: Session = open_session()
+
+    try:
+        distance = SectionEmbedding.embedding.cosine_distance(embedding)
+        query = db.query(
+            SectionEmbedding.processed_id,
+            SectionEmbedding.chunk_id,
+            SectionEmbedding.label,
+            SectionEmbedding.section_index,
+            SectionEmbedding.preview,
+            distance.label("distance"),
+        )
+        query = _apply_org_workspace_filters(
+            query, SectionEmbedding, org_id, workspace_id
+        )
+        if processed_id is not None:
+            # Materialized, the document's rows come from the processed_id
+            # index and cannot be ordered by the HNSW index
+            scored = (
+                query.filter(SectionEmbedding.processed_id == processed_id)
+                .cte("document_sections")
+                .prefix_with("MATERIALIZED")
+            )
+            query = db.query(scored).filter(scored.c.distance <= 1 - min_score)
+            query = query.order_by(scored.c.distance)
+        else:
+            _widen_hnsw_scan(db, limit)
+            query = query.filter(distance <= 1 - min_score).order_by(distance)
+        rows = query.limit(limit).all()
+
+        return [
+            {
+                "processed_id": row.processed_id,
+                "chunk_id": row.chunk_id,
+                "label": row.label,
+                "section_index": row.section_index,
+                "preview": row.preview,
+                "score": 1 - float(row.distance),
+            }
+            for row in rows
+        ]
+    finally:
+        close_session(db)
 
 
 def get_report_by_id(
     report_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(Report).filter(Report.id == report_id)
         query = _apply_org_workspace_filters(query, Report, org_id, workspace_id)
@@ -327,13 +610,38 @@ def get_report_by_id(
         }
 
     finally:
-        db.close()
+        close_session(db)
+
+
+def get_latest_report_by_processed_id(
+    processed_id: int, org_id: int | None = None, workspace_id: int | None = None
+) -> Dict:
+    db: Session = open_session()
+    try:
+        query = db.query(Report).filter(Report.processed_id == processed_id)
+        query = _apply_org_workspace_filters(query, Report, org_id, workspace_id)
+        r = query.order_by(Report.id.desc()).first()
+        if not r:
+            return {"error": "not_found"}
+
+        return {
+            "id": r.id,
+            "summary": r.summary,
+            "score": r.score,
+            "content": r.content,
+            "created_at": (
+                r.created_at.isoformat() if r.created_at is not None else None
+            ),
+        }
+
+    finally:
+        close_session(db)
 
 
 def get_active_adk_run_by_raw_id(
     raw_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(ADKRun).filter(
             ADKRun.raw_id == raw_id,
@@ -347,13 +655,88 @@ def get_active_adk_run_by_raw_id(
 
         return {"active": True, "run_id": run.id, "status": run.status}
     finally:
-        db.close()
+        close_session(db)
+
+
+def find_referenced_blob_digests(blob_digests: List[str]) -> List[str]:
+    """The digests, of those given, that a raw_data or processed_data row uses."""
+    if not blob_digests:
+        return []
+    db: Session = open_session()
+
+    try:
+        digests = set(blob_digests)
+        referenced = {
+            digest
+            for model in (RawData, ProcessedData)
+            for (digest,) in db.query(model.blob_digest)
+            .filter(model.blob_digest.in_(digests))
+            .distinct()
+        }
+        return sorted(referenced)
+    finally:
+        close_session(db)
+
+
+# A queued or running run is only reused while it is making progress:
+# updated_at moves with every status change and workflow step, so a run
+# whose worker died stops being handed out once this window passes
+UPLOAD_REUSE_INFLIGHT_SECONDS = int(os.getenv("UPLOAD_REUSE_INFLIGHT_SECONDS", "1800"))
+_IN_FLIGHT_STATUSES = ("queued", "processing", "started")
+
+
+def find_reusable_upload_runs(
+    uploads: List[Tuple[str, Optional[str]]],
+    rule_set_version: str,
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+) -> Dict[Tuple[str, Optional[str]], Dict]:
+    """
+    The latest run per (blob digest, file type) that was queued under this
+    rule-set version and has completed, or is still in flight and was
+    updated within UPLOAD_REUSE_INFLIGHT_SECONDS. The file type is part of
+    the key because the same bytes parse differently as .csv and .json.
+    """
+    if not uploads:
+        return {}
+    keys = set(uploads)
+    inflight_since = datetime.now(timezone.utc) - timedelta(
+        seconds=UPLOAD_REUSE_INFLIGHT_SECONDS
+    )
+    db: Session = open_session()
+
+    try:
+        query = (
+            db.query(ADKRun, RawData.blob_digest, RawData.file_type)
+            .join(RawData, RawData.id == ADKRun.raw_id)
+            .filter(
+                RawData.blob_digest.in_({digest for digest, _ in keys}),
+                ADKRun.rule_set_version == rule_set_version,
+                or_(
+                    ADKRun.status == "completed",
+                    and_(
+                        ADKRun.status.in_(_IN_FLIGHT_STATUSES),
+                        func.coalesce(ADKRun.updated_at, ADKRun.created_at)
+                        >= inflight_since,
+                    ),
+                ),
+            )
+        )
+        query = _apply_org_workspace_filters(query, ADKRun, org_id, workspace_id)
+        runs: Dict[Tuple[str, Optional[str]], Dict] = {}
+        for run, blob_digest, file_type in query.order_by(ADKRun.id.desc()).all():
+            key = (blob_digest, file_type)
+            if key in keys:
+                runs.setdefault(key, _serialize_run(run))
+        return runs
+    finally:
+        close_session(db)
 
 
 def get_latest_failed_adk_run_by_raw_id(
     raw_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRun).filter(
@@ -367,13 +750,13 @@ def get_latest_failed_adk_run_by_raw_id(
 
         return _serialize_run(run)
     finally:
-        db.close()
+        close_session(db)
 
 
 def get_latest_adk_run_by_raw_id(
     raw_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRun).filter(ADKRun.raw_id == raw_id)
@@ -404,13 +787,13 @@ def get_latest_adk_run_by_raw_id(
         }
 
     finally:
-        db.close()
+        close_session(db)
 
 
 def get_adk_run_by_id(
     run_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRun).filter(ADKRun.id == run_id)
@@ -432,13 +815,13 @@ def get_adk_run_by_id(
         return payload
 
     finally:
-        db.close()
+        close_session(db)
 
 
 def list_adk_runs(
     limit: int = 20, org_id: int | None = None, workspace_id: int | None = None
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRun)
@@ -447,13 +830,13 @@ def list_adk_runs(
 
         return [_serialize_run(r) for r in runs]
     finally:
-        db.close()
+        close_session(db)
 
 
 def list_adk_runs_by_raw_id(
     raw_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRun).filter(ADKRun.raw_id == raw_id)
@@ -463,13 +846,58 @@ def list_adk_runs_by_raw_id(
         return [_serialize_run(r) for r in runs]
 
     finally:
-        db.close()
+        close_session(db)
+
+
+def get_upload_batch(
+    batch_id: str, org_id: int | None = None, workspace_id: int | None = None
+) -> Dict:
+    """Progress of a batch upload: run counts by status and each file's run."""
+    db: Session = open_session()
+
+    try:
+        query = (
+            db.query(ADKRun, RawData.file_name)
+            .join(RawData, RawData.id == ADKRun.raw_id)
+            .filter(ADKRun.batch_id == batch_id)
+        )
+        query = _apply_org_workspace_filters(query, ADKRun, org_id, workspace_id)
+        rows = query.order_by(ADKRun.id.asc()).all()
+
+        if not rows:
+            return {"error": "not_found"}
+
+        counts: Dict[str, int] = {}
+        files = []
+        for run, file_name in rows:
+            counts[run.status] = counts.get(run.status, 0) + 1
+            files.append(
+                {
+                    "file_name": file_name,
+                    "raw_data_id": run.raw_id,
+                    "run_id": run.id,
+                    "status": run.status,
+                    "processed_id": run.processed_id,
+                    "report_id": run.report_id,
+                    "error_code": run.error_code,
+                }
+            )
+
+        return {
+            "batch_id": batch_id,
+            "total": len(files),
+            "status_counts": counts,
+            "done": all(f["status"] in ("completed", "failed") for f in files),
+            "files": files,
+        }
+    finally:
+        close_session(db)
 
 
 def get_adk_run_steps(
     run_id: int, org_id: int | None = None, workspace_id: int | None = None
 ) -> List[Dict]:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         query = db.query(ADKRunStep).filter(ADKRunStep.adk_run_id == run_id)
@@ -480,7 +908,7 @@ def get_adk_run_steps(
 
         return [_serialize_run_step(s) for s in steps]
     finally:
-        db.close()
+        close_session(db)
 
 
 # ============Write Ops==============
@@ -491,8 +919,10 @@ def create_processed_data(
     structured: Any,
     org_id: int | None = None,
     workspace_id: int | None = None,
+    blob_digest: str | None = None,
+    run_id: int | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         if org_id is None or workspace_id is None:
@@ -513,16 +943,237 @@ def create_processed_data(
         p = ProcessedData(
             org_id=org_id,
             workspace_id=workspace_id,
+            raw_id=raw_id,
+            run_id=run_id,
             structured=structured,
+            blob_digest=blob_digest,
         )
 
         db.add(p)
-        db.commit()
-        db.refresh(p)
+        save(db, p)
+        keep(db, p)
         return {"id": p.id, "raw_id": raw_id}
 
     finally:
-        db.close()
+        close_session(db)
+
+
+def create_section_embeddings(
+    processed_id: int,
+    sections: List[Dict],
+    embeddings: List[List[float]],
+    embedder: str = "hashing",
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+) -> Dict:
+    db: Session = open_session()
+
+    try:
+        if org_id is None or workspace_id is None:
+            org_workspace = _get_org_workspace_for_processed(db, processed_id)
+            if org_workspace is None:
+                return {"error": "processed_data not found"}
+            org_id, workspace_id = org_workspace
+
+        rows = [
+            SectionEmbedding(
+                org_id=org_id,
+                workspace_id=workspace_id,
+                processed_id=processed_id,
+                chunk_id=section.get("chunk_id"),
+                label=section.get("label"),
+                section_index=section.get("index"),
+                preview=str(section.get("text", ""))[:200],
+                embedder=embedder,
+                embedding=embedding,
+                created_at=datetime.now(timezone.utc),
+            )
+            for section, embedding in zip(sections, embeddings)
+        ]
+        db.add_all(rows)
+        save(db)
+        return {"processed_id": processed_id, "count": len(rows)}
+    finally:
+        close_session(db)
+
+
+# Keeps the IN list and the VALUES list well inside driver limits.
+_MATCH_CACHE_BATCH = 500
+
+
+def get_section_match_cache(keys: List[List[str]]) -> Dict:
+    """Look up cached rule hits by (fingerprint, rule_set_version, route_key)."""
+    db: Session = open_session()
+
+    try:
+        entries = []
+        key_list = [tuple(key) for key in keys]
+        for start in range(0, len(key_list), _MATCH_CACHE_BATCH):
+            batch = key_list[start : start + _MATCH_CACHE_BATCH]
+            rows = (
+                db.query(SectionMatchCacheEntry)
+                .filter(
+                    tuple_(
+                        SectionMatchCacheEntry.fingerprint,
+                        SectionMatchCacheEntry.rule_set_version,
+                        SectionMatchCacheEntry.route_key,
+                    ).in_(batch)
+                )
+                .all()
+            )
+            entries.extend(
+                {
+                    "fingerprint": row.fingerprint,
+                    "rule_set_version": row.rule_set_version,
+                    "route_key": row.route_key,
+                    "hits": row.hits,
+                }
+                for row in rows
+            )
+        return {"entries": entries}
+    finally:
+        close_session(db)
+
+
+def store_section_match_cache(entries: List[Dict]) -> Dict:
+    """Insert cache entries; keys another run already stored are left as they are."""
+    db: Session = open_session()
+
+    try:
+        now = datetime.now(timezone.utc)
+        values = [
+            {
+                "fingerprint": entry["fingerprint"],
+                "rule_set_version": entry["rule_set_version"],
+                "route_key": entry["route_key"],
+                "hits": entry["hits"],
+                "created_at": now,
+            }
+            for entry in entries
+        ]
+        for start in range(0, len(values), _MATCH_CACHE_BATCH):
+            statement = pg_insert(SectionMatchCacheEntry).values(
+                values[start : start + _MATCH_CACHE_BATCH]
+            )
+            db.execute(
+                statement.on_conflict_do_nothing(
+                    index_elements=["fingerprint", "rule_set_version", "route_key"]
+                )
+            )
+        if ttl_sweep_due():
+            _delete_expired_match_cache(db)
+        save(db)
+        return {"count": len(values)}
+    finally:
+        close_session(db)
+
+
+def _live_rule_set_versions(db: Session) -> set:
+    """
+    Fingerprints of every rule set get_policy_rules can return for an
+    org and/or workspace filter, as the checker compiles them.
+    """
+    groups: Dict[Any, List[Dict]] = {}
+    for rule in db.query(
+        PolicyRule.id,
+        PolicyRule.org_id,
+        PolicyRule.workspace_id,
+        PolicyRule.version,
+        PolicyRule.is_active,
+        PolicyRule.quarantined,
+    ):
+        entry = {
+            "id": rule.id,
+            "version": rule.version,
+            "is_active": bool(rule.is_active),
+            "quarantined": bool(rule.quarantined),
+        }
+        for key in (
+            None,
+            ("org", rule.org_id),
+            ("workspace", rule.workspace_id),
+            (rule.org_id, rule.workspace_id),
+        ):
+            groups.setdefault(key, []).append(entry)
+    return {rule_set_fingerprint(rules) for rules in groups.values()}
+
+
+# Cache rows read, and deleted, per batch when pruning; each batch commits
+MATCH_CACHE_PRUNE_BATCH = int(os.getenv("MATCH_CACHE_PRUNE_BATCH", "2000"))
+
+
+def _delete_expired_match_cache(db: Session) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=MATCH_CACHE_TTL_DAYS)
+    return db.execute(
+        delete(SectionMatchCacheEntry)
+        .where(SectionMatchCacheEntry.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _policy_rules_changed(scopes: List[tuple]) -> None:
+    """
+    After a rule change is saved: drop the compiled sets. Cached hits of
+    the old rule-set version are never read again; prune_section_match_cache
+    removes them later.
+    """
+    for org_id, workspace_id in dict.fromkeys(scopes):
+        invalidate_compiled_rule_set(org_id, workspace_id)
+
+
+def prune_section_match_cache() -> Dict:
+    """
+    Delete cached hits of rule-set versions no workspace evaluates anymore
+    and, with a TTL, expired ones. Walks the table in primary-key order,
+    MATCH_CACHE_PRUNE_BATCH rows at a time, committing after each batch,
+    so it suits a background task and never holds one long delete.
+    """
+    db: Session = open_session()
+
+    try:
+        live = _live_rule_set_versions(db)
+        cutoff = (
+            datetime.now(timezone.utc) - timedelta(days=MATCH_CACHE_TTL_DAYS)
+            if MATCH_CACHE_TTL_DAYS > 0
+            else None
+        )
+        stale = expired = 0
+        last_id = 0
+        while True:
+            rows = (
+                db.query(
+                    SectionMatchCacheEntry.id,
+                    SectionMatchCacheEntry.rule_set_version,
+                    SectionMatchCacheEntry.created_at,
+                )
+                .filter(SectionMatchCacheEntry.id > last_id)
+                .order_by(SectionMatchCacheEntry.id)
+                .limit(MATCH_CACHE_PRUNE_BATCH)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            doomed = []
+            for row in rows:
+                # Stored versions are "<rule set fingerprint>:<semantic backend>"
+                if row.rule_set_version.split(":", 1)[0] not in live:
+                    stale += 1
+                elif cutoff is not None and row.created_at < cutoff:
+                    expired += 1
+                else:
+                    continue
+                doomed.append(row.id)
+            if doomed:
+                db.execute(
+                    delete(SectionMatchCacheEntry)
+                    .where(SectionMatchCacheEntry.id.in_(doomed))
+                    .execution_options(synchronize_session=False)
+                )
+            checkpoint(db)
+        return {"stale": stale, "expired": expired}
+    finally:
+        close_session(db)
 
 
 def create_policy_rule(
@@ -539,7 +1190,11 @@ def create_policy_rule(
     workspace_id: int,
     actor: str | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    pattern_error = validate_rule_pattern(pattern_type, pattern)
+    if pattern_error:
+        return {"error": "invalid_pattern", "detail": pattern_error}
+
+    db: Session = open_session()
     try:
         rule = PolicyRule(
             org_id=org_id,
@@ -557,8 +1212,7 @@ def create_policy_rule(
             created_at=datetime.now(timezone.utc),
         )
         db.add(rule)
-        db.commit()
-        db.refresh(rule)
+        save(db, rule)
 
         snapshot = {
             "name": rule.name,
@@ -587,11 +1241,16 @@ def create_policy_rule(
             created_at=datetime.now(timezone.utc),
         )
         db.add_all([version, audit])
-        db.commit()
+        save(db)
+        _policy_rules_changed([(org_id, workspace_id)])
 
         return {"id": rule.id, "version": rule.version}
     finally:
-        db.close()
+        close_session(db)
+
+
+# Fields that decide what a rule matches; other edits leave its violations be
+RULE_MATCHING_FIELDS = ("pattern_type", "pattern", "scope", "is_active")
 
 
 def update_policy_rule(
@@ -601,7 +1260,7 @@ def update_policy_rule(
     workspace_id: int | None = None,
     actor: str | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(PolicyRule).filter(PolicyRule.id == rule_id)
         query = _apply_org_workspace_filters(query, PolicyRule, org_id, workspace_id)
@@ -609,6 +1268,15 @@ def update_policy_rule(
         if rule is None:
             return {"error": "not_found"}
 
+        pattern_changed = "pattern" in updates or "pattern_type" in updates
+        if pattern_changed:
+            pattern_error = validate_rule_pattern(
+                updates.get("pattern_type", rule.pattern_type),
+                updates.get("pattern", rule.pattern),
+            )
+            if pattern_error:
+                return {"error": "invalid_pattern", "detail": pattern_error}
+
         previous = {
             "name": rule.name,
             "description": rule.description,
@@ -628,6 +1296,11 @@ def update_policy_rule(
             else:
                 setattr(rule, key, value)
 
+        # A new pattern gets a fresh start in the regex sandbox
+        if pattern_changed:
+            rule.timeout_count = 0
+            rule.quarantined = 0
+
         next_version_number = int(rule.version.lstrip("v") or "1") + 1
         rule.version = f"v{next_version_number}"
         rule.updated_at = datetime.now(timezone.utc)
@@ -660,12 +1333,114 @@ def update_policy_rule(
         )
 
         db.add_all([version, audit])
-        db.commit()
-        db.refresh(rule)
+        save(db, rule)
+        _policy_rules_changed([(rule.org_id, rule.workspace_id)])
 
-        return {"id": rule.id, "version": rule.version}
+        return {
+            "id": rule.id,
+            "version": rule.version,
+            "matching_changed": any(
+                previous[field] != snapshot[field] for field in RULE_MATCHING_FIELDS
+            ),
+        }
+    finally:
+        close_session(db)
+
+
+# Regex time-budget overruns before a rule is taken out of evaluation.
+REGEX_QUARANTINE_THRESHOLD = int(os.getenv("REGEX_QUARANTINE_THRESHOLD", "3"))
+
+
+def record_policy_rule_timeouts(rule_ids: List[int]) -> Dict:
+    """Count a regex time-budget overrun per rule, quarantining repeat offenders."""
+    db: Session = open_session()
+    try:
+        quarantined = []
+        rules = db.query(PolicyRule).filter(PolicyRule.id.in_(rule_ids)).all()
+        for rule in rules:
+            rule.timeout_count = (rule.timeout_count or 0) + 1
+            if not rule.quarantined and rule.timeout_count >= REGEX_QUARANTINE_THRESHOLD:
+                rule.quarantined = 1
+                rule.updated_at = datetime.now(timezone.utc)
+                quarantined.append(rule.id)
+                db.add(
+                    PolicyRuleAudit(
+                        rule_id=rule.id,
+                        action="quarantined",
+                        actor="regex_sandbox",
+                        changes={"timeout_count": rule.timeout_count},
+                        created_at=datetime.now(timezone.utc),
+                    )
+                )
+        save(db)
+        if quarantined:
+            _policy_rules_changed(
+                [
+                    (rule.org_id, rule.workspace_id)
+                    for rule in rules
+                    if rule.id in quarantined
+                ],
+            )
+
+        return {"rule_ids": [rule.id for rule in rules], "quarantined": quarantined}
+    finally:
+        close_session(db)
+
+
+def record_policy_rule_stats(
+    rule_stats: List[Dict],
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+) -> Dict:
+    """Fold one run's per-rule cost into the running totals."""
+    db: Session = open_session()
+    try:
+        now = datetime.now(timezone.utc)
+        values = [
+            {
+                "rule_id": entry["rule_id"],
+                "org_id": org_id,
+                "workspace_id": workspace_id,
+                "runs": 1,
+                "total_wall_ms": entry["wall_ms"],
+                "max_wall_ms": entry["wall_ms"],
+                "last_wall_ms": entry["wall_ms"],
+                "sections_scanned": entry["sections_scanned"],
+                "matches": entry["matches"],
+                "cache_hits": entry["cache_hits"],
+                "last_run_at": now,
+            }
+            for entry in rule_stats
+            if entry.get("rule_id") is not None
+        ]
+        if not values:
+            return {"count": 0}
+
+        statement = pg_insert(PolicyRuleStats).values(values)
+        excluded = statement.excluded
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["rule_id"],
+                set_={
+                    "runs": PolicyRuleStats.runs + 1,
+                    "total_wall_ms": PolicyRuleStats.total_wall_ms
+                    + excluded.total_wall_ms,
+                    "max_wall_ms": func.greatest(
+                        PolicyRuleStats.max_wall_ms, excluded.max_wall_ms
+                    ),
+                    "last_wall_ms": excluded.last_wall_ms,
+                    "sections_scanned": PolicyRuleStats.sections_scanned
+                    + excluded.sections_scanned,
+                    "matches": PolicyRuleStats.matches + excluded.matches,
+                    "cache_hits": PolicyRuleStats.cache_hits + excluded.cache_hits,
+                    "last_run_at": excluded.last_run_at,
+                },
+            )
+        )
+        save(db)
+        return {"count": len(values)}
     finally:
-        db.close()
+        close_session(db)
 
 
 def deactivate_policy_rule(
@@ -674,7 +1449,7 @@ def deactivate_policy_rule(
     org_id: int | None = None,
     workspace_id: int | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         query = db.query(PolicyRule).filter(PolicyRule.id == rule_id)
         query = _apply_org_workspace_filters(query, PolicyRule, org_id, workspace_id)
@@ -682,6 +1457,7 @@ def deactivate_policy_rule(
         if rule is None:
             return {"error": "not_found"}
 
+        was_active = bool(rule.is_active)
         rule.is_active = 0
         rule.updated_at = datetime.now(timezone.utc)
 
@@ -693,11 +1469,12 @@ def deactivate_policy_rule(
             created_at=datetime.now(timezone.utc),
         )
         db.add(audit)
-        db.commit()
+        save(db)
+        _policy_rules_changed([(rule.org_id, rule.workspace_id)])
 
-        return {"id": rule.id, "is_active": False}
+        return {"id": rule.id, "is_active": False, "matching_changed": was_active}
     finally:
-        db.close()
+        close_session(db)
 
 
 def create_violation(
@@ -707,9 +1484,14 @@ def create_violation(
     details: Any,
     org_id: int | None = None,
     workspace_id: int | None = None,
+    run_id: int | None = None,
 ) -> Dict:
-
-    db: Session = SessionLocal()
+    """
+    Insert one violation. Inside a unit of work the insert is deferred to
+    the next flush, so the returned id is None; callers that need the id
+    use create_violations_bulk, which returns ids either way.
+    """
+    db: Session = open_session()
 
     try:
         if org_id is None or workspace_id is None:
@@ -721,17 +1503,186 @@ def create_violation(
         v = Violation(
             org_id=org_id,
             workspace_id=workspace_id,
+            processed_id=processed_id,
+            run_id=run_id,
             rule=rule,
             severity=severity,
             details={"processed_id": processed_id, **details},
             created_at=datetime.now(timezone.utc),
         )
         db.add(v)
-        db.commit()
-        db.refresh(v)
+        defer(db)
         return {"id": v.id, "processed_id": processed_id}
     finally:
-        db.close()
+        close_session(db)
+
+
+# Bulk violation inserts this large use COPY on psycopg; 0 = never.
+VIOLATION_COPY_THRESHOLD = int(os.getenv("VIOLATION_COPY_THRESHOLD", "5000"))
+
+_VIOLATION_COPY_COLUMNS = (
+    "id",
+    "org_id",
+    "workspace_id",
+    "processed_id",
+    "run_id",
+    "rule",
+    "severity",
+    "details",
+    "created_at",
+)
+
+
+def _copy_violations(db: Session, values: List[Dict]) -> List[int]:
+    """
+    COPY rows into violations. COPY returns nothing, so the ids are taken
+    from the table's sequence first and written with the rows.
+    """
+    connection = db.connection()
+    ids = list(
+        connection.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('violations', 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": len(values)},
+        ).scalars()
+    )
+    columns = ", ".join(_VIOLATION_COPY_COLUMNS)
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        with cursor.copy(f"COPY violations ({columns}) FROM STDIN") as copy:
+            for violation_id, row in zip(ids, values):
+                copy.write_row(
+                    (
+                        violation_id,
+                        row["org_id"],
+                        row["workspace_id"],
+                        row["processed_id"],
+                        row["run_id"],
+                        row["rule"],
+                        row["severity"],
+                        json_dumps(row["details"]),
+                        row["created_at"],
+                    )
+                )
+    return ids
+
+
+def create_violations_bulk(
+    processed_id: int,
+    violations: List[Dict],
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    run_id: int | None = None,
+) -> Dict:
+    """
+    Insert many violations for one document with a multi-row INSERT ...
+    RETURNING, or COPY from VIOLATION_COPY_THRESHOLD rows. ids come back in
+    the order of violations.
+    """
+    db: Session = open_session()
+
+    try:
+        if org_id is None or workspace_id is None:
+            org_workspace = _get_org_workspace_for_processed(db, processed_id)
+            if org_workspace is None:
+                return {"error": "processed_data not found"}
+            org_id, workspace_id = org_workspace
+
+        if not violations:
+            return {"processed_id": processed_id, "ids": []}
+
+        now = datetime.now(timezone.utc)
+        values = [
+            {
+                "org_id": org_id,
+                "workspace_id": workspace_id,
+                "processed_id": processed_id,
+                "run_id": run_id,
+                "rule": v["rule"],
+                "severity": v["severity"],
+                "details": {"processed_id": processed_id, **v["details"]},
+                "created_at": now,
+            }
+            for v in violations
+        ]
+        if (
+            0 < VIOLATION_COPY_THRESHOLD <= len(values)
+            and db.get_bind().dialect.driver == "psycopg"
+        ):
+            ids = _copy_violations(db, values)
+        else:
+            # Sent as batches of multi-row VALUES by the driver
+            ids = list(
+                db.scalars(
+                    insert(Violation).returning(
+                        Violation.id, sort_by_parameter_order=True
+                    ),
+                    values,
+                )
+            )
+        save(db)
+        return {"processed_id": processed_id, "ids": ids}
+    finally:
+        close_session(db)
+
+
+def apply_violation_delta(
+    processed_id: int,
+    retire_ids: List[int],
+    violations: List[Dict],
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    run_id: int | None = None,
+) -> Dict:
+    """
+    Retire and insert violations for one document in a single transaction.
+    Retired rows are kept with retired_at set, as the rule's history.
+    Inserted rows are attributed to run_id, the run that built the document.
+    """
+    db: Session = open_session()
+
+    try:
+        if org_id is None or workspace_id is None:
+            org_workspace = _get_org_workspace_for_processed(db, processed_id)
+            if org_workspace is None:
+                return {"error": "processed_data not found"}
+            org_id, workspace_id = org_workspace
+
+        now = datetime.now(timezone.utc)
+        retired = 0
+        if retire_ids:
+            retired = (
+                db.query(Violation)
+                .filter(Violation.id.in_(retire_ids))
+                .filter(Violation.processed_id == processed_id)
+                .filter(Violation.retired_at.is_(None))
+                .update({Violation.retired_at: now}, synchronize_session=False)
+            )
+
+        db.add_all(
+            [
+                Violation(
+                    org_id=org_id,
+                    workspace_id=workspace_id,
+                    processed_id=processed_id,
+                    run_id=run_id,
+                    rule=v["rule"],
+                    severity=v["severity"],
+                    details={"processed_id": processed_id, **v["details"]},
+                    created_at=now,
+                )
+                for v in violations
+            ]
+        )
+        save(db)
+        return {
+            "processed_id": processed_id,
+            "retired": retired,
+            "inserted": len(violations),
+        }
+    finally:
+        close_session(db)
 
 
 def create_report(
@@ -741,8 +1692,9 @@ def create_report(
     content: Any,
     org_id: int | None = None,
     workspace_id: int | None = None,
+    run_id: int | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         if org_id is None or workspace_id is None:
@@ -754,6 +1706,8 @@ def create_report(
         report = Report(
             org_id=org_id,
             workspace_id=workspace_id,
+            processed_id=processed_id,
+            run_id=run_id,
             score=score,
             summary=summary,
             content=content,
@@ -761,17 +1715,16 @@ def create_report(
         )
 
         db.add(report)
-        db.commit()
-        db.refresh(report)
+        save(db, report)
 
         return {"id": report.id, "processed_id": processed_id, "score": score}
 
     finally:
-        db.close()
+        close_session(db)
 
 
 def update_report(report_id: int, summary: str, content: Any, score: int) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         r = db.query(Report).filter(Report.id == report_id).first()
@@ -784,17 +1737,19 @@ def update_report(report_id: int, summary: str, content: Any, score: int) -> Dic
         setattr(r, "score", score)
         setattr(r, "updated_at", datetime.now(timezone.utc))
 
-        db.commit()
-        db.refresh(r)
+        save(db, r)
 
         return {"id": r.id, "summary": r.summary, "score": r.score}
     finally:
-        db.close()
+        close_session(db)
 
 
 def log_agent_action(agent_name: str, action: str, details: Any) -> Dict:
-
-    db: Session = SessionLocal()
+    """
+    Append an agent log entry. Inside a unit of work the insert is deferred
+    to the next flush, so the returned id is None.
+    """
+    db: Session = open_session()
 
     try:
         log = AgentLog(
@@ -804,11 +1759,68 @@ def log_agent_action(agent_name: str, action: str, details: Any) -> Dict:
             created_at=datetime.now(timezone.utc),
         )
         db.add(log)
-        db.commit()
-        db.refresh(log)
+        defer(db)
         return {"id": log.id}
     finally:
-        db.close()
+        close_session(db)
+
+
+def create_upload_batch(
+    files: List[Dict[str, Any]],
+    org_id: int,
+    workspace_id: int,
+    rule_set_version: str | None = None,
+) -> Dict:
+    """
+    raw_data rows for a batch of stored uploads and a queued run for each,
+    inserted in one transaction. Runs share a new batch_id.
+    """
+    db: Session = open_session()
+
+    try:
+        batch_id = uuid4().hex
+        now = datetime.now(timezone.utc)
+        raw_rows = [
+            RawData(
+                org_id=org_id,
+                workspace_id=workspace_id,
+                content=content,
+                file_name=content.get("file_name"),
+                file_type=content.get("file_type"),
+                source="upload",
+                blob_digest=content.get("blob_digest"),
+            )
+            for content in files
+        ]
+        db.add_all(raw_rows)
+        # One multi-row INSERT ... RETURNING for the raw ids
+        db.flush()
+
+        runs = [
+            ADKRun(
+                raw_id=raw.id,
+                status="queued",
+                batch_id=batch_id,
+                rule_set_version=rule_set_version,
+                org_id=org_id,
+                workspace_id=workspace_id,
+                created_at=now,
+                queued_at=now,
+            )
+            for raw in raw_rows
+        ]
+        db.add_all(runs)
+        db.flush()
+        # Read ids before commit expires the rows, which would reload each one
+        mapping = [
+            {"file_name": raw.file_name, "raw_data_id": raw.id, "run_id": run.id}
+            for raw, run in zip(raw_rows, runs)
+        ]
+        save(db)
+
+        return {"batch_id": batch_id, "files": mapping}
+    finally:
+        close_session(db)
 
 
 def create_adk_run(
@@ -816,8 +1828,9 @@ def create_adk_run(
     status: str,
     org_id: int | None = None,
     workspace_id: int | None = None,
+    rule_set_version: str | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         if org_id is None or workspace_id is None:
@@ -839,13 +1852,13 @@ def create_adk_run(
             status=status,
             org_id=org_id,
             workspace_id=workspace_id,
+            rule_set_version=rule_set_version,
             created_at=now,
             queued_at=queued_at,
             processing_at=processing_at,
         )
         db.add(run)
-        db.commit()
-        db.refresh(run)
+        checkpoint(db, run)
 
         run_update_manager.broadcast_sync(
             run.id,
@@ -853,7 +1866,7 @@ def create_adk_run(
         )
         return {"id": run.id}
     finally:
-        db.close()
+        close_session(db)
 
 
 def update_adk_run(
@@ -864,7 +1877,7 @@ def update_adk_run(
     error: str | None = None,
     error_code: str | None = None,
 ) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         adk = db.query(ADKRun).filter(ADKRun.id == run_id).first()
@@ -892,8 +1905,7 @@ def update_adk_run(
         if status in ("completed", "failed"):
             setattr(adk, "completed_at", now)
 
-        db.commit()
-        db.refresh(adk)
+        checkpoint(db, adk)
 
         payload = _serialize_run(adk)
         run_update_manager.broadcast_sync(
@@ -902,7 +1914,7 @@ def update_adk_run(
         )
         return payload
     finally:
-        db.close()
+        close_session(db)
 
 
 def create_adk_run_step(
@@ -916,7 +1928,7 @@ def create_adk_run_step(
     if run_id is None:
         return {"error": "run_id is required"}
 
-    db: Session = SessionLocal()
+    db: Session = open_session()
 
     try:
         finished_at = None
@@ -935,8 +1947,11 @@ def create_adk_run_step(
         )
 
         db.add(s)
-        db.commit()
-        db.refresh(s)
+        # Each step shows the run is alive; see UPLOAD_REUSE_INFLIGHT_SECONDS
+        db.query(ADKRun).filter(ADKRun.id == run_id).update(
+            {ADKRun.updated_at: s.created_at}, synchronize_session=False
+        )
+        checkpoint(db, s)
 
         step_payload = _serialize_run_step(s)
         run_update_manager.broadcast_sync(
@@ -945,19 +1960,18 @@ def create_adk_run_step(
         )
         return {"id": s.id}
     finally:
-        db.close()
+        close_session(db)
 
 
 def finish_adk_run_step(step_id: int) -> Dict:
-    db: Session = SessionLocal()
+    db: Session = open_session()
     try:
         step = db.query(ADKRunStep).filter(ADKRunStep.id == step_id).first()
         if step is None:
             return {"error": "not_found"}
 
         setattr(step, "finished_at", datetime.now(timezone.utc))
-        db.commit()
-        db.refresh(step)
+        checkpoint(db, step)
         step_payload = _serialize_run_step(step)
         run_update_manager.broadcast_sync(
             step.adk_run_id,
@@ -970,4 +1984,4 @@ def finish_adk_run_step(step_id: int) -> Dict:
         return {"id": step.id}
 
     finally:
-        db.close()
+        close_session(db)
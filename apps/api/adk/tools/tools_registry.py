@@ -9,65 +9,106 @@ from typing import Callable, Dict
 
 # Import existing db tools (already tested)
 from adk.tools.db_tools import (
+    apply_violation_delta,
     create_adk_run,
     create_adk_run_step,
     create_policy_rule,
     create_processed_data,
     create_report,
+    create_section_embeddings,
+    create_upload_batch,
     create_violation,
+    create_violations_bulk,
     deactivate_policy_rule,
+    find_referenced_blob_digests,
+    find_reusable_upload_runs,
     finish_adk_run_step,
     get_active_adk_run_by_raw_id,
     get_adk_run_by_id,
     get_adk_run_steps,
     get_policy_rule_by_id,
+    get_policy_rule_hit_rates,
+    get_policy_rule_stats,
     get_latest_adk_run_by_raw_id,
     get_latest_failed_adk_run_by_raw_id,
+    get_latest_report_by_processed_id,
     get_policy_rules,
     get_processed_data_by_id,
     get_raw_data_by_id,
+    get_raw_text,
     get_report_by_id,
+    get_section_match_cache,
+    get_upload_batch,
     get_violations_by_processed_id,
     list_policy_rule_versions,
     list_adk_runs,
     list_adk_runs_by_raw_id,
+    list_expensive_policy_rules,
+    list_processed_data_batch,
     log_agent_action,
+    record_policy_rule_stats,
+    prune_section_match_cache,
+    record_policy_rule_timeouts,
+    search_similar_sections,
+    store_section_match_cache,
     update_adk_run,
     update_policy_rule,
     update_report,
 )
+from adk.tools.unit_of_work import rolls_back_on_error
 
 
 def get_adk_tools() -> Dict[str, Callable]:
     """
-    Single source of truth for tools ADK agents can use.
+    Single source of truth for tools ADK agents can use. Inside a unit of
+    work a tool that raises rolls its session back; see unit_of_work.
     """
 
-    return {
+    tools: Dict[str, Callable] = {
         "get_raw_data_by_id": get_raw_data_by_id,
+        "get_raw_text": get_raw_text,
         "get_processed_data_by_id": get_processed_data_by_id,
+        "list_processed_data_batch": list_processed_data_batch,
         "get_policy_rules": get_policy_rules,
         "get_policy_rule_by_id": get_policy_rule_by_id,
         "list_policy_rule_versions": list_policy_rule_versions,
+        "get_policy_rule_stats": get_policy_rule_stats,
+        "get_policy_rule_hit_rates": get_policy_rule_hit_rates,
+        "list_expensive_policy_rules": list_expensive_policy_rules,
         "get_report_by_id": get_report_by_id,
+        "get_latest_report_by_processed_id": get_latest_report_by_processed_id,
         "get_violations_by_processed_id": get_violations_by_processed_id,
+        "search_similar_sections": search_similar_sections,
+        "get_section_match_cache": get_section_match_cache,
         "get_active_adk_run_by_raw_id": get_active_adk_run_by_raw_id,
+        "find_referenced_blob_digests": find_referenced_blob_digests,
+        "find_reusable_upload_runs": find_reusable_upload_runs,
         "get_latest_failed_adk_run_by_raw_id": get_latest_failed_adk_run_by_raw_id,
         "get_latest_adk_run_by_raw_id": get_latest_adk_run_by_raw_id,
         "get_adk_run_by_id": get_adk_run_by_id,
         "list_adk_runs": list_adk_runs,
         "list_adk_runs_by_raw_id": list_adk_runs_by_raw_id,
         "get_adk_run_steps": get_adk_run_steps,
+        "get_upload_batch": get_upload_batch,
         "create_processed_data": create_processed_data,
+        "create_section_embeddings": create_section_embeddings,
+        "store_section_match_cache": store_section_match_cache,
+        "prune_section_match_cache": prune_section_match_cache,
         "create_policy_rule": create_policy_rule,
         "update_policy_rule": update_policy_rule,
         "deactivate_policy_rule": deactivate_policy_rule,
+        "record_policy_rule_timeouts": record_policy_rule_timeouts,
+        "record_policy_rule_stats": record_policy_rule_stats,
         "create_violation": create_violation,
+        "create_violations_bulk": create_violations_bulk,
+        "apply_violation_delta": apply_violation_delta,
         "create_report": create_report,
         "update_report": update_report,
         "log_agent_action": log_agent_action,
         "create_adk_run": create_adk_run,
+        "create_upload_batch": create_upload_batch,
         "update_adk_run": update_adk_run,
         "create_adk_run_step": create_adk_run_step,
         "finish_adk_run_step": finish_adk_run_step,
     }
+    return {name: rolls_back_on_error(tool) for name, tool in tools.items()}
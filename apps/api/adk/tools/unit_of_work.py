@@ -0,0 +1,150 @@
+"""
+Run-scoped unit of work for the ADK tool layer.
+
+Outside a unit of work every db tool opens its own session, commits and
+closes it. Inside one, started by ComplianceReviewWorkflow.run, the tools
+share a single session on one pinned connection:
+
+- rows read by primary key (raw data, processed data) come from the
+  session's identity map after the first lookup;
+- writes only flush, and violations and agent logs are not even flushed
+  until the next query or checkpoint, so they go out as batched INSERTs;
+  create_violation and log_agent_action therefore return no id;
+- run and step progress (create_adk_run_step, finish_adk_run_step,
+  update_adk_run) commits, so REST pollers see what the websocket
+  broadcasts, together with everything written before it;
+- a tool that raises rolls the session back to the last commit
+  (rolls_back_on_error), so the run can still record its failure instead
+  of hitting PendingRollbackError;
+- agents call release() before long work that needs no database, which
+  commits so the connection is not held idle in a transaction.
+
+Whatever is left commits when the unit of work ends.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from db import SessionLocal, engine
+from sqlalchemy.orm import Session
+
+_current: ContextVar[Optional[Session]] = ContextVar("unit_of_work", default=None)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@contextmanager
+def unit_of_work() -> Iterator[Session]:
+    """
+    Share one session between the db tools called in this context. Nested
+    use joins the outer unit of work.
+    """
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+
+    connection = engine.connect()
+    # Loaded rows stay readable across checkpoints; queries flush pending
+    # writes first so they see them
+    db = SessionLocal(bind=connection, expire_on_commit=False, autoflush=True)
+    token = _current.set(db)
+    try:
+        yield db
+    except BaseException:
+        # Keep what the run wrote before it failed, as per-call sessions would
+        if db.is_active:
+            db.commit()
+        else:
+            db.rollback()
+        raise
+    else:
+        db.commit()
+    finally:
+        _current.reset(token)
+        db.close()
+        connection.close()
+
+
+def open_session() -> Session:
+    """The session of the current unit of work, or a new one."""
+    return _current.get() or SessionLocal()
+
+
+def close_session(db: Session) -> None:
+    """Close a session from open_session; the unit of work's stays open."""
+    if db is not _current.get():
+        db.close()
+
+
+def keep(db: Session, *instances: Any) -> None:
+    """
+    Hold rows for the rest of the unit of work. The identity map only
+    references clean rows weakly, so they would be reloaded once the tool
+    that read them returns.
+    """
+    if db is _current.get():
+        db.info.setdefault("kept", set()).update(instances)
+
+
+def save(db: Session, *instances: Any) -> None:
+    """
+    Make writes visible: commit and refresh outside a unit of work, flush
+    inside one, which assigns primary keys.
+    """
+    if db is _current.get():
+        db.flush()
+        return
+    db.commit()
+    for instance in instances:
+        db.refresh(instance)
+
+
+def defer(db: Session) -> None:
+    """
+    Writes nobody reads back right away: committed outside a unit of work,
+    left pending inside one until the next query or checkpoint flushes them
+    in a batch. Primary keys are not assigned until then.
+    """
+    if db is not _current.get():
+        db.commit()
+
+
+def checkpoint(db: Session, *instances: Any) -> None:
+    """Commit, in or out of a unit of work; refresh only per-call sessions."""
+    db.commit()
+    if db is not _current.get():
+        for instance in instances:
+            db.refresh(instance)
+
+
+def release() -> None:
+    """
+    Commit the current unit of work before long work that needs no
+    database; later tools start a new transaction. No-op outside one.
+    """
+    db = _current.get()
+    if db is not None:
+        db.commit()
+
+
+def rolls_back_on_error(tool: F) -> F:
+    """
+    Wrap a db tool so that, inside a unit of work, an exception rolls the
+    shared session back to its last commit before propagating. A failed
+    flush otherwise leaves the session unusable for the rest of the run.
+    """
+
+    @wraps(tool)
+    def call(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return tool(*args, **kwargs)
+        except Exception:
+            db = _current.get()
+            if db is not None:
+                db.rollback()
+            raise
+
+    return call  # type: ignore[return-value]
@@ -9,6 +9,7 @@ from adk.agents.data_engineer_agent import DataEngineerADKAgent
 from adk.agents.report_writer_agent import ReportWriterADKAgent
 from adk.agents.risk_assessor_agent import RiskAssessorADKAgent
 from adk.tools.tools_registry import get_adk_tools
+from adk.tools.unit_of_work import unit_of_work
 from adk.workflows.types import WorkflowResult, WorkflowStepResult
 
 
@@ -20,7 +21,14 @@ class ComplianceReviewWorkflow:
         self.report_writer = ReportWriterADKAgent()
         self.tools = get_adk_tools()
 
-    def run(self, raw_id: int, run_id: int, is_retry: bool = False) -> dict:
+    def run(
+        self, raw_id: int, run_id: int, is_retry: bool = False, mode: str = "full"
+    ) -> dict:
+        # One session for every tool the agents call during the run
+        with unit_of_work():
+            return self._run(raw_id, run_id, is_retry, mode)
+
+    def _run(self, raw_id: int, run_id: int, is_retry: bool, mode: str) -> dict:
 
         retry_processed_id = None
 
@@ -51,7 +59,7 @@ class ComplianceReviewWorkflow:
             self.tools["finish_adk_run_step"](step["id"])
 
         else:
-            data_result = self.data_engineer.run(raw_id=raw_id)
+            data_result = self.data_engineer.run(raw_id=raw_id, run_id=adk_run_id)
 
             if "error" in data_result:
                 steps["data_engineering"] = WorkflowStepResult(
@@ -96,7 +104,9 @@ class ComplianceReviewWorkflow:
             self.tools["finish_adk_run_step"](step["id"])
 
         # 2. Compliance checking
-        compliance_result = self.compliance_checker.run(processed_id=processed_id)
+        compliance_result = self.compliance_checker.run(
+            processed_id=processed_id, mode=mode, run_id=adk_run_id
+        )
         if "error" in compliance_result:
             steps["compliance_checking"] = WorkflowStepResult(
                 step="compliance_checking",
@@ -129,17 +139,29 @@ class ComplianceReviewWorkflow:
             step="compliance_checking", status="success", data=compliance_result
         )
 
+        # Rules skipped by the regex sandbox leave the check usable but partial
+        skipped_rules = compliance_result.get("skipped_rules") or []
         step = self.tools["create_adk_run_step"](
             run_id=adk_run_id,
             step="compliance_checking",
             status="success",
             data=compliance_result,
+            error=(
+                f"{len(skipped_rules)} rule(s) skipped after exceeding the regex time budget"
+                if skipped_rules
+                else None
+            ),
+            error_code=skipped_rules[0]["error_code"] if skipped_rules else None,
         )
 
         self.tools["finish_adk_run_step"](step["id"])
 
         # 3. Risk assessment
-        risk_result = self.risk_assessor.run(processed_id=processed_id)
+        # A triage run that stopped at the risk cap produces a partial report
+        partial = bool(compliance_result.get("partial"))
+        risk_result = self.risk_assessor.run(
+            processed_id=processed_id, partial=partial, run_id=adk_run_id
+        )
         if "error" in risk_result:
             steps["risk_assessment"] = WorkflowStepResult(
                 step="risk_assessment", status="failed", error=risk_result["error"]
@@ -239,5 +261,6 @@ class ComplianceReviewWorkflow:
             raw_id=raw_id,
             processed_id=processed_id,
             report_id=report_id,
+            partial=partial,
             steps=steps,
         ).model_dump()
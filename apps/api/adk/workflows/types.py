@@ -14,4 +14,5 @@ class WorkflowResult(BaseModel):
     raw_id: int
     processed_id: Optional[int] = None
     report_id: Optional[int] = None
+    partial: bool = False
     steps: Dict[str, WorkflowStepResult]
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+Synthetic corpora for rule engine benchmarks.
+
+Rules and section text are grown from the seeded policy rules and demo
+documents, so generated workloads keep the shapes the engine sees in
+practice: scoped and unscoped rules, JSON/CSV/text labels, PII-like tokens
+and policy vocabulary mixed into filler prose.
+"""
+
+import random
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+from seed.demo_documents import DEMO_DOCUMENTS
+from seed.demo_policy_rules import DEMO_POLICY_RULES
+from seed_policy_rules import SEED_RULES
+
+PATTERN_TYPES = ("keyword", "regex", "semantic")
+
+# Values that trip the seeded rules when injected into a section.
+TRIGGERS = [
+    "123-45-6789",
+    "4111 1111 1111 1111",
+    "HIPAA",
+    "export-controlled",
+    "confidential pricing",
+    "patient consent pending",
+]
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z\-]{2,}")
+
+
+@lru_cache(maxsize=1)
+def _demo_texts() -> Tuple[str, ...]:
+    texts = []
+    for document in DEMO_DOCUMENTS:
+        content = document["content"]
+        texts.extend(line for line in content["raw_text"].splitlines() if line.strip())
+        parsed = content.get("parsed_json")
+        if isinstance(parsed, dict):
+            texts.extend(str(value) for value in parsed.values())
+    return tuple(texts)
+
+
+def _seed_rules() -> List[Dict[str, Any]]:
+    by_name = {}
+    for rule in SEED_RULES + DEMO_POLICY_RULES:
+        by_name.setdefault(rule["name"], rule)
+    return list(by_name.values())
+
+
+@lru_cache(maxsize=1)
+def _vocabulary() -> Tuple[str, ...]:
+    words = set()
+    for text in _demo_texts():
+        words.update(word.lower() for word in _WORD.findall(text))
+    for rule in _seed_rules():
+        words.update(word.lower() for word in _WORD.findall(rule["description"] or ""))
+    return tuple(sorted(words))
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'6:3:1' -> keyword/regex/semantic shares."""
+    weights = [float(part) for part in mix.split(":")]
+    if len(weights) != len(PATTERN_TYPES) or sum(weights) <= 0:
+        raise ValueError("mix must be keyword:regex:semantic weights, e.g. 6:3:1")
+    total = sum(weights)
+    return {kind: weight / total for kind, weight in zip(PATTERN_TYPES, weights)}
+
+
+def build_rules(count: int, mix: Dict[str, float], rng: random.Random) -> List[Dict[str, Any]]:
+    """Seed rules first, then generated variants until the mix is filled."""
+    templates = {kind: [] for kind in PATTERN_TYPES}
+    for rule in _seed_rules():
+        templates[rule["pattern_type"]].append(rule)
+
+    vocabulary = _vocabulary()
+    targets = {kind: round(count * share) for kind, share in mix.items()}
+    targets["keyword"] += count - sum(targets.values())
+
+    rules: List[Dict[str, Any]] = []
+    for kind in PATTERN_TYPES:
+        for index in range(targets[kind]):
+            seeds = templates[kind]
+            if index < len(seeds):
+                rule = dict(seeds[index])
+            elif kind == "keyword":
+                word = rng.choice(vocabulary)
+                rule = {
+                    "name": f"Keyword {word} {index}",
+                    "description": f"Mentions of {word} need review.",
+                    "severity": rng.choice(["low", "medium", "high"]),
+                    "pattern_type": "keyword",
+                    "pattern": f"{word} {rng.choice(vocabulary)}"
+                    if index % 3 == 0
+                    else word,
+                    "scope": None,
+                }
+            elif kind == "regex":
+                word = re.escape(rng.choice(vocabulary))
+                rule = {
+                    "name": f"Regex {index}",
+                    "description": "Identifier pattern near a policy term.",
+                    "severity": rng.choice(["medium", "high"]),
+                    "pattern_type": "regex",
+                    "pattern": rng.choice(
+                        [
+                            rf"\b{word}[-_ ]\d{{2,6}}\b",
+                            rf"\b[A-Z]{{2,4}}-\d{{3,5}}\b",
+                            rf"\b{word}\s+(?:id|ref|no)\b",
+                        ]
+                    ),
+                    "scope": None,
+                }
+            else:
+                phrase = " ".join(rng.sample(vocabulary, 6))
+                rule = {
+                    "name": f"Semantic {index}",
+                    "description": phrase,
+                    "severity": rng.choice(["low", "medium"]),
+                    "pattern_type": "semantic",
+                    "pattern": phrase,
+                    "scope": None,
+                }
+            rule.update(
+                id=len(rules) + 1,
+                version="v1",
+                is_active=True,
+                remediation=rule.get("remediation") or "Review and remediate.",
+            )
+            rules.append(rule)
+    return rules
+
+
+def build_document(
+    section_count: int,
+    section_length: int,
+    rng: random.Random,
+    trigger_rate: float = 0.05,
+) -> List[Dict[str, Any]]:
+    """Sections of roughly section_length characters with labels like the data engineer's."""
+    demo = _demo_texts()
+    vocabulary = _vocabulary()
+    columns = ["id", "owner", "notes", "status", "billing_notes"]
+    sections = []
+    for index in range(section_count):
+        parts: List[str] = []
+        length = 0
+        while length < section_length:
+            piece = (
+                rng.choice(demo)
+                if rng.random() < 0.3
+                else " ".join(rng.choices(vocabulary, k=8))
+            )
+            if rng.random() < trigger_rate:
+                piece = f"{piece} {rng.choice(TRIGGERS)}"
+            parts.append(piece)
+            length += len(piece) + 1
+        text = " ".join(parts)[: max(section_length, 1)]
+
+        shape = index % 3
+        if shape == 0:
+            label, fields = f"json.{rng.choice(columns)}", None
+        elif shape == 1:
+            label, fields = f"csv.row.{index}", columns
+        else:
+            label, fields = f"text.line.{index}", None
+        section = {
+            "chunk_id": f"c{index}",
+            "index": index,
+            "label": label,
+            "text": text,
+        }
+        if fields:
+            section["fields"] = fields
+        sections.append(section)
+    return sections
+
+
+def build_corpus(
+    documents: int,
+    section_count: int,
+    section_length: int,
+    seed: int,
+) -> List[List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    return [build_document(section_count, section_length, rng) for _ in range(documents)]
+
+
+def configs(
+    sections: Sequence[int], lengths: Sequence[int], rules: Sequence[int]
+) -> List[Tuple[int, int, int]]:
+    return [(s, l, r) for s in sections for l in lengths for r in rules]
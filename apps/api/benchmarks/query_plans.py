@@ -0,0 +1,219 @@
+"""
+Query plan benchmark for the jsonb payload columns.
+
+Seeds a synthetic workspace (documents, violations, reports) inside one
+transaction, runs EXPLAIN ANALYZE for each hot lookup in its old form
+(casting ids out of JSON text, matching the report text) and its current
+form (id columns, jsonb expression indexes), and rolls everything back.
+Needs DATABASE_URL pointing at a database migrated by create_tables.py.
+
+Run from apps/api:
+
+    python -m benchmarks.query_plans --documents 5000 --violations 500000
+    python -m benchmarks.query_plans --output benchmarks/query_plans.json
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import db
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# (name, old SQL, current SQL); :processed_id, :raw_id, :rule_id and
+# :workspace_id are taken from the seeded rows
+CASES = [
+    (
+        "violations_by_processed_id",
+        "SELECT * FROM violations "
+        "WHERE CAST(details ->> 'processed_id' AS INTEGER) = :processed_id",
+        "SELECT * FROM violations WHERE processed_id = :processed_id",
+    ),
+    (
+        "violations_by_processed_id_and_rule",
+        # The rule used to be filtered in Python after loading the document's rows
+        "SELECT * FROM violations "
+        "WHERE CAST(details ->> 'processed_id' AS INTEGER) = :processed_id",
+        "SELECT * FROM violations WHERE processed_id = :processed_id "
+        "AND details -> 'rule_id' = to_jsonb(CAST(:rule_id AS integer))",
+    ),
+    (
+        "latest_report_by_processed_id",
+        "SELECT * FROM reports "
+        "WHERE CAST(content ->> 'processed_id' AS INTEGER) = :processed_id "
+        "ORDER BY id DESC LIMIT 1",
+        "SELECT * FROM reports WHERE processed_id = :processed_id "
+        "ORDER BY id DESC LIMIT 1",
+    ),
+    (
+        "processed_data_by_raw_id",
+        "SELECT * FROM processed_data "
+        "WHERE structured ->> 'raw_id' = CAST(:raw_id AS text) "
+        "ORDER BY id DESC LIMIT 1",
+        "SELECT * FROM processed_data WHERE raw_id = :raw_id ORDER BY id DESC LIMIT 1",
+    ),
+    (
+        "reports_by_risk_tier",
+        "SELECT * FROM reports WHERE workspace_id = :workspace_id "
+        "AND CAST(content AS TEXT) ILIKE '%\"risk_tier\": \"critical\"%' "
+        "ORDER BY created_at DESC LIMIT 20",
+        "SELECT * FROM reports WHERE workspace_id = :workspace_id "
+        "AND lower(content ->> 'risk_tier') = 'critical' "
+        "ORDER BY created_at DESC LIMIT 20",
+    ),
+]
+
+TIERS = "ARRAY['Critical','High','High','Medium','Medium','Medium','Low','Low','Low','Low']"
+
+
+def seed(
+    conn: Connection, documents: int, violations: int, reports: int, rules: int
+) -> Dict[str, int]:
+    """Synthetic rows in a new org/workspace; returns ids for the queries."""
+    org_id = conn.execute(
+        text("INSERT INTO orgs (name, created_at) VALUES ('query-plan-bench', now()) RETURNING id")
+    ).scalar_one()
+    workspace_id = conn.execute(
+        text(
+            "INSERT INTO workspaces (org_id, name, created_at) "
+            "VALUES (:org_id, 'query-plan-bench', now()) RETURNING id"
+        ),
+        {"org_id": org_id},
+    ).scalar_one()
+    scope = {"org_id": org_id, "workspace_id": workspace_id}
+
+    conn.execute(
+        text(
+            "WITH raw AS ("
+            " INSERT INTO raw_data (org_id, workspace_id, content, source, created_at)"
+            " SELECT :org_id, :workspace_id,"
+            "  jsonb_build_object('raw_text', 'document ' || g, 'file_type', 'text'),"
+            "  'bench', now()"
+            " FROM generate_series(1, :documents) g RETURNING id)"
+            " INSERT INTO processed_data (org_id, workspace_id, raw_id, structured, created_at)"
+            " SELECT :org_id, :workspace_id, raw.id,"
+            "  jsonb_build_object('raw_id', raw.id, 'sections', '[]'::jsonb), now()"
+            " FROM raw"
+        ),
+        {**scope, "documents": documents},
+    )
+    ids = "(SELECT array_agg(id ORDER BY id) AS ids FROM processed_data WHERE org_id = :org_id) d"
+    conn.execute(
+        text(
+            "INSERT INTO violations"
+            " (org_id, workspace_id, processed_id, rule, severity, details, created_at)"
+            " SELECT :org_id, :workspace_id, d.ids[1 + g % :documents],"
+            "  'rule ' || g % :rules, 'high',"
+            "  jsonb_build_object('processed_id', d.ids[1 + g % :documents],"
+            "   'rule_id', g % :rules, 'evidence', repeat('x', 40),"
+            "   'location', jsonb_build_object('label', 'text.line.' || g)),"
+            "  now() - g * interval '1 second'"
+            f" FROM generate_series(1, :violations) g, {ids}"
+        ),
+        {**scope, "documents": documents, "violations": violations, "rules": rules},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO reports"
+            " (org_id, workspace_id, processed_id, summary, score, content, created_at)"
+            " SELECT :org_id, :workspace_id, d.ids[1 + g % :documents], 'bench', 50,"
+            "  jsonb_build_object('processed_id', d.ids[1 + g % :documents],"
+            f"   'risk_tier', ({TIERS})[1 + g % 10], 'violations', '[]'::jsonb),"
+            "  now() - g * interval '1 second'"
+            f" FROM generate_series(1, :reports) g, {ids}"
+        ),
+        {**scope, "documents": documents, "reports": reports},
+    )
+    for table in ("raw_data", "processed_data", "violations", "reports"):
+        conn.execute(text(f"ANALYZE {table}"))
+
+    processed_id, raw_id = conn.execute(
+        text(
+            "SELECT id, raw_id FROM processed_data WHERE org_id = :org_id "
+            "ORDER BY id LIMIT 1 OFFSET :middle"
+        ),
+        {"org_id": org_id, "middle": documents // 2},
+    ).one()
+    return {
+        "processed_id": processed_id,
+        "raw_id": raw_id,
+        "rule_id": 1,
+        "workspace_id": workspace_id,
+    }
+
+
+def _scan_nodes(plan: Dict[str, Any]) -> List[str]:
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        index = plan.get("Index Name")
+        nodes.append(f"{plan['Node Type']}{f' ({index})' if index else ''}")
+    for child in plan.get("Plans", []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+def explain(conn: Connection, sql: str, params: Dict[str, int]) -> Dict[str, Any]:
+    # Once to warm the cache, once measured
+    for _ in range(2):
+        (result,) = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params
+        ).one()
+    plan = result[0]
+    return {
+        "scans": _scan_nodes(plan["Plan"]),
+        "rows": plan["Plan"]["Actual Rows"],
+        "shared_buffers": plan["Plan"].get("Shared Hit Blocks", 0)
+        + plan["Plan"].get("Shared Read Blocks", 0),
+        "execution_ms": round(plan["Execution Time"], 3),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--violations", type=int, default=200000)
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--rules", type=int, default=50)
+    parser.add_argument("--output", help="write the plans as JSON")
+    args = parser.parse_args(argv)
+
+    db.engine.echo = False
+    results = []
+    with db.engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            params = seed(conn, args.documents, args.violations, args.reports, args.rules)
+            for name, old_sql, current_sql in CASES:
+                old = explain(conn, old_sql, params)
+                current = explain(conn, current_sql, params)
+                results.append({"query": name, "old": old, "current": current})
+                print(
+                    f"{name:<38} old {old['execution_ms']:>10.3f}ms "
+                    f"{', '.join(old['scans'])}\n"
+                    f"{'':<38} now {current['execution_ms']:>10.3f}ms "
+                    f"{', '.join(current['scans'])}"
+                )
+        finally:
+            # Nothing seeded is kept
+            transaction.rollback()
+
+    if args.output:
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "args": {k: v for k, v in vars(args).items() if k != "output"},
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Rule engine benchmark.
+
+Times services.rule_engine.evaluate_rules and services.risk_model.score_risk
+over synthetic corpora (see benchmarks.corpus) and reports throughput in
+sections x rules per second plus p50/p99 latency per document. Results are
+written as JSON (benchmarks/latest.json unless --output says otherwise);
+pass --compare with an earlier file to flag regressions.
+
+Run from apps/api:
+
+    python -m benchmarks.rule_engine_bench --sections 50,500 --rules 10,100
+    python -m benchmarks.rule_engine_bench --compare benchmarks/baseline.json
+    python -m benchmarks.rule_engine_bench --output benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.corpus import build_corpus, build_rules, configs, parse_mix
+from services.risk_model import score_risk
+from services.rule_engine import CompiledRuleSet, evaluate_rules
+
+# The committed baseline is only rewritten when --output names it
+DEFAULT_OUTPUT = "benchmarks/latest.json"
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+            or None
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _as_stored_violations(violations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shape engine output like rows from get_violations_by_processed_id."""
+    created_at = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "rule": v.get("rule"),
+            "severity": v.get("severity"),
+            "details": {
+                "rule_id": v.get("rule_id"),
+                "confidence": v.get("confidence"),
+                "location": v.get("location"),
+            },
+            "created_at": created_at,
+        }
+        for v in violations
+    ]
+
+
+def run_config(
+    section_count: int,
+    section_length: int,
+    rule_count: int,
+    mix: Dict[str, float],
+    documents: int,
+    repeat: int,
+    seed: int,
+    semantic_backend: Optional[str],
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    rules = build_rules(rule_count, mix, rng)
+    corpus = build_corpus(documents, section_count, section_length, seed)
+
+    started = time.perf_counter()
+    rule_set = CompiledRuleSet(rules)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    # Warm up lazily built state (route memo, regex sandbox worker)
+    evaluate_rules(rule_set, corpus[0], semantic_backend=semantic_backend)
+
+    evaluate_samples: List[float] = []
+    risk_samples: List[float] = []
+    violation_count = 0
+    for _ in range(repeat):
+        for sections in corpus:
+            started = time.perf_counter()
+            violations = evaluate_rules(
+                rule_set, sections, semantic_backend=semantic_backend
+            )
+            evaluate_samples.append(time.perf_counter() - started)
+            violation_count += len(violations)
+
+            stored = _as_stored_violations(violations)
+            started = time.perf_counter()
+            score_risk(stored)
+            risk_samples.append(time.perf_counter() - started)
+
+    total_seconds = sum(evaluate_samples)
+    work = section_count * len(rule_set) * len(evaluate_samples)
+    return {
+        "sections": section_count,
+        "section_length": section_length,
+        "rules": rule_count,
+        "rule_mix": {kind: round(share, 3) for kind, share in mix.items()},
+        "documents": documents,
+        "repeat": repeat,
+        "compile_ms": round(compile_ms, 3),
+        "violations_per_document": round(violation_count / len(evaluate_samples), 2),
+        "evaluate": {
+            **_latency_summary(evaluate_samples),
+            "section_rules_per_second": round(work / total_seconds, 1)
+            if total_seconds
+            else None,
+        },
+        "score_risk": _latency_summary(risk_samples),
+    }
+
+
+def _config_key(result: Dict[str, Any]) -> tuple:
+    return (
+        result["sections"],
+        result["section_length"],
+        result["rules"],
+        tuple(sorted(result["rule_mix"].items())),
+    )
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Human-readable regressions against a baseline run."""
+    previous = {_config_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(_config_key(result))
+        if before is None:
+            continue
+        label = (
+            f"sections={result['sections']} length={result['section_length']} "
+            f"rules={result['rules']}"
+        )
+        for section, metric in (
+            ("evaluate", "p50_ms"),
+            ("evaluate", "p99_ms"),
+            ("score_risk", "p50_ms"),
+        ):
+            old, new = before[section][metric], result[section][metric]
+            if old and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{label}: {section}.{metric} {old} -> {new} "
+                    f"(+{(new / old - 1) * 100:.0f}%)"
+                )
+        old = before["evaluate"].get("section_rules_per_second")
+        new = result["evaluate"].get("section_rules_per_second")
+        if old and new and new < old * (1 - tolerance):
+            regressions.append(
+                f"{label}: section_rules_per_second {old} -> {new} "
+                f"({(new / old - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sections", type=_int_list, default=[50, 500])
+    parser.add_argument("--section-length", type=_int_list, default=[120, 600])
+    parser.add_argument("--rules", type=_int_list, default=[10, 100])
+    parser.add_argument(
+        "--mix", default="6:3:1", help="keyword:regex:semantic weights (default 6:3:1)"
+    )
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--semantic-backend",
+        choices=["vector", "legacy"],
+        default=None,
+        help="override SEMANTIC_BACKEND for the run",
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown before a metric counts as a regression (default 0.2)",
+    )
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    # Read the baseline before anything is written, and never compare a
+    # run against itself
+    baseline = None
+    if args.compare:
+        if os.path.realpath(args.compare) == os.path.realpath(args.output):
+            parser.error("--output must not be the --compare baseline")
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+
+    results = []
+    for section_count, section_length, rule_count in configs(
+        args.sections, args.section_length, args.rules
+    ):
+        result = run_config(
+            section_count,
+            section_length,
+            rule_count,
+            mix,
+            args.documents,
+            args.repeat,
+            args.seed,
+            args.semantic_backend,
+        )
+        results.append(result)
+        evaluate = result["evaluate"]
+        print(
+            f"sections={section_count:>5} length={section_length:>5} "
+            f"rules={rule_count:>4}  p50={evaluate['p50_ms']:>9.3f}ms "
+            f"p99={evaluate['p99_ms']:>9.3f}ms  "
+            f"{evaluate['section_rules_per_second']:>12,.0f} section-rules/s  "
+            f"score_risk p50={result['score_risk']['p50_ms']:.3f}ms"
+        )
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
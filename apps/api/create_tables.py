@@ -6,8 +6,10 @@ you may need to run migrations (e.g., migrate_add_reports_updated_at.py)
 to add new columns to existing tables.
 """
 
+import os
+
 from db import engine
-from models import Base
+from models import Base, SectionEmbedding
 from sqlalchemy import inspect, text
 
 
@@ -62,6 +64,8 @@ def ensure_raw_data_columns():
         alterations.append("ADD COLUMN file_type VARCHAR NULL")
     if "source" not in columns:
         alterations.append("ADD COLUMN source VARCHAR NULL")
+    if "blob_digest" not in columns:
+        alterations.append("ADD COLUMN blob_digest VARCHAR(64) NULL")
 
     if alterations:
         print("Adding missing metadata columns to 'raw_data' table...")
@@ -70,8 +74,66 @@ def ensure_raw_data_columns():
         print("✓ Added raw_data metadata columns.")
 
 
+def ensure_adk_run_columns():
+    """Batch ids and rule-set versions on adk_runs, for batch progress and upload dedup."""
+    if not table_exists("adk_runs"):
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE adk_runs "
+                "ADD COLUMN IF NOT EXISTS batch_id VARCHAR(32) NULL, "
+                "ADD COLUMN IF NOT EXISTS rule_set_version VARCHAR(16) NULL"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_adk_runs_batch_id ON adk_runs (batch_id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_adk_runs_raw_id_rule_set_version "
+                "ON adk_runs (raw_id, rule_set_version)"
+            )
+        )
+
+
+def ensure_blob_digest_columns():
+    """Blob store digests on processed_data, and lookups by digest."""
+    if table_exists("processed_data"):
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "ALTER TABLE processed_data "
+                    "ADD COLUMN IF NOT EXISTS blob_digest VARCHAR(64) NULL"
+                )
+            )
+    with engine.begin() as conn:
+        for table in ("raw_data", "processed_data"):
+            if table_exists(table):
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_blob_digest "
+                        f"ON {table} (blob_digest)"
+                    )
+                )
+
+
+def ensure_violation_retired_column():
+    """Violations retired by rule re-evaluation are kept, marked retired_at."""
+    if table_exists("violations"):
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "ALTER TABLE violations "
+                    "ADD COLUMN IF NOT EXISTS retired_at TIMESTAMPTZ NULL"
+                )
+            )
+
+
 def ensure_policy_rule_columns():
-    """Ensure policy_rules table has pattern column."""
+    """Ensure policy_rules table has pattern and quarantine columns."""
     if not table_exists("policy_rules"):
         return
 
@@ -90,6 +152,20 @@ def ensure_policy_rule_columns():
             )
         print("✓ Added 'pattern' column to 'policy_rules' table.")
 
+    for column in ("timeout_count", "quarantined"):
+        if column not in columns:
+            print(f"Adding missing '{column}' column to 'policy_rules' table...")
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"""
+                    ALTER TABLE policy_rules
+                    ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0
+                """
+                    )
+                )
+            print(f"✓ Added '{column}' column to 'policy_rules' table.")
+
 
 def ensure_org_workspace_tables():
     """Ensure orgs and workspaces tables exist for multi-tenant data."""
@@ -144,6 +220,62 @@ def ensure_dashboard_indexes():
             )
 
 
+def ensure_pgvector_extension():
+    """Enable pgvector before creating tables that use vector columns."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+
+
+def ensure_section_embedding_indexes():
+    """Create the HNSW index that serves semantic nearest-neighbour queries."""
+    if not table_exists("section_embeddings"):
+        return
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+            CREATE INDEX IF NOT EXISTS ix_section_embeddings_embedding_hnsw
+            ON section_embeddings USING hnsw (embedding vector_cosine_ops)
+        """
+            )
+        )
+
+
+def ensure_section_match_cache_indexes():
+    """Unique cache key so concurrent writers can insert with ON CONFLICT DO NOTHING."""
+    if not table_exists("section_match_cache"):
+        return
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_section_match_cache_key
+            ON section_match_cache (fingerprint, rule_set_version, route_key)
+        """
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_section_match_cache_created_at ON section_match_cache (created_at)"
+            )
+        )
+
+
+def ensure_policy_rule_stats_indexes():
+    """Unique rule_id so each run can upsert its totals with ON CONFLICT."""
+    if not table_exists("policy_rule_stats"):
+        return
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_policy_rule_stats_rule_id ON policy_rule_stats (rule_id)"
+            )
+        )
+
+
 def ensure_multi_tenant_columns():
     """Ensure org/workspace columns, indexes, and constraints exist."""
     inspector = inspect(engine)
@@ -250,7 +382,331 @@ def ensure_multi_tenant_columns():
                 )
 
 
+# Rows per UPDATE when backfilling a new column on an existing table
+BACKFILL_BATCH_ROWS = int(os.getenv("BACKFILL_BATCH_ROWS", "10000"))
+
+# Integer id stored as text in a JSON payload, or NULL if it is not one
+_JSON_ID = "CASE WHEN {0} ~ '^[0-9]{{1,9}}$' THEN ({0})::integer END"
+
+
+def backfill_in_batches(
+    table: str, assignment: str, condition: str, from_clause: str = ""
+) -> int:
+    """
+    UPDATE {table} SET {assignment} [FROM {from_clause}] WHERE {condition},
+    over ranges of BACKFILL_BATCH_ROWS ids with a commit after each, so no
+    lock is held for long and an interrupted backfill resumes where it
+    stopped. condition must exclude rows already filled.
+    """
+    source = f"{table}, {from_clause}" if from_clause else table
+    with engine.connect() as conn:
+        low, high = conn.execute(
+            text(f"SELECT min({table}.id), max({table}.id) FROM {source} WHERE {condition}")
+        ).one()
+    if low is None:
+        return 0
+
+    from_sql = f" FROM {from_clause}" if from_clause else ""
+    updated = 0
+    for start in range(low, high + 1, BACKFILL_BATCH_ROWS):
+        with engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    f"UPDATE {table} SET {assignment}{from_sql} "
+                    f"WHERE {table}.id >= :start AND {table}.id < :stop AND {condition}"
+                ),
+                {"start": start, "stop": start + BACKFILL_BATCH_ROWS},
+            )
+            updated += result.rowcount
+    return updated
+
+
+def ensure_reference_columns():
+    """
+    processed_id, raw_id and run_id as indexed foreign-key columns instead of
+    ids inside JSON payloads, backfilled from those payloads and adk_runs.
+    Violations written before this have no run_id: which of a document's
+    runs found them cannot be told afterwards.
+    """
+    columns = {
+        "processed_data": [
+            ("raw_id", "raw_data", "CASCADE"),
+            ("run_id", "adk_runs", "SET NULL"),
+        ],
+        "violations": [
+            ("processed_id", "processed_data", "CASCADE"),
+            ("run_id", "adk_runs", "SET NULL"),
+        ],
+        "reports": [
+            ("processed_id", "processed_data", "CASCADE"),
+            ("run_id", "adk_runs", "SET NULL"),
+        ],
+    }
+    inspector = inspect(engine)
+    for table, references in columns.items():
+        if not table_exists(table):
+            continue
+        # create_all names the constraints itself on new databases
+        constrained = {
+            tuple(fk["constrained_columns"]) for fk in inspector.get_foreign_keys(table)
+        }
+        with engine.begin() as conn:
+            for column, ref_table, on_delete in references:
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table} "
+                        f"ADD COLUMN IF NOT EXISTS {column} INTEGER NULL"
+                    )
+                )
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} "
+                        f"ON {table} ({column})"
+                    )
+                )
+                name = f"fk_{table}_{column}_{ref_table}"
+                if (column,) not in constrained:
+                    # Checked by VALIDATE below, without blocking writes
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+                            f"FOREIGN KEY ({column}) REFERENCES {ref_table}(id) "
+                            f"ON DELETE {on_delete} NOT VALID"
+                        )
+                    )
+
+    if table_exists("adk_runs"):
+        with engine.begin() as conn:
+            for column in ("processed_id", "report_id"):
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_adk_runs_{column} "
+                        f"ON adk_runs ({column})"
+                    )
+                )
+
+    backfills = [
+        (
+            "processed_data",
+            "raw_id = raw_data.id",
+            "processed_data.raw_id IS NULL AND raw_data.id = "
+            + _JSON_ID.format("processed_data.structured ->> 'raw_id'"),
+            "raw_data",
+        ),
+        (
+            "violations",
+            "processed_id = processed_data.id",
+            "violations.processed_id IS NULL AND processed_data.id = "
+            + _JSON_ID.format("violations.details ->> 'processed_id'"),
+            "processed_data",
+        ),
+        (
+            "reports",
+            "processed_id = processed_data.id",
+            "reports.processed_id IS NULL AND processed_data.id = "
+            + _JSON_ID.format("reports.content ->> 'processed_id'"),
+            "processed_data",
+        ),
+        # A document reused by retries keeps the run that built it
+        (
+            "processed_data",
+            "run_id = (SELECT min(a.id) FROM adk_runs a "
+            "WHERE a.processed_id = processed_data.id)",
+            "processed_data.run_id IS NULL AND EXISTS (SELECT 1 FROM adk_runs a "
+            "WHERE a.processed_id = processed_data.id)",
+            "",
+        ),
+        (
+            "reports",
+            "run_id = (SELECT min(a.id) FROM adk_runs a WHERE a.report_id = reports.id)",
+            "reports.run_id IS NULL AND EXISTS (SELECT 1 FROM adk_runs a "
+            "WHERE a.report_id = reports.id)",
+            "",
+        ),
+    ]
+    for table, assignment, condition, from_clause in backfills:
+        if not table_exists(table):
+            continue
+        updated = backfill_in_batches(table, assignment, condition, from_clause)
+        if updated:
+            print(f"✓ Backfilled {updated} rows of '{table}'.")
+
+    with engine.begin() as conn:
+        unvalidated = conn.execute(
+            text(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' AND NOT convalidated AND conname = ANY(:names)"
+            ),
+            {
+                "names": [
+                    f"fk_{table}_{column}_{ref_table}"
+                    for table, references in columns.items()
+                    for column, ref_table, _ in references
+                ]
+            },
+        ).all()
+        for table, name in unvalidated:
+            conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+
+# Payload columns stored as jsonb, by table
+JSONB_COLUMNS = {
+    "raw_data": ["content"],
+    "processed_data": ["structured"],
+    "violations": ["details"],
+    "reports": ["content"],
+    "adk_run_steps": ["data"],
+    "agent_logs": ["details"],
+    "section_match_cache": ["hits"],
+    "policy_rules": ["scope"],
+    "policy_rule_versions": ["content_snapshot"],
+    "policy_rule_audit": ["changes"],
+}
+
+# json to jsonb; jsonb cannot store NUL, so \u0000 escapes are dropped
+_TO_JSONB = (
+    r"CASE WHEN {0}::text LIKE '%\\u0000%' "
+    r"THEN regexp_replace({0}::text, '(?<!\\)((\\\\)*)\\u0000', '\1', 'g')::jsonb "
+    r"ELSE {0}::jsonb END"
+)
+
+# Longest wait for the lock that swaps a converted column in
+JSONB_SWAP_LOCK_TIMEOUT = os.getenv("JSONB_SWAP_LOCK_TIMEOUT", "5s")
+
+
+def _column_types(table: str) -> dict:
+    inspector = inspect(engine)
+    return {
+        col["name"]: (col["type"].__class__.__name__.lower(), col["nullable"])
+        for col in inspector.get_columns(table)
+    }
+
+
+def convert_json_column(table: str, column: str, not_null: bool) -> None:
+    """
+    Convert a json column to jsonb without rewriting the table under an
+    exclusive lock: a trigger fills a jsonb shadow column on every write,
+    backfill_in_batches converts the existing rows, and one short
+    transaction swaps the shadow column in. Safe to rerun after an
+    interruption.
+    """
+    shadow = f"{column}_jsonb"
+    sync = f"{table}_{column}_jsonb_sync"
+    check = f"ck_{table}_{shadow}_not_null"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {shadow} jsonb"))
+        conn.execute(
+            text(
+                f"CREATE OR REPLACE FUNCTION {sync}() RETURNS trigger "
+                f"LANGUAGE plpgsql AS $$ BEGIN "
+                f"NEW.{shadow} := {_TO_JSONB.format(f'NEW.{column}')}; "
+                f"RETURN NEW; END $$"
+            )
+        )
+        conn.execute(
+            text(
+                f"CREATE OR REPLACE TRIGGER {sync} "
+                f"BEFORE INSERT OR UPDATE OF {column} ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {sync}()"
+            )
+        )
+
+    updated = backfill_in_batches(
+        table,
+        f"{shadow} = {_TO_JSONB.format(f'{table}.{column}')}",
+        f"{table}.{shadow} IS NULL AND {table}.{column} IS NOT NULL",
+    )
+    if updated:
+        print(f"✓ Converted {updated} rows of '{table}.{column}' to jsonb.")
+
+    if not_null:
+        # Validated without blocking writes; SET NOT NULL then skips its scan
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}"))
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table} "
+                    f"ADD CONSTRAINT {check} CHECK ({shadow} IS NOT NULL) NOT VALID"
+                )
+            )
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}"))
+
+    with engine.begin() as conn:
+        conn.execute(text(f"SET LOCAL lock_timeout = '{JSONB_SWAP_LOCK_TIMEOUT}'"))
+        conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"DROP TRIGGER {sync} ON {table}"))
+        conn.execute(text(f"DROP FUNCTION {sync}()"))
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {shadow} TO {column}"))
+        if not_null:
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL"))
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {check}"))
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {table} ({column})"))
+    print(f"✓ '{table}.{column}' is jsonb.")
+
+
+def ensure_jsonb_columns():
+    """Move payload columns created as json to jsonb, one column at a time."""
+    for table, columns in JSONB_COLUMNS.items():
+        if not table_exists(table):
+            continue
+        types = _column_types(table)
+        for column in columns:
+            if column not in types:
+                continue
+            type_name, nullable = types[column]
+            if type_name != "json":
+                continue
+            convert_json_column(table, column, not_null=not nullable)
+
+
+def create_index_concurrently(name: str, table: str, definition: str) -> None:
+    """
+    CREATE INDEX CONCURRENTLY, which does not block writes. A build that
+    failed half way leaves an invalid index behind; it is dropped and
+    built again.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        valid = conn.execute(
+            text(
+                "SELECT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ),
+            {"name": name},
+        ).scalar()
+        if valid:
+            return
+        if valid is not None:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY {name} ON {table} {definition}"))
+
+
+def ensure_jsonb_indexes():
+    """Expression indexes for the filters on jsonb payload fields."""
+    # Delta re-evaluation: one rule's violations in one document
+    if table_exists("violations"):
+        create_index_concurrently(
+            "ix_violations_processed_id_rule_id",
+            "violations",
+            "(processed_id, (details -> 'rule_id'))",
+        )
+    # Dashboard report list filtered by risk tier, newest first
+    if table_exists("reports"):
+        create_index_concurrently(
+            "ix_reports_workspace_risk_tier",
+            "reports",
+            "(workspace_id, lower(content ->> 'risk_tier'), created_at)",
+        )
+
+
 if __name__ == "__main__":
+    # Only the pgvector backend has vector columns; they need the extension
+    # before create_all
+    if SectionEmbedding is not None:
+        ensure_pgvector_extension()
+
     # Create all tables
     Base.metadata.create_all(bind=engine)
     print("✓ Tables created/verified")
@@ -259,10 +715,19 @@ if __name__ == "__main__":
     try:
         ensure_reports_updated_at_column()
         ensure_raw_data_columns()
+        ensure_blob_digest_columns()
+        ensure_adk_run_columns()
+        ensure_violation_retired_column()
         ensure_policy_rule_columns()
         ensure_org_workspace_tables()
         ensure_dashboard_indexes()
         ensure_multi_tenant_columns()
+        ensure_section_embedding_indexes()
+        ensure_section_match_cache_indexes()
+        ensure_policy_rule_stats_indexes()
+        ensure_reference_columns()
+        ensure_jsonb_columns()
+        ensure_jsonb_indexes()
     except Exception as e:
         # If table doesn't exist yet, that's fine - create_all will create it with the column
         msg = str(e).lower()
@@ -4,6 +4,7 @@ from adk.tools.db_tools import (
     create_violation,
     get_policy_rules,
     get_raw_data_by_id,
+    get_raw_text,
     get_violations_by_processed_id,
     log_agent_action,
     update_adk_run,
@@ -24,6 +25,7 @@ compliance_agent = LlmAgent(
         create_report,
         get_policy_rules,
         get_raw_data_by_id,
+        get_raw_text,
         get_violations_by_processed_id,
         log_agent_action,
         update_report,
@@ -40,7 +42,7 @@ Run the pipeline using tools ONLY.
 
 2) Build structured data (IMPORTANT: structured dict MUST include raw_id):
    - raw_id: raw_id (REQUIRED: must be included in structured dict)
-   - full_content: string extracted from raw_data.content (handle dict {"raw_text": ...} or string)
+   - full_content: get_raw_text(raw_id)["text"] (uploads are kept in the blob store, not in raw_data.content)
    - length: len(full_content)
    - content_preview: first 200 chars (or "preview" key)
    - processed_at: ISO timestamp
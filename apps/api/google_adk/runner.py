@@ -141,7 +141,6 @@ async def run_google_adk_compliance(
         from adk.tools.db_tools import get_violations_by_processed_id
         from db import SessionLocal
         from models import ADKRun, ProcessedData, Report
-        from sqlalchemy import text as sql_text
         from sqlalchemy.orm import Session
 
         db: Session = SessionLocal()
@@ -175,15 +174,11 @@ async def run_google_adk_compliance(
                     }
 
             # 2) Query ProcessedData created during this run AND matching raw_id
-            # Since ProcessedData has no raw_id column, filter by structured->>'raw_id' = raw_id
-            # Use parameterized query for safety (raw_id is int, but still use params)
             processed = (
                 db.query(ProcessedData)
                 .filter(
+                    ProcessedData.raw_id == raw_id,
                     ProcessedData.created_at >= run_start_time,
-                    sql_text(
-                        "processed_data.structured->>'raw_id' = :raw_id_val"
-                    ).params(raw_id_val=str(raw_id)),
                 )
                 .order_by(ProcessedData.id.desc())
                 .first()
@@ -199,21 +194,16 @@ async def run_google_adk_compliance(
                     )
 
                     # Find report for this processed_id created during this run
-                    candidate_reports = (
+                    report = (
                         db.query(Report)
-                        .filter(Report.created_at >= run_start_time)
+                        .filter(
+                            Report.processed_id == processed_id,
+                            Report.created_at >= run_start_time,
+                        )
                         .order_by(Report.id.desc())
-                        .all()
+                        .first()
                     )
-                    report_id = None
-                    for r in candidate_reports:
-                        content = r.content or {}
-                        if (
-                            isinstance(content, dict)
-                            and content.get("processed_id") == processed_id
-                        ):
-                            report_id = r.id
-                            break
+                    report_id = report.id if report is not None else None
                     risk_score = (
                         min(violation_count * 10, 100) if violation_count > 0 else 0
                     )
@@ -272,21 +262,16 @@ async def run_google_adk_compliance(
                         len(violations) if isinstance(violations, list) else 0
                     )
 
-                    candidate_reports = (
+                    report = (
                         db.query(Report)
-                        .filter(Report.created_at >= run_start_time)
+                        .filter(
+                            Report.processed_id == processed_id,
+                            Report.created_at >= run_start_time,
+                        )
                         .order_by(Report.id.desc())
-                        .all()
+                        .first()
                     )
-                    report_id = None
-                    for r in candidate_reports:
-                        content = r.content or {}
-                        if (
-                            isinstance(content, dict)
-                            and content.get("processed_id") == processed_id
-                        ):
-                            report_id = r.id
-                            break
+                    report_id = report.id if report is not None else None
                     risk_score = (
                         min(violation_count * 10, 100) if violation_count > 0 else 0
                     )
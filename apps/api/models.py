@@ -1,10 +1,17 @@
+import os
 from datetime import datetime, timezone
+from typing import Any
 
-from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Integer, String
+from services.semantic_matcher import SEMANTIC_BACKEND
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+# pgvector ANN indexes (hnsw/ivfflat) support at most 2000 dimensions.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1024"))
+
 
 class Org(Base):
     __tablename__ = "orgs"
@@ -42,10 +49,12 @@ class RawData(Base):
         nullable=False,
         index=True,
     )
-    content = Column(JSON, nullable=False)
+    content = Column(JSONB, nullable=False)
     file_name = Column(String, nullable=True)
     file_type = Column(String, nullable=True)
     source = Column(String, nullable=True)
+    # sha256 of the uploaded file in the blob store; null for inline content
+    blob_digest = Column(String(64), nullable=True, index=True)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -64,7 +73,72 @@ class ProcessedData(Base):
         nullable=False,
         index=True,
     )
-    structured = Column(JSON, nullable=False)
+    raw_id = Column(
+        Integer,
+        ForeignKey("raw_data.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    # Run that built it; null for rows written outside a workflow run
+    run_id = Column(
+        Integer, ForeignKey("adk_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    structured = Column(JSONB, nullable=False)
+    blob_digest = Column(String(64), nullable=True, index=True)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+# The section index, its vector column and the pgvector extension exist
+# only with SEMANTIC_BACKEND=pgvector; other backends need neither
+SectionEmbedding: Any = None
+
+if SEMANTIC_BACKEND == "pgvector":
+    from pgvector.sqlalchemy import Vector
+
+    class SectionEmbedding(Base):
+        __tablename__ = "section_embeddings"
+
+        id = Column(Integer, primary_key=True)
+        org_id = Column(
+            Integer,
+            ForeignKey("orgs.id", ondelete="RESTRICT"),
+            nullable=False,
+            index=True,
+        )
+        workspace_id = Column(
+            Integer,
+            ForeignKey("workspaces.id", ondelete="RESTRICT"),
+            nullable=False,
+            index=True,
+        )
+        processed_id = Column(
+            Integer,
+            ForeignKey("processed_data.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        )
+        chunk_id = Column(String, nullable=True)
+        label = Column(String, nullable=True)
+        section_index = Column(Integer, nullable=True)
+        preview = Column(String, nullable=True)
+        embedder = Column(String, nullable=False, default="hashing")
+        embedding = Column(Vector(EMBEDDING_DIMENSIONS), nullable=False)
+        created_at = Column(
+            DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+        )
+
+
+class SectionMatchCacheEntry(Base):
+    __tablename__ = "section_match_cache"
+
+    id = Column(Integer, primary_key=True)
+    # sha256 prefix of the section text, not tied to any document
+    fingerprint = Column(String, nullable=False)
+    rule_set_version = Column(String, nullable=False)
+    route_key = Column(String, nullable=False)
+    hits = Column(JSONB, nullable=False)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -89,23 +163,50 @@ class PolicyRule(Base):
     category = Column(String, nullable=False, default="general")
     pattern_type = Column(String, nullable=False, default="keyword")
     pattern = Column(String, nullable=True)
-    scope = Column(JSON, nullable=True)
+    scope = Column(JSONB, nullable=True)
     remediation = Column(String, nullable=True)
     version = Column(String, nullable=False, default="v1")
     is_active = Column(Integer, nullable=False, default=1)
+    # Regex rules that keep blowing their time budget are quarantined
+    timeout_count = Column(Integer, nullable=False, default=0)
+    quarantined = Column(Integer, nullable=False, default=0)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
     updated_at = Column(DateTime(timezone=True), nullable=True)
 
 
+class PolicyRuleStats(Base):
+    """Running totals of the per-rule cost the compliance checker records."""
+
+    __tablename__ = "policy_rule_stats"
+
+    id = Column(Integer, primary_key=True)
+    rule_id = Column(
+        Integer,
+        ForeignKey("policy_rules.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    org_id = Column(Integer, nullable=True, index=True)
+    workspace_id = Column(Integer, nullable=True, index=True)
+    runs = Column(Integer, nullable=False, default=0)
+    total_wall_ms = Column(Float, nullable=False, default=0.0)
+    max_wall_ms = Column(Float, nullable=False, default=0.0)
+    last_wall_ms = Column(Float, nullable=False, default=0.0)
+    sections_scanned = Column(Integer, nullable=False, default=0)
+    matches = Column(Integer, nullable=False, default=0)
+    cache_hits = Column(Integer, nullable=False, default=0)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class PolicyRuleVersion(Base):
     __tablename__ = "policy_rule_versions"
 
     id = Column(Integer, primary_key=True)
     rule_id = Column(Integer, ForeignKey("policy_rules.id", ondelete="CASCADE"))
     version = Column(String, nullable=False)
-    content_snapshot = Column(JSON, nullable=False)
+    content_snapshot = Column(JSONB, nullable=False)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -118,7 +219,7 @@ class PolicyRuleAudit(Base):
     rule_id = Column(Integer, ForeignKey("policy_rules.id", ondelete="CASCADE"))
     action = Column(String, nullable=False)
     actor = Column(String, nullable=True)
-    changes = Column(JSON, nullable=True)
+    changes = Column(JSONB, nullable=True)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -137,14 +238,27 @@ class Violation(Base):
         nullable=False,
         index=True,
     )
+    processed_id = Column(
+        Integer,
+        ForeignKey("processed_data.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    # Run that found it (for rule re-evaluation, the run that built the
+    # document); null for older rows
+    run_id = Column(
+        Integer, ForeignKey("adk_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
     rule = Column(String, nullable=False)
     severity = Column(String, nullable=False, index=True)
-    details = Column(JSON)
+    details = Column(JSONB)
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         index=True,
     )
+    # Set when a rule re-evaluation no longer finds it; the row stays as history
+    retired_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class Report(Base):
@@ -160,9 +274,18 @@ class Report(Base):
         nullable=False,
         index=True,
     )
+    processed_id = Column(
+        Integer,
+        ForeignKey("processed_data.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    run_id = Column(
+        Integer, ForeignKey("adk_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
     summary = Column(String)
     score = Column(Float)
-    content = Column(JSON)
+    content = Column(JSONB)
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -178,7 +301,7 @@ class AgentLog(Base):
     id = Column(Integer, primary_key=True)
     agent_name = Column(String, nullable=False)
     action = Column(String)
-    details = Column(JSON)
+    details = Column(JSONB)
     created_at = Column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
@@ -190,8 +313,8 @@ class ADKRun(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     raw_id = Column(Integer, nullable=False)
-    processed_id = Column(Integer, nullable=True)
-    report_id = Column(Integer, nullable=True)
+    processed_id = Column(Integer, nullable=True, index=True)
+    report_id = Column(Integer, nullable=True, index=True)
     org_id = Column(
         Integer, ForeignKey("orgs.id", ondelete="RESTRICT"), nullable=False, index=True
     )
@@ -203,6 +326,11 @@ class ADKRun(Base):
     )
 
     status = Column(String, nullable=False)  # queued | processing | completed | failed
+    # Set for runs queued together by POST /upload/batch
+    batch_id = Column(String(32), nullable=True, index=True)
+    # Rule-set fingerprint a full upload run was queued under; duplicate
+    # uploads under the same rules reuse the run
+    rule_set_version = Column(String(16), nullable=True)
     error = Column(String, nullable=True)
     error_code = Column(String, nullable=True)
 
@@ -227,7 +355,7 @@ class ADKRunStep(Base):
     step = Column(String, nullable=False)  # data_engineering, compliance_checking, etc
     status = Column(String, nullable=False)  # started | success | failed | skipped
 
-    data = Column(JSON, nullable=True)
+    data = Column(JSONB, nullable=True)
     error = Column(String, nullable=True)
     error_code = Column(String, nullable=True)
 
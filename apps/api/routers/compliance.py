@@ -2,6 +2,7 @@ from adk.tools.tools_registry import get_adk_tools
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from security import AuthContext, get_auth_context
 from services.compliance_runner import run_compliance_workflow
+from services.triage import EVALUATION_MODES
 
 router = APIRouter(prefix="/compliance", tags=["compliance"])
 tools = get_adk_tools()
@@ -11,8 +12,14 @@ tools = get_adk_tools()
 def run_compliance(
     raw_id: int,
     background_tasks: BackgroundTasks,
+    mode: str = "full",
     auth: AuthContext = Depends(get_auth_context),
 ):
+    if mode not in EVALUATION_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of {', '.join(EVALUATION_MODES)}"
+        )
+
     raw = tools["get_raw_data_by_id"](
         raw_id, org_id=auth.org_id, workspace_id=auth.workspace_id
     )
@@ -28,9 +35,11 @@ def run_compliance(
 
     adk_run = tools["create_adk_run"](raw_id=raw_id, status="queued")
 
-    background_tasks.add_task(run_compliance_workflow, raw_id, adk_run["id"], False)
+    background_tasks.add_task(
+        run_compliance_workflow, raw_id, adk_run["id"], False, mode
+    )
 
-    return {"status": "queued", "run_id": adk_run["id"]}
+    return {"status": "queued", "run_id": adk_run["id"], "mode": mode}
 
 
 @router.post("/retry/{raw_id}")
@@ -1,7 +1,7 @@
 from db import SessionLocal
 from fastapi import APIRouter, Depends
 from models import Report
-from sqlalchemy import String, cast
+from sqlalchemy import String, func, literal_column
 from security import AuthContext, get_auth_context
 
 router = APIRouter(prefix="/dashboard/reports", tags=["dashboard"])
@@ -22,9 +22,10 @@ def list_reports(
             Report.workspace_id == auth.workspace_id,
         )
         if risk_tier:
-            risk_clause = f'%\"risk_tier\": \"{risk_tier}\"%'
+            # Case-insensitive, served by ix_reports_workspace_risk_tier
             query_builder = query_builder.filter(
-                cast(Report.content, String).ilike(risk_clause)
+                func.lower(literal_column("reports.content ->> 'risk_tier'", String))
+                == risk_tier.lower()
             )
         if query:
             query_builder = query_builder.filter(Report.summary.ilike(f"%{query}%"))
@@ -12,6 +12,7 @@ def list_violations(
     limit: int = 50,
     severity: str | None = None,
     query: str | None = None,
+    include_retired: bool = False,
     auth: AuthContext = Depends(get_auth_context),
 ):
     db = SessionLocal()
@@ -21,6 +22,9 @@ def list_violations(
             Violation.org_id == auth.org_id,
             Violation.workspace_id == auth.workspace_id,
         )
+        # Violations a rule re-evaluation retired are history, not findings
+        if not include_retired:
+            query_builder = query_builder.filter(Violation.retired_at.is_(None))
 
         if severity:
             query_builder = query_builder.filter(Violation.severity == severity)
@@ -46,6 +50,9 @@ def list_violations(
                 "created_at": (
                     v.created_at.isoformat() if v.created_at is not None else None
                 ),
+                "retired_at": (
+                    v.retired_at.isoformat() if v.retired_at is not None else None
+                ),
             }
             for v in violations
         ]
@@ -1,9 +1,16 @@
 from typing import Any, Dict, List, Optional
 
 from adk.tools.tools_registry import get_adk_tools
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel, Field
 from security import AuthContext, get_auth_context
+from services.delta_compliance import DELTA_REEVALUATE_ON_UPDATE, reevaluate_policy_rule
+from services.rule_engine import CompiledRuleSet
+from services.semantic_index import (
+    MAX_MATCHES_PER_RULE,
+    index_enabled,
+    semantic_index_violations,
+)
 
 router = APIRouter(prefix="/policy-rules", tags=["policy-rules"])
 tools = get_adk_tools()
@@ -47,6 +54,28 @@ def list_policy_rules(
     return rules
 
 
+EXPENSIVE_RULE_METRICS = ("avg_wall_ms", "total_wall_ms", "max_wall_ms")
+
+
+@router.get("/stats/expensive")
+def list_expensive_policy_rules(
+    limit: int = 10,
+    metric: str = "avg_wall_ms",
+    auth: AuthContext = Depends(get_auth_context),
+) -> List[Dict[str, Any]]:
+    if metric not in EXPENSIVE_RULE_METRICS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"metric must be one of {', '.join(EXPENSIVE_RULE_METRICS)}",
+        )
+    return tools["list_expensive_policy_rules"](
+        org_id=auth.org_id,
+        workspace_id=auth.workspace_id,
+        limit=max(1, min(limit, 100)),
+        metric=metric,
+    )
+
+
 @router.get("/{rule_id}")
 def get_policy_rule(
     rule_id: int, auth: AuthContext = Depends(get_auth_context)
@@ -69,9 +98,50 @@ def get_policy_rule_versions(
     return versions
 
 
+@router.get("/{rule_id}/stats")
+def get_policy_rule_stats(
+    rule_id: int, auth: AuthContext = Depends(get_auth_context)
+) -> Dict[str, Any]:
+    stats = tools["get_policy_rule_stats"](
+        rule_id, org_id=auth.org_id, workspace_id=auth.workspace_id
+    )
+    if "error" in stats:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return stats
+
+
+@router.get("/{rule_id}/semantic-matches")
+def get_policy_rule_semantic_matches(
+    rule_id: int,
+    limit: int = 50,
+    auth: AuthContext = Depends(get_auth_context),
+) -> List[Dict[str, Any]]:
+    rule = tools["get_policy_rule_by_id"](
+        rule_id, org_id=auth.org_id, workspace_id=auth.workspace_id
+    )
+    if "error" in rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    if rule.get("pattern_type") != "semantic":
+        raise HTTPException(status_code=400, detail="Rule is not a semantic rule")
+    if not index_enabled():
+        raise HTTPException(
+            status_code=400, detail="Semantic index needs SEMANTIC_BACKEND=pgvector"
+        )
+
+    return semantic_index_violations(
+        CompiledRuleSet([{**rule, "is_active": True}]),
+        tools["search_similar_sections"],
+        org_id=auth.org_id,
+        workspace_id=auth.workspace_id,
+        limit=min(limit, MAX_MATCHES_PER_RULE),
+    )
+
+
 @router.post("")
 def create_policy_rule(
-    payload: PolicyRuleCreate, auth: AuthContext = Depends(get_auth_context)
+    payload: PolicyRuleCreate,
+    background_tasks: BackgroundTasks,
+    auth: AuthContext = Depends(get_auth_context),
 ) -> Dict[str, Any]:
     result = tools["create_policy_rule"](
         name=payload.name,
@@ -87,6 +157,10 @@ def create_policy_rule(
         workspace_id=auth.workspace_id,
         actor=payload.actor,
     )
+    if result.get("error") == "invalid_pattern":
+        raise HTTPException(status_code=400, detail=result["detail"])
+    # Cached hits of the previous rule-set version are dead weight now
+    background_tasks.add_task(tools["prune_section_match_cache"])
     return result
 
 
@@ -94,6 +168,7 @@ def create_policy_rule(
 def update_policy_rule(
     rule_id: int,
     payload: PolicyRuleUpdate,
+    background_tasks: BackgroundTasks,
     auth: AuthContext = Depends(get_auth_context),
 ) -> Dict[str, Any]:
     updates = payload.model_dump(exclude_unset=True)
@@ -109,14 +184,49 @@ def update_policy_rule(
         org_id=auth.org_id,
         workspace_id=auth.workspace_id,
     )
+    if result.get("error") == "invalid_pattern":
+        raise HTTPException(status_code=400, detail=result["detail"])
     if "error" in result:
         raise HTTPException(status_code=404, detail="Rule not found")
+    background_tasks.add_task(tools["prune_section_match_cache"])
+
+    # Bring stored violations in line with the new version of this rule
+    # only, and only when what it matches changed
+    if DELTA_REEVALUATE_ON_UPDATE and result.get("matching_changed"):
+        background_tasks.add_task(
+            reevaluate_policy_rule,
+            rule_id,
+            org_id=auth.org_id,
+            workspace_id=auth.workspace_id,
+        )
     return result
 
 
+@router.post("/{rule_id}/reevaluate")
+def reevaluate_policy_rule_endpoint(
+    rule_id: int,
+    background_tasks: BackgroundTasks,
+    auth: AuthContext = Depends(get_auth_context),
+) -> Dict[str, Any]:
+    rule = tools["get_policy_rule_by_id"](
+        rule_id, org_id=auth.org_id, workspace_id=auth.workspace_id
+    )
+    if "error" in rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+
+    background_tasks.add_task(
+        reevaluate_policy_rule,
+        rule_id,
+        org_id=auth.org_id,
+        workspace_id=auth.workspace_id,
+    )
+    return {"rule_id": rule_id, "version": rule.get("version"), "status": "queued"}
+
+
 @router.delete("/{rule_id}")
 def deactivate_policy_rule(
     rule_id: int,
+    background_tasks: BackgroundTasks,
     actor: Optional[str] = None,
     auth: AuthContext = Depends(get_auth_context),
 ) -> Dict[str, Any]:
@@ -125,4 +235,15 @@ def deactivate_policy_rule(
     )
     if "error" in result:
         raise HTTPException(status_code=404, detail="Rule not found")
+    if result.get("matching_changed"):
+        background_tasks.add_task(tools["prune_section_match_cache"])
+
+    # An inactive rule matches nothing, so this retires its violations
+    if DELTA_REEVALUATE_ON_UPDATE and result.get("matching_changed"):
+        background_tasks.add_task(
+            reevaluate_policy_rule,
+            rule_id,
+            org_id=auth.org_id,
+            workspace_id=auth.workspace_id,
+        )
     return result
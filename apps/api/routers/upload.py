@@ -1,15 +1,32 @@
-import csv
-import json
-from io import StringIO
-from typing import cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 from adk.tools.tools_registry import get_adk_tools
 from db import SessionLocal
-from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    UploadFile,
+)
 from models import RawData
 from security import AuthContext, get_auth_context
-from services.compliance_runner import run_compliance_workflow
+from services.compliance_runner import run_compliance_batch, run_compliance_workflow
+from services.compression import CorruptUpload
+from services.ingest import UploadTooLarge, build_raw_content, store_stream
+from services.rule_engine import rule_set_fingerprint
+from services.triage import EVALUATION_MODES
+from services.upload_batch import (
+    UPLOAD_BATCH_MAX_FILES,
+    BatchCollector,
+    BatchError,
+    spool_body,
+)
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as FormFile
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 tools = get_adk_tools()
@@ -23,40 +40,91 @@ def get_db():
         db.close()
 
 
+def _validate_mode(mode: str) -> None:
+    if mode not in EVALUATION_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of {', '.join(EVALUATION_MODES)}"
+        )
+
+
+def _rule_set_version(auth: AuthContext) -> str:
+    return rule_set_fingerprint(
+        tools["get_policy_rules"](org_id=auth.org_id, workspace_id=auth.workspace_id)
+    )
+
+
+def _reused_run(run: Dict[str, Any]) -> Dict[str, Any]:
+    """The ids of an existing run that a duplicate upload is answered with."""
+    return {
+        "raw_data_id": run["raw_id"],
+        "run_id": run["id"],
+        "run_status": run["status"],
+        "processed_id": run["processed_id"],
+        "report_id": run["report_id"],
+        "duplicate": True,
+    }
+
+
+def _reuse_key(content: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Uploads share a run when their bytes and detected file type match."""
+    return content["blob_digest"], content.get("file_type")
+
+
+def _too_large(exc: UploadTooLarge) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds the maximum upload size of {exc.limit} bytes",
+    )
+
+
 @router.post("")
 async def upload_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    mode: str = "full",
+    force: bool = False,
     db: Session = Depends(get_db),
     auth: AuthContext = Depends(get_auth_context),
 ):
-    content = await file.read()
+    _validate_mode(mode)
+    # Copied into the blob store in chunks, decompressing gzip/zstd on the
+    # way; only metadata goes into the row
     file_name = file.filename
-    content_type = file.content_type or ""
-    decoded = content.decode(errors="ignore")
-
-    parsed: dict[str, object] = {
-        "raw_text": decoded,
-        "file_name": file_name,
-        "file_type": "text",
-        "source": "upload",
-    }
+    try:
+        stored = await run_in_threadpool(
+            store_stream,
+            file.file,
+            file_name,
+            file.headers.get("content-encoding", ""),
+        )
+    except UploadTooLarge as exc:
+        raise _too_large(exc)
+    except CorruptUpload as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    parsed = await run_in_threadpool(
+        build_raw_content, stored, file_name, file.content_type or ""
+    )
 
-    if (file_name and file_name.lower().endswith(".csv")) or "csv" in content_type:
-        try:
-            reader = csv.DictReader(StringIO(decoded))
-            rows = [row for row in reader]
-            parsed["file_type"] = "csv"
-            parsed["csv_rows"] = rows
-        except Exception:
-            parsed["file_type"] = "text"
-    else:
-        try:
-            parsed_json = json.loads(decoded)
-            parsed["file_type"] = "json"
-            parsed["parsed_json"] = parsed_json
-        except Exception:
-            parsed["file_type"] = "text"
+    # The same file, read as the same type, under the same rules was already
+    # checked (or is being checked) in this workspace: answer with that run
+    # unless forced
+    rule_set_version = _rule_set_version(auth)
+    if not force:
+        key = _reuse_key(parsed)
+        existing = tools["find_reusable_upload_runs"](
+            [key],
+            rule_set_version,
+            org_id=auth.org_id,
+            workspace_id=auth.workspace_id,
+        ).get(key)
+        if existing:
+            return {
+                "status": "duplicate",
+                **_reused_run(existing),
+                "workflow_started": False,
+                "mode": mode,
+            }
 
     record = RawData(
         org_id=auth.org_id,
@@ -65,6 +133,7 @@ async def upload_file(
         file_name=file_name,
         file_type=parsed.get("file_type"),
         source="upload",
+        blob_digest=stored.digest,
     )
     db.add(record)
     db.commit()
@@ -73,14 +142,20 @@ async def upload_file(
     # After commit/refresh, SQLAlchemy will have populated the integer primary key.
     raw_id = cast(int, record.id)
 
-    # Create an ADK run for this raw record, then start the workflow in the background
-    adk_run = tools["create_adk_run"](raw_id=raw_id, status="queued")
+    # Create an ADK run for this raw record, then start the workflow in the background.
+    # Only full runs are reusable by later duplicates; triage reports are partial.
+    adk_run = tools["create_adk_run"](
+        raw_id=raw_id,
+        status="queued",
+        rule_set_version=rule_set_version if mode == "full" else None,
+    )
 
     background_tasks.add_task(
         run_compliance_workflow,
         raw_id,
         adk_run["id"],
         False,
+        mode,
     )
 
     return {
@@ -88,4 +163,134 @@ async def upload_file(
         "raw_data_id": record.id,
         "run_id": adk_run["id"],
         "workflow_started": True,
+        "mode": mode,
     }
+
+
+def _discard_batch_blobs(collector: BatchCollector) -> None:
+    """Delete the blobs a rejected batch added, unless a stored upload uses one."""
+    if collector.created_digests:
+        collector.discard(
+            keep=tools["find_referenced_blob_digests"](collector.created_digests)
+        )
+
+
+@router.post("/batch")
+async def upload_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    mode: str = "full",
+    force: bool = False,
+    auth: AuthContext = Depends(get_auth_context),
+):
+    """
+    Many files in one request: multipart "files" (zip/tar archives are
+    expanded) or an application/x-ndjson body with one document per line.
+    Files already checked under the current rules, or repeated within the
+    batch, are answered with the existing run unless force is set.
+    """
+    _validate_mode(mode)
+    content_type = request.headers.get("content-type", "")
+    collector = BatchCollector()
+    try:
+        if content_type.startswith("multipart/form-data"):
+            async with request.form(
+                max_files=UPLOAD_BATCH_MAX_FILES, max_fields=UPLOAD_BATCH_MAX_FILES
+            ) as form:
+                for upload in form.getlist("files"):
+                    if isinstance(upload, FormFile):
+                        await run_in_threadpool(collector.add_upload, upload)
+        elif "ndjson" in content_type:
+            body = await spool_body(request.stream())
+            try:
+                await run_in_threadpool(
+                    collector.add_ndjson,
+                    body,
+                    request.headers.get("content-encoding", ""),
+                )
+            finally:
+                body.close()
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Send multipart files or an application/x-ndjson body",
+            )
+    except BaseException as exc:
+        # Nothing of a rejected batch is kept
+        await run_in_threadpool(_discard_batch_blobs, collector)
+        if isinstance(exc, UploadTooLarge):
+            raise _too_large(exc) from exc
+        if isinstance(exc, (BatchError, CorruptUpload)):
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        raise
+
+    if not collector.files:
+        raise HTTPException(status_code=400, detail="Batch contains no files")
+
+    rule_set_version = _rule_set_version(auth)
+    reusable: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+    if not force:
+        reusable = tools["find_reusable_upload_runs"](
+            [_reuse_key(content) for content in collector.files],
+            rule_set_version,
+            org_id=auth.org_id,
+            workspace_id=auth.workspace_id,
+        )
+
+    # Queue each new digest once; a repeat within the batch shares the run of
+    # its first file. plan holds ("new" | "repeat", index into new_files) or
+    # ("reuse", existing run) per file.
+    new_files: List[Dict[str, Any]] = []
+    queued_index: Dict[Tuple[str, Optional[str]], int] = {}
+    plan: List[Tuple[str, Any]] = []
+    for content in collector.files:
+        key = _reuse_key(content)
+        if key in reusable:
+            plan.append(("reuse", reusable[key]))
+        elif key in queued_index and not force:
+            plan.append(("repeat", queued_index[key]))
+        else:
+            queued_index.setdefault(key, len(new_files))
+            plan.append(("new", len(new_files)))
+            new_files.append(content)
+
+    batch: Dict[str, Any] = {"batch_id": None, "files": []}
+    if new_files:
+        batch = tools["create_upload_batch"](
+            files=new_files,
+            org_id=auth.org_id,
+            workspace_id=auth.workspace_id,
+            rule_set_version=rule_set_version if mode == "full" else None,
+        )
+        background_tasks.add_task(run_compliance_batch, batch["files"], mode)
+
+    files = []
+    for content, (kind, ref) in zip(collector.files, plan):
+        if kind == "reuse":
+            files.append({"file_name": content["file_name"], **_reused_run(ref)})
+        elif kind == "repeat":
+            files.append(
+                {**batch["files"][ref], "file_name": content["file_name"], "duplicate": True}
+            )
+        else:
+            files.append(batch["files"][ref])
+
+    return {
+        "status": "stored",
+        "batch_id": batch["batch_id"],
+        "file_count": len(files),
+        "queued_count": len(new_files),
+        "files": files,
+        "workflow_started": bool(new_files),
+        "mode": mode,
+    }
+
+
+@router.get("/batch/{batch_id}")
+def get_upload_batch(batch_id: str, auth: AuthContext = Depends(get_auth_context)):
+    batch = tools["get_upload_batch"](
+        batch_id, org_id=auth.org_id, workspace_id=auth.workspace_id
+    )
+    if "error" in batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
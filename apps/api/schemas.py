@@ -21,6 +21,10 @@ class DocumentSection(BaseModel):
     index: int
     label: str
     text: str
+    fields: Optional[List[str]] = None
+    fingerprint: Optional[str] = None
+    # [start, end, label, offset in row] per row merged into the section
+    spans: Optional[List[List[Any]]] = None
 
 
 class NormalizedFields(BaseModel):
@@ -0,0 +1,146 @@
+"""
+Content-addressed store for uploaded files.
+
+Blobs are kept on local disk under the sha256 digest of their content, so
+raw_data and processed_data rows only carry the digest and file metadata,
+and the same file uploaded twice is stored once. A blob can instead be kept
+gzip- or zstd-compressed, under the same digest: blobs of at least
+BLOB_COMPRESS_MIN_BYTES, and compressed uploads kept as they arrived.
+Uncompressed blobs are read through a read-only memory map, compressed ones
+through a decompressing stream.
+
+BLOB_STORE_DIR must outlive the API processes. Where it cannot (a host with
+an ephemeral disk), BLOB_STORE_PERSISTENT=false keeps each upload's text
+inline in raw_data.content as well, and readers fall back to it once the
+blob is gone.
+"""
+
+import gzip
+import io
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from services.compression import ENCODING_SUFFIXES, open_decompressed
+
+BLOB_STORE_DIR = os.getenv(
+    "BLOB_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "blob_store"),
+)
+# false when BLOB_STORE_DIR does not survive a restart or redeploy
+BLOB_STORE_PERSISTENT = os.getenv("BLOB_STORE_PERSISTENT", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# 0 = never compress
+BLOB_COMPRESS_MIN_BYTES = int(os.getenv("BLOB_COMPRESS_MIN_BYTES", "0"))
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobNotFound(LookupError):
+    def __init__(self, digest: str):
+        super().__init__(f"Blob {digest} not found")
+        self.digest = digest
+
+
+def _blob_path(digest: str) -> str:
+    if not _DIGEST_RE.match(digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return os.path.join(BLOB_STORE_DIR, digest[:2], digest)
+
+
+def staging_file() -> BinaryIO:
+    """A writable temp file on the store's filesystem, for commit_blob."""
+    staging_dir = os.path.join(BLOB_STORE_DIR, "tmp")
+    os.makedirs(staging_dir, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=staging_dir, suffix=".blob", delete=False)
+
+
+def has_blob(digest: str) -> bool:
+    path = _blob_path(digest)
+    return os.path.exists(path) or any(
+        os.path.exists(path + suffix) for suffix in ENCODING_SUFFIXES.values()
+    )
+
+
+def commit_blob(
+    staged_path: str, digest: str, size: int, encoding: Optional[str] = None
+) -> str:
+    """
+    Move a staged file into the store under its digest; consumes the file.
+    encoding says the staged file is already compressed; digest and size are
+    always of the decompressed content.
+    """
+    path = _blob_path(digest)
+    if has_blob(digest):
+        os.unlink(staged_path)
+        return digest
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if encoding:
+        path += ENCODING_SUFFIXES[encoding]
+    elif BLOB_COMPRESS_MIN_BYTES and size >= BLOB_COMPRESS_MIN_BYTES:
+        with staging_file() as compressed:
+            with open(staged_path, "rb") as source, gzip.GzipFile(
+                fileobj=compressed, mode="wb"
+            ) as target:
+                shutil.copyfileobj(source, target)
+        os.unlink(staged_path)
+        staged_path, path = compressed.name, path + ".gz"
+    # Rename within one filesystem, so readers never see a partial blob
+    os.replace(staged_path, path)
+    return digest
+
+
+def put_bytes(data: bytes, digest: str) -> str:
+    with staging_file() as handle:
+        handle.write(data)
+    return commit_blob(handle.name, digest, len(data))
+
+
+def delete_blob(digest: str) -> None:
+    """Remove a blob in whatever encoding it is kept; missing is fine."""
+    path = _blob_path(digest)
+    for candidate in [path] + [path + suffix for suffix in ENCODING_SUFFIXES.values()]:
+        try:
+            os.unlink(candidate)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def open_blob(digest: str) -> Iterator[BinaryIO]:
+    """
+    A read-only binary view of a blob's content with read() and readline():
+    a memory map, or a decompressing stream for compressed blobs.
+    """
+    path = _blob_path(digest)
+    if os.path.exists(path):
+        with open(path, "rb") as handle:
+            # Empty files cannot be mapped
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield io.BytesIO(b"")
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield view
+        return
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if os.path.exists(path + suffix):
+            with open(path + suffix, "rb") as handle:
+                with open_decompressed(handle, encoding) as stream:
+                    yield stream
+            return
+    raise BlobNotFound(digest)
+
+
+def read_blob_text(digest: str, max_chars: int | None = None) -> str:
+    with open_blob(digest) as handle:
+        data = handle.read() if max_chars is None else handle.read(max_chars * 4)
+    text = data.decode(errors="ignore")
+    return text if max_chars is None else text[:max_chars]
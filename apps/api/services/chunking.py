@@ -0,0 +1,165 @@
+"""
+Adaptive chunking of document rows into sections.
+
+Text lines, CSV rows and array entries are often a few dozen characters;
+one section each multiplies the per-section cost of the rule engine and the
+size of ProcessedData.structured. Adjacent rows that route alike (same label
+shape, same CSV columns) are merged into windows of at most
+SECTION_CHUNK_MAX_CHARS characters and, when set, SECTION_CHUNK_MAX_TOKENS
+estimated tokens, joined by newlines. A row longer than a window is split
+into pieces that overlap by SECTION_CHUNK_OVERLAP_CHARS, so a match across
+a cut is still whole in one of them. Each piece's section text also holds
+up to SPLIT_ROW_CONTEXT_CHARS of the row on either side of it, so anchors,
+word boundaries and lookarounds at a cut see the row rather than an edge.
+
+A chunked section keeps a span map, one [start, end, label, offset] entry
+per row: the row's range in the section text, its label and where that
+range starts in the row (non-zero only for the later pieces of a split
+row). A split piece is the one section whose single span does not cover
+its whole text. The rule engine reports every violation against the row
+it is in.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.ingest import Row
+from services.match_cache import content_fingerprint
+from services.scope_router import label_shape
+
+# 0 = one section per row
+SECTION_CHUNK_MAX_CHARS = int(os.getenv("SECTION_CHUNK_MAX_CHARS", "2000"))
+# 0 = bounded by characters only
+SECTION_CHUNK_MAX_TOKENS = int(os.getenv("SECTION_CHUNK_MAX_TOKENS", "0"))
+SECTION_CHUNK_OVERLAP_CHARS = int(os.getenv("SECTION_CHUNK_OVERLAP_CHARS", "200"))
+# Row text kept around a split piece for lookarounds; at least 1, so a cut
+# is never the end of the section text
+SPLIT_ROW_CONTEXT_CHARS = 32
+
+# Rows in a window are joined by this
+ROW_SEPARATOR = "\n"
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+Span = List[Any]
+# (label, text, csv field names, span map or None for a single whole row)
+Chunk = Tuple[str, str, Optional[List[str]], Optional[List[Span]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Word and punctuation count, close to what subword tokenizers give."""
+    return len(_TOKEN.findall(text))
+
+
+def _split_row(
+    label: str, text: str, fields: Optional[List[str]], max_chars: int, overlap: int
+) -> Iterator[Chunk]:
+    step = max(max_chars - min(overlap, max_chars // 2), 1)
+    offset = 0
+    while True:
+        end = min(offset + max_chars, len(text))
+        before = max(offset - SPLIT_ROW_CONTEXT_CHARS, 0)
+        after = min(end + SPLIT_ROW_CONTEXT_CHARS, len(text))
+        start = offset - before
+        yield label, text[before:after], fields, [
+            [start, start + end - offset, label, offset]
+        ]
+        if end >= len(text):
+            return
+        offset += step
+
+
+def chunk_rows(
+    rows: Iterable[Row],
+    max_chars: int = SECTION_CHUNK_MAX_CHARS,
+    max_tokens: int = SECTION_CHUNK_MAX_TOKENS,
+    overlap: int = SECTION_CHUNK_OVERLAP_CHARS,
+) -> Iterator[Chunk]:
+    """
+    Merge adjacent rows into windows, in row order. A window of one row is
+    returned as that row, without a span map.
+    """
+    if max_chars <= 0:
+        for label, text, fields in rows:
+            yield label, text, fields, None
+        return
+
+    window: List[Row] = []
+    window_chars = window_tokens = 0
+    window_route: Any = None
+
+    def flush() -> Iterator[Chunk]:
+        if len(window) == 1:
+            label, text, fields = window[0]
+            yield label, text, fields, None
+        elif window:
+            spans: List[Span] = []
+            parts: List[str] = []
+            start = 0
+            for label, text, _ in window:
+                spans.append([start, start + len(text), label, 0])
+                parts.append(text)
+                start += len(text) + len(ROW_SEPARATOR)
+            first_label, _, fields = window[0]
+            yield first_label, ROW_SEPARATOR.join(parts), fields, spans
+        window.clear()
+
+    for label, text, fields in rows:
+        if len(text) > max_chars:
+            yield from flush()
+            yield from _split_row(label, text, fields, max_chars, overlap)
+            continue
+
+        route = (label_shape(label), tuple(fields or ()))
+        chars = window_chars + len(ROW_SEPARATOR) + len(text) if window else len(text)
+        tokens = estimate_tokens(text) if max_tokens > 0 else 0
+        if window and (
+            route != window_route
+            or chars > max_chars
+            or (max_tokens > 0 and window_tokens + tokens > max_tokens)
+        ):
+            yield from flush()
+            chars = len(text)
+        if not window:
+            window_route = route
+            window_tokens = 0
+        window.append((label, text, fields))
+        window_chars = chars
+        window_tokens += tokens
+    yield from flush()
+
+
+def chunk_fingerprint(text: str, spans: Optional[List[Span]]) -> str:
+    """
+    Content digest of a section. Hits of a chunked section depend on where
+    its rows start and end, so the span bounds are part of it.
+    """
+    if not spans:
+        return content_fingerprint(text)
+    bounds = [[start, end] for start, end, _, _ in spans]
+    return content_fingerprint(f"{text}\x00{json.dumps(bounds)}")
+
+
+def section_rows(sections: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    One section per row: chunked sections are expanded along their span
+    map, keeping the chunk_id and index of the section they are in.
+    """
+    for section in sections:
+        spans = section.get("spans")
+        if not spans:
+            yield section
+            continue
+        text = str(section.get("text", ""))
+        for start, end, label, _ in spans:
+            row = {
+                "chunk_id": section.get("chunk_id"),
+                "index": section.get("index"),
+                "label": label,
+                "text": text[start:end],
+            }
+            if section.get("fields") is not None:
+                row["fields"] = section["fields"]
+            yield row
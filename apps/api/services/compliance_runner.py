@@ -1,4 +1,6 @@
 import asyncio
+import os
+from typing import Dict, List
 
 from adk.tools.tools_registry import get_adk_tools
 from adk.workflows.compliance_workflow import ComplianceReviewWorkflow
@@ -6,6 +8,13 @@ from google_adk.runner import run_google_adk_compliance
 
 tools = get_adk_tools()
 
+# Queue a full pass after a triage run that stopped at the risk cap
+TRIAGE_QUEUE_FULL_RUN = os.getenv("TRIAGE_QUEUE_FULL_RUN", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
 
 def _is_rate_limit_error(error: Exception) -> bool:
     """Check if error is a Google ADK rate limit (429) error."""
@@ -18,13 +27,60 @@ def _is_rate_limit_error(error: Exception) -> bool:
     )
 
 
-def _run_manual_workflow(raw_id: int, run_id: int, is_retry: bool) -> dict:
+def _run_manual_workflow(
+    raw_id: int, run_id: int, is_retry: bool, mode: str = "full"
+) -> dict:
     """Fallback to manual workflow when Google ADK fails."""
     workflow = ComplianceReviewWorkflow()
-    return workflow.run(raw_id=raw_id, run_id=run_id, is_retry=is_retry)
+    return workflow.run(raw_id=raw_id, run_id=run_id, is_retry=is_retry, mode=mode)
+
+
+def _run_triage_workflow(raw_id: int, run_id: int, is_retry: bool) -> None:
+    """
+    Fast-triage run on the manual agents, which can stop at the risk cap.
+
+    A partial result is followed by a full run on the same raw data. It runs
+    after the triage run has been reported, in the same background task, so
+    it never competes with the triage pass for the worker.
+    """
+    tools["update_adk_run"](run_id=run_id, status="processing")
+    try:
+        result = _run_manual_workflow(
+            raw_id=raw_id, run_id=run_id, is_retry=is_retry, mode="triage"
+        )
+    except Exception as e:
+        tools["update_adk_run"](
+            run_id=run_id,
+            status="failed",
+            error=f"Manual workflow exception: {str(e)}",
+            error_code="MANUAL_WORKFLOW_EXCEPTION",
+        )
+        return
+
+    if result.get("status") != "completed" or not result.get("partial"):
+        return
+    if not TRIAGE_QUEUE_FULL_RUN:
+        return
+
+    full_run = tools["create_adk_run"](raw_id=raw_id, status="queued")
+    queued_step = tools["create_adk_run_step"](
+        run_id=run_id,
+        step="full_run_queued",
+        status="success",
+        data={"run_id": full_run["id"]},
+    )
+    if queued_step.get("id"):
+        tools["finish_adk_run_step"](queued_step["id"])
+    run_compliance_workflow(raw_id, full_run["id"], False)
+
 
+def run_compliance_workflow(
+    raw_id: int, run_id: int, is_retry: bool, mode: str = "full"
+) -> None:
+    if mode == "triage":
+        _run_triage_workflow(raw_id, run_id, is_retry)
+        return
 
-def run_compliance_workflow(raw_id: int, run_id: int, is_retry: bool) -> None:
     tools["update_adk_run"](run_id=run_id, status="processing")
     started_step = tools["create_adk_run_step"](
         run_id=run_id,
@@ -230,3 +286,18 @@ def run_compliance_workflow(raw_id: int, run_id: int, is_retry: bool) -> None:
     finally:
         if started_step_id:
             tools["finish_adk_run_step"](started_step_id)
+
+
+def run_compliance_batch(runs: List[Dict], mode: str = "full") -> None:
+    """Workflows for a batch upload, one after another in one background task."""
+    for run in runs:
+        try:
+            run_compliance_workflow(run["raw_data_id"], run["run_id"], False, mode)
+        except Exception as e:
+            # One bad file must not strand the rest of the batch
+            tools["update_adk_run"](
+                run_id=run["run_id"],
+                status="failed",
+                error=f"Workflow exception: {str(e)}",
+                error_code="WORKFLOW_EXCEPTION",
+            )
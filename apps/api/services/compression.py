@@ -0,0 +1,119 @@
+"""
+gzip and zstd detection and streaming decompression for uploads and blobs.
+"""
+
+import gzip
+import io
+import zlib
+from typing import BinaryIO, Optional
+
+import zstandard
+
+# Blob store suffix for a blob kept in each encoding
+ENCODING_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+_MAGIC = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+_FILE_SUFFIXES = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+_CONTENT_ENCODINGS = {"gzip": "gzip", "x-gzip": "gzip", "zstd": "zstd"}
+MAGIC_BYTES = max(len(magic) for magic in _MAGIC.values())
+
+
+class CorruptUpload(ValueError):
+    """Compressed data that does not decompress."""
+
+
+def detect_encoding(
+    head: bytes, file_name: Optional[str] = None, content_encoding: str = ""
+) -> Optional[str]:
+    """
+    "gzip", "zstd" or None, from the Content-Encoding header, then the file
+    extension, then the leading magic bytes.
+    """
+    declared = _CONTENT_ENCODINGS.get(content_encoding.strip().lower())
+    if declared:
+        return declared
+    name = (file_name or "").lower()
+    for suffix, encoding in _FILE_SUFFIXES.items():
+        if name.endswith(suffix):
+            return encoding
+    for encoding, magic in _MAGIC.items():
+        if head.startswith(magic):
+            return encoding
+    return None
+
+
+def strip_encoding_suffix(file_name: Optional[str], encoding: Optional[str]) -> Optional[str]:
+    """report.csv.gz -> report.csv, for file type detection."""
+    if not file_name or not encoding:
+        return file_name
+    for suffix, suffix_encoding in _FILE_SUFFIXES.items():
+        if suffix_encoding == encoding and file_name.lower().endswith(suffix):
+            return file_name[: -len(suffix)]
+    return file_name
+
+
+# Compressed bytes handed to the zstd decompressor per call. One zstd byte
+# can stand for up to ~32 KiB, so this bounds what a single call produces
+_ZSTD_STEP_BYTES = 1024
+_ZSTD_READ_BYTES = 64 * 1024
+
+
+class _ZstdReader(io.RawIOBase):
+    """
+    The frames of a zstd stream one after another. Unlike the library's
+    stream_reader, a stream that ends inside a frame raises ZstdError
+    instead of reading as shorter content.
+    """
+
+    def __init__(self, source: BinaryIO):
+        self._source = source
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._frame = self._decompressor.decompressobj()
+        self._in_frame = False
+        self._input = memoryview(b"")
+        self._output = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._output:
+            if not self._input:
+                self._input = memoryview(self._source.read(_ZSTD_READ_BYTES))
+                if not self._input:
+                    if self._in_frame:
+                        raise zstandard.ZstdError("zstd stream ends inside a frame")
+                    return 0
+            step = bytes(self._input[:_ZSTD_STEP_BYTES])
+            self._input = self._input[_ZSTD_STEP_BYTES:]
+            self._output = memoryview(self._decompress(step))
+        size = min(len(buffer), len(self._output))
+        buffer[:size] = self._output[:size]
+        self._output = self._output[size:]
+        return size
+
+    def _decompress(self, data: bytes) -> bytes:
+        output = []
+        while data:
+            output.append(self._frame.decompress(data))
+            self._in_frame = not self._frame.eof
+            if self._in_frame:
+                break
+            # The frame ended; what follows it starts the next one
+            data = self._frame.unused_data
+            self._frame = self._decompressor.decompressobj()
+        return b"".join(output)
+
+
+def open_decompressed(source: BinaryIO, encoding: str) -> BinaryIO:
+    """The decompressed bytes as a stream with read() and readline()."""
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    if encoding == "zstd":
+        # The raw reader has no readline(); buffering adds it
+        return io.BufferedReader(_ZstdReader(source))
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+# What a truncated or corrupt stream raises from read()
+DECOMPRESSION_ERRORS = (gzip.BadGzipFile, zlib.error, EOFError, zstandard.ZstdError)
@@ -0,0 +1,216 @@
+"""
+Delta compliance: re-check one policy rule against stored documents.
+
+When a rule changes, only that rule is evaluated against the workspace's
+existing ProcessedData sections, in throttled batches. Violations whose
+content is unchanged are left alone; stale ones are retired and new ones
+inserted, and only the reports of documents that actually changed are
+re-scored.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+from adk.agents.report_writer_agent import ReportWriterADKAgent
+from adk.tools.tools_registry import get_adk_tools
+from services.match_cache import match_cache_from_tools
+from services.risk_model import score_risk
+from services.rule_engine import CompiledRuleSet, document_sections, evaluate_rules
+from services.semantic_index import index_enabled, semantic_index_violations
+
+DELTA_BATCH_SIZE = int(os.getenv("DELTA_BATCH_SIZE", "200"))
+# Pause between batches so a large workspace does not starve uploads.
+DELTA_BATCH_PAUSE_SECONDS = float(os.getenv("DELTA_BATCH_PAUSE_SECONDS", "0.05"))
+DELTA_REEVALUATE_ON_UPDATE = (
+    os.getenv("DELTA_REEVALUATE_ON_UPDATE", "true").lower() == "true"
+)
+
+tools = get_adk_tools()
+
+
+def _violation_key(rule: Any, severity: Any, details: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Identity of a violation's content, ignoring its row id and processed_id."""
+    content = {k: v for k, v in (details or {}).items() if k != "processed_id"}
+    return (rule, severity, json.dumps(content, sort_keys=True, default=str))
+
+
+def _detected_violations(
+    rule_set: CompiledRuleSet, processed: Dict[str, Any], match_cache: Any
+) -> List[Dict[str, Any]]:
+    if not rule_set.rules:
+        return []
+
+    detected = evaluate_rules(
+        rule_set, document_sections(processed.get("structured")), match_cache=match_cache
+    )
+    if index_enabled():
+        detected += semantic_index_violations(
+            rule_set,
+            tools["search_similar_sections"],
+            processed_id=processed["id"],
+            org_id=processed.get("org_id"),
+            workspace_id=processed.get("workspace_id"),
+        )
+
+    return [
+        {
+            "rule": match.get("rule") or "unknown",
+            "severity": match.get("severity") or "medium",
+            "details": {
+                "rule_id": match.get("rule_id"),
+                "evidence": match.get("evidence"),
+                "location": match.get("location"),
+                "confidence": match.get("confidence"),
+                "recommended_fix": match.get("recommended_fix"),
+            },
+        }
+        for match in detected
+    ]
+
+
+def _rescore_report(processed_id: int, org_id: int, workspace_id: int) -> int | None:
+    """Recompute score and content of the latest report for a document."""
+    report = tools["get_latest_report_by_processed_id"](
+        processed_id, org_id=org_id, workspace_id=workspace_id
+    )
+    if "error" in report:
+        return None
+
+    violations = tools["get_violations_by_processed_id"](
+        processed_id, org_id=org_id, workspace_id=workspace_id
+    )
+    risk = score_risk(violations)
+    content = report.get("content") if isinstance(report.get("content"), dict) else {}
+    content = {
+        **content,
+        "violation_count": len(violations),
+        "risk_score": risk["score"],
+        "risk_tier": risk["tier"],
+        "risk_breakdown": risk["breakdown"],
+    }
+    tools["update_report"](
+        report_id=report["id"],
+        summary=report.get("summary") or "",
+        content=content,
+        score=risk["score"],
+    )
+    # Rebuild the violation tables, top risks and remediation plan
+    ReportWriterADKAgent().write_report(report["id"], processed_id)
+    return report["id"]
+
+
+def reevaluate_policy_rule(
+    rule_id: int,
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    batch_size: int = DELTA_BATCH_SIZE,
+    pause_seconds: float = DELTA_BATCH_PAUSE_SECONDS,
+) -> Dict[str, Any]:
+    """
+    Re-run a single rule over every processed document in the workspace.
+
+    An inactive (or deactivated) rule detects nothing, so all of its
+    violations are retired.
+    """
+    rule = tools["get_policy_rule_by_id"](
+        rule_id, org_id=org_id, workspace_id=workspace_id
+    )
+    if "error" in rule:
+        return {"error": "policy_rule not found", "rule_id": rule_id}
+    # Only the rule's own tenant is re-checked, and only on that tenant's behalf
+    if (org_id is not None and rule["org_id"] != org_id) or (
+        workspace_id is not None and rule["workspace_id"] != workspace_id
+    ):
+        return {"error": "policy_rule not found", "rule_id": rule_id}
+
+    org_id = rule["org_id"]
+    workspace_id = rule["workspace_id"]
+    rule_set = CompiledRuleSet([rule])
+    match_cache = match_cache_from_tools(tools)
+
+    summary = {
+        "rule_id": rule_id,
+        "version": rule.get("version"),
+        "documents_scanned": 0,
+        "documents_changed": 0,
+        "violations_retired": 0,
+        "violations_inserted": 0,
+        "reports_updated": [],
+    }
+
+    after_id = 0
+    while True:
+        batch = tools["list_processed_data_batch"](
+            org_id=org_id,
+            workspace_id=workspace_id,
+            after_id=after_id,
+            limit=batch_size,
+        )
+        if not batch:
+            break
+
+        for processed in batch:
+            processed_id = processed["id"]
+            summary["documents_scanned"] += 1
+
+            existing: Dict[Tuple[Any, ...], List[int]] = {}
+            for violation in tools["get_violations_by_processed_id"](
+                processed_id,
+                org_id=org_id,
+                workspace_id=workspace_id,
+                rule_id=rule_id,
+            ):
+                details = violation.get("details") or {}
+                key = _violation_key(
+                    violation.get("rule"), violation.get("severity"), details
+                )
+                existing.setdefault(key, []).append(violation["id"])
+
+            inserts = []
+            for violation in _detected_violations(rule_set, processed, match_cache):
+                key = _violation_key(
+                    violation["rule"], violation["severity"], violation["details"]
+                )
+                if existing.get(key):
+                    existing[key].pop()
+                else:
+                    inserts.append(violation)
+            retire_ids = [vid for ids in existing.values() for vid in ids]
+
+            if not retire_ids and not inserts:
+                continue
+
+            result = tools["apply_violation_delta"](
+                processed_id,
+                retire_ids,
+                inserts,
+                org_id=processed.get("org_id"),
+                workspace_id=processed.get("workspace_id"),
+                run_id=processed.get("run_id"),
+            )
+            if "error" in result:
+                continue
+            summary["documents_changed"] += 1
+            summary["violations_retired"] += result["retired"]
+            summary["violations_inserted"] += result["inserted"]
+
+            report_id = _rescore_report(
+                processed_id, processed.get("org_id"), processed.get("workspace_id")
+            )
+            if report_id is not None:
+                summary["reports_updated"].append(report_id)
+
+        after_id = batch[-1]["id"]
+        if len(batch) < batch_size:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    tools["log_agent_action"](
+        agent_name="Delta Compliance",
+        action="reevaluated_policy_rule",
+        details=summary,
+    )
+    return summary
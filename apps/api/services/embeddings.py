@@ -0,0 +1,39 @@
+"""
+Local section embedders for the pgvector semantic index.
+
+The default HashingEmbedder reuses the hashed character-trigram vectors
+from the semantic matcher, so indexing needs no network or model download.
+Another embedder can be plugged in with SECTION_EMBEDDER="module:ClassName";
+it must expose `name`, `dimensions` and `embed(texts) -> np.ndarray` and
+produce vectors of EMBEDDING_DIMENSIONS.
+"""
+
+import importlib
+import os
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+from models import EMBEDDING_DIMENSIONS
+from services.semantic_matcher import embed_texts
+
+
+class HashingEmbedder:
+    name = "hashing"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return embed_texts(texts, self.dimensions)
+
+
+@lru_cache(maxsize=1)
+def get_embedder():
+    path = os.getenv("SECTION_EMBEDDER", "hashing")
+    if path == "hashing":
+        return HashingEmbedder()
+
+    module_name, _, class_name = path.partition(":")
+    embedder_class = getattr(importlib.import_module(module_name), class_name)
+    return embedder_class()
@@ -0,0 +1,433 @@
+"""
+Streaming upload ingestion.
+
+Uploads are copied into the blob store in fixed-size chunks and parsed
+incrementally from it, so memory is bounded by UPLOAD_CHUNK_BYTES and the
+largest single record, not by the file size. gzip and zstd uploads are
+decompressed as they are copied. raw_data.content only keeps the file
+metadata and the blob digest (plus the text inline when the blob store is
+not persistent); the data engineer builds sections straight from the blob.
+"""
+
+import codecs
+import csv
+import io
+import json
+import os
+from contextlib import contextmanager
+from hashlib import sha256
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.blob_store import (
+    BLOB_STORE_PERSISTENT,
+    commit_blob,
+    has_blob,
+    open_blob,
+    read_blob_text,
+    staging_file,
+)
+from services.compression import (
+    DECOMPRESSION_ERRORS,
+    MAGIC_BYTES,
+    CorruptUpload,
+    detect_encoding,
+    open_decompressed,
+    strip_encoding_suffix,
+)
+
+# Each upload still ends up as one list of sections in the worker's memory
+# and one processed_data.structured jsonb value (which cannot exceed 256 MB),
+# so the limit stays well below what those can hold
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(64 * 1024**2)))
+# Text kept inline in raw_data.content when the blob store is not persistent
+UPLOAD_INLINE_MAX_BYTES = int(os.getenv("UPLOAD_INLINE_MAX_BYTES", str(16 * 1024**2)))
+if not BLOB_STORE_PERSISTENT:
+    # Every upload is then copied inline, so that copy bounds the upload
+    UPLOAD_MAX_BYTES = min(UPLOAD_MAX_BYTES, UPLOAD_INLINE_MAX_BYTES)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024**2)))
+# Store gzip/zstd uploads as they arrived instead of decompressed
+UPLOAD_KEEP_COMPRESSED = os.getenv("UPLOAD_KEEP_COMPRESSED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# CSV sections hold one column's cells each instead of whole JSON rows
+CSV_COLUMNAR = os.getenv("CSV_COLUMNAR", "false").lower() in ("1", "true", "yes")
+# Records held at a time while CSV_COLUMNAR regroups them into columns
+CSV_COLUMN_BATCH_ROWS = max(int(os.getenv("CSV_COLUMN_BATCH_ROWS", "1000")), 1)
+
+# (label, text, csv field names)
+Row = Tuple[str, str, Optional[List[str]]]
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit} byte limit")
+        self.limit = limit
+
+
+class StoredUpload:
+    def __init__(
+        self,
+        digest: str,
+        size: int,
+        encoding: Optional[str] = None,
+        compressed_size: Optional[int] = None,
+        created: bool = False,
+    ):
+        # digest and size are of the decompressed content
+        self.digest = digest
+        self.size = size
+        self.encoding = encoding
+        # Whether this upload added the blob, rather than finding it stored
+        self.created = created
+        self.compressed_size = compressed_size
+
+
+class _HeadReader:
+    """A stream whose first bytes were read ahead to sniff its encoding."""
+
+    def __init__(self, head: bytes, source: BinaryIO):
+        self.head = head
+        self.source = source
+
+    def read(self, size: int = -1) -> bytes:
+        if not self.head:
+            return self.source.read(size)
+        head, self.head = self.head, b""
+        if size < 0:
+            return head + self.source.read()
+        if size < len(head):
+            head, self.head = head[:size], head[size:]
+            return head
+        return head + self.source.read(size - len(head))
+
+
+class _TeeReader:
+    """Passes reads through, counting the bytes and copying them to sink."""
+
+    def __init__(self, source: Any, sink: Optional[BinaryIO] = None):
+        self.source = source
+        self.sink = sink
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        self.size += len(data)
+        if self.sink is not None:
+            self.sink.write(data)
+        return data
+
+
+def store_stream(
+    source: BinaryIO,
+    file_name: Optional[str] = None,
+    content_encoding: str = "",
+    max_bytes: int = UPLOAD_MAX_BYTES,
+) -> StoredUpload:
+    """
+    Copy a file into the blob store chunk by chunk, hashing as it goes.
+
+    gzip and zstd input is decompressed on the way, so the size limit, the
+    digest and parsing all apply to the content. With UPLOAD_KEEP_COMPRESSED
+    the compressed bytes are what gets stored.
+    """
+    head = source.read(MAGIC_BYTES)
+    encoding = detect_encoding(head, file_name, content_encoding)
+    keep_compressed = encoding is not None and UPLOAD_KEEP_COMPRESSED
+
+    target = staging_file()
+    raw = _TeeReader(_HeadReader(head, source), target if keep_compressed else None)
+    reader = open_decompressed(raw, encoding) if encoding else raw
+    digest = sha256()
+    size = 0
+    try:
+        with target:
+            for chunk in iter(lambda: reader.read(UPLOAD_CHUNK_BYTES), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                if not keep_compressed:
+                    target.write(chunk)
+            if keep_compressed:
+                # Keep any trailing bytes the decompressor did not need
+                for _ in iter(lambda: raw.read(UPLOAD_CHUNK_BYTES), b""):
+                    pass
+    except DECOMPRESSION_ERRORS as exc:
+        os.unlink(target.name)
+        if encoding is None:
+            # Raised by the source itself, e.g. an archive member
+            raise
+        raise CorruptUpload(f"{file_name or 'Upload'} is not valid {encoding} data") from exc
+    except BaseException:
+        os.unlink(target.name)
+        raise
+    finally:
+        if encoding:
+            reader.close()
+
+    created = not has_blob(digest.hexdigest())
+    stored_digest = commit_blob(
+        target.name,
+        digest.hexdigest(),
+        size,
+        encoding=encoding if keep_compressed else None,
+    )
+    return StoredUpload(
+        stored_digest, size, encoding, raw.size if encoding else None, created
+    )
+
+
+def iter_lines(handle: BinaryIO) -> Iterator[str]:
+    """
+    Lines as str.splitlines() would give them for the whole decoded file,
+    blank lines included, read one newline-terminated piece at a time.
+    """
+    for piece in iter(handle.readline, b""):
+        yield from piece.decode(errors="ignore").splitlines()
+
+
+def iter_csv_rows(handle: BinaryIO) -> Iterator[Dict[str, Any]]:
+    # Keep line terminators, so quoted fields can span lines
+    pieces = (piece.decode(errors="ignore") for piece in iter(handle.readline, b""))
+    yield from csv.DictReader(pieces)
+
+
+def iter_csv_cells(
+    records: Iterable[Any], batch_rows: int = CSV_COLUMN_BATCH_ROWS
+) -> Iterator[Row]:
+    """
+    Cells of CSV records a column at a time, batch_rows records at a time,
+    so each column chunks into contiguous sections that only its scoped
+    rules are routed to. A cell is its row's JSON cut down to that column
+    ({"column": value}), so column names are still scanned, and it keeps
+    its row's csv.row.N label: the rule engine reports a rule once per row,
+    as it does for whole rows.
+    """
+    columns: Dict[Any, List[Tuple[int, str]]] = {}
+
+    def flush() -> Iterator[Row]:
+        for column, cells in columns.items():
+            fields = [str(column)]
+            for index, text in cells:
+                yield f"csv.row.{index}", text, fields
+        columns.clear()
+
+    for index, record in enumerate(records):
+        for key, value in record.items():
+            columns.setdefault(key, []).append((index, json.dumps({key: value})))
+        if (index + 1) % batch_rows == 0:
+            yield from flush()
+    yield from flush()
+
+
+def iter_ndjson(handle: BinaryIO) -> Iterator[Any]:
+    """One JSON value per non-blank line; ValueError on the first bad line."""
+    for line in iter_lines(handle):
+        if line.strip():
+            yield json.loads(line)
+
+
+# Longest token a chunk boundary can cut without the decoder failing at
+# the end of the buffer: -Infinity, a \uXXXX escape, a number's exponent
+_TRUNCATION_SLACK = 16
+
+
+def _truncated(exc: json.JSONDecodeError, length: int) -> bool:
+    """Whether a decode error can be the buffer ending mid-value."""
+    return exc.pos >= length - _TRUNCATION_SLACK or exc.msg.startswith(
+        "Unterminated string"
+    )
+
+
+def iter_json_items(handle: BinaryIO) -> Iterator[Tuple[Any, Any]]:
+    """
+    Top-level (key, value) pairs of a JSON object, or (index, value) of an
+    array, decoded one value at a time. A scalar document yields (None, value).
+    Raises ValueError if the document is not valid JSON.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+    def read_more(buffer: str, size: int = UPLOAD_CHUNK_BYTES) -> Tuple[str, bool]:
+        chunk = handle.read(size)
+        return buffer + text_decoder.decode(chunk, final=not chunk), bool(chunk)
+
+    buffer, more = read_more("")
+
+    def skip_space(position: int) -> int:
+        nonlocal buffer, more
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not more:
+                return position
+            buffer, more = read_more(buffer[position:])
+            position = 0
+
+    def decode(position: int) -> Tuple[Any, int]:
+        # A value can straddle chunks: read on while it does not decode
+        # because the buffer ends, or decodes right up to its end (a number
+        # may continue). An error inside the buffered text is final, so a
+        # text file is rejected from its first chunk. Each read at least
+        # doubles the buffer, keeping a long value linear to decode.
+        nonlocal buffer, more
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                if end < len(buffer) - _TRUNCATION_SLACK or not more:
+                    return value, end
+            except json.JSONDecodeError as exc:
+                if not more or not _truncated(exc, len(buffer)):
+                    raise
+            buffer = buffer[position:]
+            buffer, more = read_more(buffer, max(UPLOAD_CHUNK_BYTES, len(buffer)))
+            position = 0
+
+    def expect(position: int, *tokens: str) -> Tuple[str, int]:
+        position = skip_space(position)
+        if position >= len(buffer) or buffer[position] not in tokens:
+            raise ValueError(f"expected one of {tokens!r} at offset {position}")
+        return buffer[position], position + 1
+
+    position = skip_space(0)
+    if position >= len(buffer):
+        raise ValueError("empty JSON document")
+    opener = buffer[position]
+    if opener not in "[{":
+        value, position = decode(position)
+        if skip_space(position) < len(buffer):
+            raise ValueError("extra data after JSON value")
+        yield None, value
+        return
+
+    closer = "]" if opener == "[" else "}"
+    position = skip_space(position + 1)
+    index = 0
+    if position < len(buffer) and buffer[position] == closer:
+        position += 1
+    else:
+        while True:
+            if opener == "{":
+                key, position = decode(skip_space(position))
+                if not isinstance(key, str):
+                    raise ValueError("object keys must be strings")
+                _, position = expect(position, ":")
+                value, position = decode(skip_space(position))
+                yield key, value
+            else:
+                value, position = decode(skip_space(position))
+                yield index, value
+            index += 1
+            token, position = expect(position, ",", closer)
+            if token == closer:
+                break
+            # Keep the buffer from growing with everything decoded so far
+            buffer, position = buffer[position:], 0
+
+    if skip_space(position) < len(buffer):
+        raise ValueError("extra data after JSON value")
+
+
+def _is_valid(items: Iterator[Any]) -> bool:
+    try:
+        for _ in items:
+            pass
+    except ValueError:
+        return False
+    return True
+
+
+def detect_file_type(digest: str, file_name: Optional[str], content_type: str) -> str:
+    """csv, ndjson, json or text, validating JSON with a streaming pass."""
+    name = (file_name or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    with open_blob(digest) as handle:
+        if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+            return "ndjson" if _is_valid(iter_ndjson(handle)) else "text"
+        return "json" if _is_valid(iter_json_items(handle)) else "text"
+
+
+def build_raw_content(
+    stored: StoredUpload, file_name: Optional[str], content_type: str
+) -> Dict[str, Any]:
+    """raw_data.content for a stored upload: metadata and the blob digest."""
+    content: Dict[str, Any] = {
+        "file_name": file_name,
+        # report.csv.gz is typed as report.csv
+        "file_type": detect_file_type(
+            stored.digest, strip_encoding_suffix(file_name, stored.encoding), content_type
+        ),
+        "source": "upload",
+        "size_bytes": stored.size,
+        "blob_digest": stored.digest,
+    }
+    if stored.encoding:
+        content["content_encoding"] = stored.encoding
+        content["compressed_bytes"] = stored.compressed_size
+    if not BLOB_STORE_PERSISTENT:
+        # The blob may not survive a redeploy; keep the text as uploads
+        # used to
+        content["raw_text"] = read_blob_text(
+            stored.digest, max_chars=UPLOAD_INLINE_MAX_BYTES
+        )
+    return content
+
+
+@contextmanager
+def open_upload(content: Dict[str, Any]) -> Iterator[BinaryIO]:
+    """
+    The blob of an upload, or its inline text when the blob is gone;
+    BlobNotFound when neither is there.
+    """
+    digest = content["blob_digest"]
+    if not has_blob(digest) and isinstance(content.get("raw_text"), str):
+        yield io.BytesIO(content["raw_text"].encode())
+        return
+    with open_blob(digest) as handle:
+        yield handle
+
+
+def iter_blob_rows(content: Dict[str, Any]) -> Iterator[Row]:
+    """
+    Section rows of a blob-backed upload, labelled like inline content.
+
+    Like the inline path, a structured file that yields no rows falls back
+    to one row per non-blank line.
+    """
+    file_type = content.get("file_type")
+
+    found = False
+    with open_upload(content) as handle:
+        if file_type == "csv" and CSV_COLUMNAR:
+            for cell in iter_csv_cells(iter_csv_rows(handle)):
+                found = True
+                yield cell
+        elif file_type == "csv":
+            for index, row in enumerate(iter_csv_rows(handle)):
+                found = True
+                yield (
+                    f"csv.row.{index}",
+                    json.dumps(row),
+                    [str(key) for key in row.keys()],
+                )
+        elif file_type == "ndjson":
+            for index, entry in enumerate(iter_ndjson(handle)):
+                found = True
+                yield f"json[{index}]", f"{entry}", None
+        elif file_type == "json":
+            for key, value in iter_json_items(handle):
+                if key is None:
+                    break
+                found = True
+                label = f"json.{key}" if isinstance(key, str) else f"json[{key}]"
+                yield label, f"{value}", None
+    if found:
+        return
+
+    with open_upload(content) as handle:
+        for index, line in enumerate(iter_lines(handle)):
+            if line.strip():
+                yield f"text.line.{index}", line.strip(), None
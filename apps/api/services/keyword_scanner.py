@@ -0,0 +1,72 @@
+"""
+Multi-keyword scanner (Aho-Corasick).
+
+Finds every keyword of a rule set in a single pass over a section instead of
+one substring search per keyword. The automaton is built once per compiled
+rule set and expects casefolded keywords and casefolded text.
+"""
+
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+class KeywordScanner:
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords: List[str] = list(keywords)
+
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        for pattern_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        # Resolve failure links breadth-first into a full transition table so
+        # the scan loop is a single dict lookup per character.
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs: List[Tuple[int, ...]] = [tuple(o) for o in outputs]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (pattern_id, start) for every keyword occurrence in text."""
+        delta = self._delta
+        outputs = self._outputs
+        keywords = self.keywords
+        state = 0
+        for position, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for pattern_id in outputs[state]:
+                    yield pattern_id, position - len(keywords[pattern_id]) + 1
+
+    def first_matches(self, text: str) -> Dict[int, int]:
+        """Return the leftmost start offset of each keyword found in text."""
+        found: Dict[int, int] = {}
+        total = len(self.keywords)
+        for pattern_id, start in self.iter_matches(text):
+            if pattern_id not in found:
+                found[pattern_id] = start
+                if len(found) == total:
+                    break
+        return found
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache of rule hits per section.
+
+Hits are keyed by (section fingerprint, compiled rule-set version, route
+key). The fingerprint depends only on the section text, so identical text
+in different uploads or runs is evaluated once per rule-set version. A
+bounded in-process LRU sits in front of an optional persistent tier (the
+section_match_cache table, reached through ADK tools).
+
+Persistent rows whose rule-set version no workspace uses anymore are pruned
+in the background after a rule change, in small batches; rows older than
+MATCH_CACHE_TTL_DAYS are swept as well.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+MATCH_CACHE_MAX_ENTRIES = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", "100000"))
+MATCH_CACHE_PERSISTENT = os.getenv("MATCH_CACHE_PERSISTENT", "true").lower() == "true"
+# 0 = persistent rows only go when their rule-set version does
+MATCH_CACHE_TTL_DAYS = float(os.getenv("MATCH_CACHE_TTL_DAYS", "30"))
+# Expired rows are swept by a store at most this often per process
+MATCH_CACHE_SWEEP_SECONDS = 3600
+
+# (fingerprint, rule_set_version, route_key)
+CacheKey = Tuple[str, str, str]
+# [rule position, start, end, score]; start/end are -1 for semantic hits
+CachedHits = List[List[Any]]
+
+
+def content_fingerprint(text: str) -> str:
+    return sha256(text.encode()).hexdigest()[:16]
+
+
+class LRUTier:
+    def __init__(self, max_entries: int = MATCH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CachedHits]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[CachedHits]:
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is not None:
+                self._entries.move_to_end(key)
+            return hits
+
+    def put(self, key: CacheKey, hits: CachedHits) -> None:
+        with self._lock:
+            self._entries[key] = hits
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_memory_tier = LRUTier()
+
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def ttl_sweep_due() -> bool:
+    """True at most once per MATCH_CACHE_SWEEP_SECONDS, and never without a TTL."""
+    global _last_sweep
+    if MATCH_CACHE_TTL_DAYS <= 0:
+        return False
+    with _sweep_lock:
+        now = time.monotonic()
+        if _last_sweep and now - _last_sweep < MATCH_CACHE_SWEEP_SECONDS:
+            return False
+        _last_sweep = now
+        return True
+
+
+class SectionMatchCache:
+    """
+    LRU tier plus an optional persistent tier.
+
+    `load` takes a list of keys and returns {key: hits} for the ones it has;
+    `store` takes {key: hits}. Both are normally the
+    get_section_match_cache / store_section_match_cache tools.
+    """
+
+    def __init__(
+        self,
+        load: Optional[Callable[[List[CacheKey]], Dict[CacheKey, CachedHits]]] = None,
+        store: Optional[Callable[[Dict[CacheKey, CachedHits]], Any]] = None,
+        memory: Optional[LRUTier] = None,
+    ):
+        self.memory = memory if memory is not None else _memory_tier
+        self.load = load if MATCH_CACHE_PERSISTENT else None
+        self.store = store if MATCH_CACHE_PERSISTENT else None
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, CachedHits]:
+        found: Dict[CacheKey, CachedHits] = {}
+        missing: List[CacheKey] = []
+        for key in dict.fromkeys(keys):
+            hits = self.memory.get(key)
+            if hits is None:
+                missing.append(key)
+            else:
+                found[key] = hits
+
+        if missing and self.load is not None:
+            loaded = self.load(missing)
+            for key, hits in loaded.items():
+                self.memory.put(key, hits)
+                found[key] = hits
+
+        return found
+
+    def put_many(self, entries: Dict[CacheKey, CachedHits]) -> None:
+        if not entries:
+            return
+        for key, hits in entries.items():
+            self.memory.put(key, hits)
+        if self.store is not None:
+            self.store(entries)
+
+
+def match_cache_from_tools(tools: Dict[str, Callable]) -> SectionMatchCache:
+    """A SectionMatchCache whose persistent tier goes through the ADK db tools."""
+    get_tool = tools.get("get_section_match_cache")
+    store_tool = tools.get("store_section_match_cache")
+
+    def load(keys: List[CacheKey]) -> Dict[CacheKey, CachedHits]:
+        result = get_tool([list(key) for key in keys])
+        return {
+            (entry["fingerprint"], entry["rule_set_version"], entry["route_key"]): entry[
+                "hits"
+            ]
+            for entry in result.get("entries", [])
+        }
+
+    def store(entries: Dict[CacheKey, CachedHits]) -> None:
+        store_tool(
+            [
+                {
+                    "fingerprint": fingerprint,
+                    "rule_set_version": version,
+                    "route_key": route_key,
+                    "hits": hits,
+                }
+                for (fingerprint, version, route_key), hits in entries.items()
+            ]
+        )
+
+    return SectionMatchCache(
+        load=load if get_tool else None,
+        store=store if store_tool else None,
+    )
@@ -0,0 +1,212 @@
+"""
+Complexity analysis for user-supplied regex policy rules.
+
+Patterns are classified from their parse tree:
+
+- rejected: nested unbounded quantifiers such as (a+)+ or (?:\\w+\\s?)*, the
+  classic exponential-backtracking shape, or patterns that do not compile;
+- guarded: shapes that can backtrack polynomially, e.g. a variable-width
+  repeat inside another repeat like (?:\\d[ -]*?){13,16}, alternations under
+  an unbounded repeat, back-references, or unbounded repeats in a row that
+  can match the same characters, like \\d*\\d*x or .*a.*b. These run in the
+  regex sandbox under a time budget;
+- safe: everything else, scanned inline.
+"""
+
+import os
+import re
+from typing import Any, FrozenSet, Iterator, Optional, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+REGEX_MAX_PATTERN_LENGTH = int(os.getenv("REGEX_MAX_PATTERN_LENGTH", "1000"))
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+# Possessive repeats and atomic groups (3.11+) never backtrack into their body.
+_NO_BACKTRACK = {
+    op
+    for op in (
+        getattr(sre_constants, "POSSESSIVE_REPEAT", None),
+        getattr(sre_constants, "ATOMIC_GROUP", None),
+    )
+    if op is not None
+}
+
+
+# Characters single-character elements are compared on: Latin-1 plus a
+# few non-ASCII letters, digits and spaces
+_SAMPLE_CHARS = [chr(code) for code in range(256)] + ["\u0394", "\u4e2d", "\u0661", "\u2003"]
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: re.compile(r"\d"),
+    sre_constants.CATEGORY_NOT_DIGIT: re.compile(r"\D"),
+    sre_constants.CATEGORY_SPACE: re.compile(r"\s"),
+    sre_constants.CATEGORY_NOT_SPACE: re.compile(r"\S"),
+    sre_constants.CATEGORY_WORD: re.compile(r"\w"),
+    sre_constants.CATEGORY_NOT_WORD: re.compile(r"\W"),
+}
+
+
+def _in_class(items: Any, char: str) -> bool:
+    negate = False
+    found = False
+    for op, value in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            found = found or char.lower() == chr(value).lower()
+        elif op == sre_constants.RANGE:
+            found = found or any(
+                value[0] <= ord(folded) <= value[1]
+                for folded in {char, char.lower(), char.upper()}
+                if len(folded) == 1
+            )
+        elif op == sre_constants.CATEGORY:
+            category = _CATEGORIES.get(value)
+            found = found or category is None or bool(category.match(char))
+        else:
+            found = True
+    return found != negate
+
+
+def _chars(op: Any, value: Any) -> Optional[FrozenSet[str]]:
+    """Sample characters a single-character element matches, else None."""
+    if op == sre_constants.ANY:
+        return frozenset(_SAMPLE_CHARS)
+    if op == sre_constants.LITERAL:
+        return frozenset(c for c in _SAMPLE_CHARS if c.lower() == chr(value).lower())
+    if op == sre_constants.NOT_LITERAL:
+        return frozenset(c for c in _SAMPLE_CHARS if c.lower() != chr(value).lower())
+    if op == sre_constants.IN:
+        return frozenset(c for c in _SAMPLE_CHARS if _in_class(value, c))
+    if op == sre_constants.SUBPATTERN and len(value[-1]) == 1:
+        return _chars(*value[-1][0])
+    return None
+
+
+def _repeated_chars(value: Any) -> Optional[FrozenSet[str]]:
+    item = value[2]
+    return _chars(*item[0]) if len(item) == 1 else None
+
+
+def _flatten(items: Any) -> Iterator[Tuple[Any, Any]]:
+    """A sequence with its plain groups' contents inlined."""
+    for op, value in items:
+        if op == sre_constants.SUBPATTERN:
+            yield from _flatten(value[-1])
+        else:
+            yield op, value
+
+
+def _overlapping_repeats(items: Any) -> bool:
+    """
+    Whether an unbounded single-character repeat is followed, past elements
+    it can match as well, by another unbounded repeat it overlaps: each
+    split of the text between them is tried when the match fails later.
+    """
+    elements = list(_flatten(items))
+    for index, (op, value) in enumerate(elements):
+        if op not in _REPEATS or value[1] != sre_constants.MAXREPEAT:
+            continue
+        chars = _repeated_chars(value)
+        if not chars:
+            continue
+        for later_op, later_value in elements[index + 1 :]:
+            if later_op == sre_constants.AT:
+                continue
+            if later_op in _REPEATS:
+                later = _repeated_chars(later_value)
+                if later is None:
+                    break
+                if later_value[1] == sre_constants.MAXREPEAT and chars & later:
+                    return True
+            else:
+                later = _chars(later_op, later_value)
+            if later is None or not later <= chars:
+                break
+    return False
+
+
+class PatternAssessment:
+    def __init__(self, rejected_reason: Optional[str] = None, guarded: bool = False):
+        self.rejected_reason = rejected_reason
+        self.guarded = guarded
+
+    @property
+    def rejected(self) -> bool:
+        return self.rejected_reason is not None
+
+
+def _scan(items: Any, in_unbounded: bool, in_repeat: bool) -> Tuple[Optional[str], bool]:
+    """Return (rejection reason, needs guarding) for a parsed sequence."""
+    guarded = _overlapping_repeats(items)
+    for op, value in items:
+        if op in _REPEATS:
+            minimum, maximum, item = value
+            unbounded = maximum == sre_constants.MAXREPEAT
+            if unbounded and in_unbounded:
+                return "nested unbounded quantifiers", True
+            if minimum != maximum and in_repeat:
+                guarded = True
+            reason, inner = _scan(
+                item, in_unbounded or unbounded, in_repeat or maximum > 1
+            )
+            if reason:
+                return reason, True
+            guarded = guarded or inner
+        elif op in _NO_BACKTRACK:
+            continue
+        elif op == sre_constants.SUBPATTERN:
+            reason, inner = _scan(value[-1], in_unbounded, in_repeat)
+            if reason:
+                return reason, True
+            guarded = guarded or inner
+        elif op == sre_constants.BRANCH:
+            guarded = guarded or in_unbounded
+            for branch in value[1]:
+                reason, inner = _scan(branch, in_unbounded, in_repeat)
+                if reason:
+                    return reason, True
+                guarded = guarded or inner
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            reason, inner = _scan(value[1], in_unbounded, in_repeat)
+            if reason:
+                return reason, True
+            guarded = guarded or inner
+        elif op == sre_constants.GROUPREF_EXISTS:
+            guarded = True
+            for branch in value[1:]:
+                if branch is None:
+                    continue
+                reason, _ = _scan(branch, in_unbounded, in_repeat)
+                if reason:
+                    return reason, True
+        elif op == sre_constants.GROUPREF:
+            guarded = True
+    return None, guarded
+
+
+def assess_pattern(pattern: str, flags: int = re.IGNORECASE) -> PatternAssessment:
+    if len(pattern) > REGEX_MAX_PATTERN_LENGTH:
+        return PatternAssessment(
+            f"pattern longer than {REGEX_MAX_PATTERN_LENGTH} characters", True
+        )
+    try:
+        re.compile(pattern, flags)
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, RecursionError) as exc:
+        return PatternAssessment(f"invalid regex: {exc}", True)
+
+    reason, guarded = _scan(parsed, False, False)
+    return PatternAssessment(reason, guarded)
+
+
+def validate_rule_pattern(pattern_type: Optional[str], pattern: Optional[str]) -> Optional[str]:
+    """Error message for a regex rule that must not be stored, else None."""
+    if pattern_type != "regex":
+        return None
+    assessment = assess_pattern((pattern or "").strip())
+    return assessment.rejected_reason
@@ -0,0 +1,249 @@
+"""
+Isolated execution of guarded regex rules under a time budget.
+
+CPython's re module cannot be interrupted from another thread, so guarded
+patterns run in long-lived worker processes, REGEX_SANDBOX_WORKERS of them
+so concurrent evaluations do not queue behind one another. Each rule gets
+one round trip per document with every candidate section, and the budget
+applies to each text on its own: the worker streams results back as it
+goes, and only when a single text runs past the budget is the worker
+killed (and lazily respawned) and the rule reported as timed out.
+
+The budget is CPU time where the worker's usage can be read (/proc), so a
+worker starved by a saturated machine is given more wall time instead of
+being charged for the wait. If it still has not used its budget after
+REGEX_SANDBOX_MAX_WAIT_FACTOR times that, the timeout is reported as
+under load, which does not count towards quarantine.
+
+The worker is this file run as a script (stdlib only), talking pickled
+frames over its stdin/stdout, so starting it never re-imports the API.
+"""
+
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+REGEX_RULE_TIME_BUDGET_MS = int(os.getenv("REGEX_RULE_TIME_BUDGET_MS", "250"))
+REGEX_SANDBOX_WORKERS = max(int(os.getenv("REGEX_SANDBOX_WORKERS", "2")), 1)
+# Wall time, in budgets, a starved worker gets before giving up on the text
+REGEX_SANDBOX_MAX_WAIT_FACTOR = max(
+    float(os.getenv("REGEX_SANDBOX_MAX_WAIT_FACTOR", "8")), 1.0
+)
+# "guarded" sends risky patterns to the sandbox; "off" runs everything inline.
+REGEX_SANDBOX = os.getenv("REGEX_SANDBOX", "guarded")
+
+REGEX_TIMEOUT_ERROR_CODE = "REGEX_RULE_TIMEOUT"
+
+_WORKER_START_TIMEOUT_SECONDS = 30.0
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class RegexTimeout(Exception):
+    """
+    A single text ran past the budget; `completed` holds the results before
+    it. `under_load` means the worker never got the CPU time to use it.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        completed: List[Optional[Tuple[int, int]]],
+        under_load: bool = False,
+    ):
+        super().__init__(pattern)
+        self.completed = completed
+        self.under_load = under_load
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """User plus system CPU time a process has used, or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as handle:
+            # Fields after the parenthesised command name, from state on
+            fields = handle.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+def _serve() -> None:
+    reader = Connection(sys.stdin.fileno(), writable=False)
+    writer = Connection(sys.stdout.fileno(), readable=False)
+    compiled: Dict[Tuple[str, int], Any] = {}
+    writer.send("ready")
+    while True:
+        try:
+            message = reader.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        pattern, flags, texts, starts, flush_seconds = message
+        regex = compiled.get((pattern, flags))
+        if regex is None:
+            regex = compiled[(pattern, flags)] = re.compile(pattern, flags)
+        # Results go out whenever flush_seconds have passed since the last
+        # frame, so a silence longer than budget + flush_seconds means the
+        # text in progress alone has used the budget
+        results = []
+        flushed = time.monotonic()
+        for text, start in zip(texts, starts):
+            match = regex.search(text, start)
+            results.append((match.start(), match.end()) if match else None)
+            now = time.monotonic()
+            if now - flushed >= flush_seconds:
+                writer.send(results)
+                results = []
+                flushed = now
+        if results:
+            writer.send(results)
+
+
+class RegexSandbox:
+    """One worker process; callers share them through RegexSandboxPool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._writer: Optional[Connection] = None
+        self._reader: Optional[Connection] = None
+
+    def _ensure_worker(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            return
+        process = subprocess.Popen(
+            [sys.executable, "-I", os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._process = process
+        self._writer = Connection(os.dup(process.stdin.fileno()), readable=False)
+        self._reader = Connection(os.dup(process.stdout.fileno()), writable=False)
+        # Startup time must not count against the first rule's budget
+        if not self._reader.poll(_WORKER_START_TIMEOUT_SECONDS):
+            self._kill_worker()
+            raise RuntimeError("regex sandbox worker did not start")
+        self._reader.recv()
+
+    def _kill_worker(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            for stream in (self._process.stdin, self._process.stdout):
+                if stream is not None:
+                    stream.close()
+        for conn in (self._writer, self._reader):
+            if conn is not None:
+                conn.close()
+        self._process = self._writer = self._reader = None
+
+    def search_many(
+        self,
+        pattern: str,
+        flags: int,
+        texts: Sequence[str],
+        budget_ms: int = REGEX_RULE_TIME_BUDGET_MS,
+        starts: Optional[Sequence[int]] = None,
+    ) -> List[Optional[Tuple[int, int]]]:
+        """
+        Leftmost (start, end) per text, searching from its entry in starts
+        (default 0), or RegexTimeout once one text has run past the budget.
+        """
+        if not texts:
+            return []
+        starts = list(starts) if starts is not None else [0] * len(texts)
+        budget = budget_ms / 1000
+        flush_seconds = budget / 4
+        silence = budget + flush_seconds
+        results: List[Optional[Tuple[int, int]]] = []
+        under_load = False
+        with self._lock:
+            self._ensure_worker()
+            pid = self._process.pid
+            try:
+                used_before = _cpu_seconds(pid)
+                self._writer.send((pattern, flags, list(texts), starts, flush_seconds))
+                waited = 0.0
+                while len(results) < len(texts):
+                    if self._reader.poll(silence):
+                        results.extend(self._reader.recv())
+                        used_before = _cpu_seconds(pid)
+                        waited = 0.0
+                        continue
+                    # Silent for a budget: over it only if the CPU time went
+                    # into the text, not if the worker was waiting to run
+                    waited += silence
+                    used = _cpu_seconds(pid)
+                    if used is None or used_before is None or used - used_before >= budget:
+                        break
+                    if waited >= silence * REGEX_SANDBOX_MAX_WAIT_FACTOR:
+                        under_load = True
+                        break
+                else:
+                    return results
+            except (EOFError, OSError):
+                pass
+            self._kill_worker()
+            raise RegexTimeout(pattern, results, under_load)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                try:
+                    self._writer.send(None)
+                except OSError:
+                    pass
+            self._kill_worker()
+
+
+class RegexSandboxPool:
+    """A fixed set of workers; each call borrows an idle one."""
+
+    def __init__(self, size: int = REGEX_SANDBOX_WORKERS):
+        self._idle: "queue.LifoQueue[RegexSandbox]" = queue.LifoQueue()
+        self._workers = [RegexSandbox() for _ in range(size)]
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def search_many(
+        self,
+        pattern: str,
+        flags: int,
+        texts: Sequence[str],
+        budget_ms: int = REGEX_RULE_TIME_BUDGET_MS,
+        starts: Optional[Sequence[int]] = None,
+    ) -> List[Optional[Tuple[int, int]]]:
+        if not texts:
+            return []
+        # Waiting for a worker does not count against the budget
+        worker = self._idle.get()
+        try:
+            return worker.search_many(pattern, flags, texts, budget_ms, starts)
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
+
+
+_sandbox: Optional[RegexSandboxPool] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_regex_sandbox() -> RegexSandboxPool:
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = RegexSandboxPool()
+        return _sandbox
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,256 @@
+"""
+Regex prefiltering and alternation grouping for regex policy rules.
+
+Each pattern is parsed once to find what any match must contain: literal
+substrings (e.g. "HIPAA" or "-") and whether a digit is required. Sections
+that lack them are skipped without running the regex. Compatible patterns
+are then joined into one alternation with a named group per rule, so a
+section that matches none of them costs a single scan.
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+# Keep alternations small enough that one failing member is cheap to spot.
+MAX_UNION_SIZE = 64
+
+_DIGIT_CATEGORIES = {sre_constants.CATEGORY_DIGIT}
+_ZERO_WIDTH = {sre_constants.AT}
+_GROUP_REFERENCES = {sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS}
+# Word boundaries behave the same at a row's ends and next to a newline
+_BOUNDARY_CODES = {
+    sre_constants.AT_BOUNDARY,
+    sre_constants.AT_NON_BOUNDARY,
+    sre_constants.AT_LOC_BOUNDARY,
+    sre_constants.AT_LOC_NON_BOUNDARY,
+    sre_constants.AT_UNI_BOUNDARY,
+    sre_constants.AT_UNI_NON_BOUNDARY,
+}
+
+
+class RegexProfile:
+    """What a pattern requires of any text it can match."""
+
+    def __init__(
+        self,
+        literals: Tuple[str, ...] = (),
+        requires_digit: bool = False,
+        unionable: bool = False,
+        row_local: bool = False,
+    ):
+        self.literals = literals
+        self.requires_digit = requires_digit
+        self.unionable = unionable
+        # Any match within a row is also a match in a window of rows joined
+        # by newlines, at the same offset or earlier
+        self.row_local = row_local
+
+    def may_match(self, lowered: str, has_digit: bool) -> bool:
+        """False only when an ASCII section provably cannot match."""
+        if self.requires_digit and not has_digit:
+            return False
+        for literal in self.literals:
+            if literal not in lowered:
+                return False
+        return True
+
+
+def _is_digit_set(items: Sequence[Tuple[Any, Any]]) -> bool:
+    if not items:
+        return False
+    for op, value in items:
+        if op == sre_constants.CATEGORY and value in _DIGIT_CATEGORIES:
+            continue
+        if op == sre_constants.RANGE and 48 <= value[0] <= value[1] <= 57:
+            continue
+        if op == sre_constants.LITERAL and 48 <= value <= 57:
+            continue
+        return False
+    return True
+
+
+def _walk(items: Any, literals: List[str]) -> Tuple[bool, bool]:
+    """
+    Collect required ASCII literal runs from a parsed sequence.
+
+    Returns (requires_digit, has_group_reference).
+    """
+    requires_digit = False
+    has_reference = False
+    run: List[str] = []
+
+    def flush() -> None:
+        if run:
+            literals.append("".join(run).lower())
+            run.clear()
+
+    for op, value in items:
+        if op == sre_constants.LITERAL:
+            ch = chr(value)
+            if ch.isascii():
+                run.append(ch)
+            else:
+                flush()
+            if 48 <= value <= 57:
+                requires_digit = True
+            continue
+
+        if op in _ZERO_WIDTH:
+            continue
+
+        flush()
+        if op in _GROUP_REFERENCES:
+            has_reference = True
+        elif op == sre_constants.IN:
+            requires_digit = requires_digit or _is_digit_set(value)
+        elif op == sre_constants.SUBPATTERN:
+            digit, reference = _walk(value[-1], literals)
+            requires_digit = requires_digit or digit
+            has_reference = has_reference or reference
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            minimum, _, item = value
+            nested: List[str] = []
+            digit, reference = _walk(item, nested)
+            has_reference = has_reference or reference
+            if minimum >= 1:
+                literals.extend(nested)
+                requires_digit = requires_digit or digit
+        elif op == sre_constants.BRANCH:
+            branch_digits = []
+            for branch in value[1]:
+                digit, reference = _walk(branch, [])
+                branch_digits.append(digit)
+                has_reference = has_reference or reference
+            requires_digit = requires_digit or all(branch_digits)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _, reference = _walk(value[1], [])
+            has_reference = has_reference or reference
+
+    flush()
+    return requires_digit, has_reference
+
+
+def _looks_past_row(items: Any) -> bool:
+    """Anchors and lookarounds, which see a row's neighbours in a window."""
+    for op, value in items:
+        if op == sre_constants.AT and value not in _BOUNDARY_CODES:
+            return True
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return True
+        if op == sre_constants.SUBPATTERN and _looks_past_row(value[-1]):
+            return True
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and _looks_past_row(
+            value[2]
+        ):
+            return True
+        if op == sre_constants.BRANCH and any(
+            _looks_past_row(branch) for branch in value[1]
+        ):
+            return True
+        if op == sre_constants.GROUPREF_EXISTS and any(
+            branch is not None and _looks_past_row(branch) for branch in value[1:]
+        ):
+            return True
+    return False
+
+
+def analyze_pattern(compiled: Pattern[str]) -> RegexProfile:
+    try:
+        parsed = sre_parse.parse(compiled.pattern, compiled.flags)
+    except (re.error, RecursionError):
+        return RegexProfile()
+
+    literals: List[str] = []
+    requires_digit, has_reference = _walk(parsed, literals)
+
+    # Named groups would collide and back-references would be renumbered
+    # once the pattern sits inside a larger alternation.
+    unionable = not has_reference and not compiled.groupindex
+    if unionable:
+        try:
+            re.compile(f"(?:{compiled.pattern})", flags=compiled.flags)
+        except re.error:
+            unionable = False
+
+    # The longest literals reject the most sections; a few are plenty.
+    longest = sorted(set(literals), key=len, reverse=True)[:3]
+    return RegexProfile(
+        tuple(longest), requires_digit, unionable, not _looks_past_row(parsed)
+    )
+
+
+class RegexGroup:
+    """Regex rules scanned together through one named-group alternation."""
+
+    def __init__(self, members: List[Tuple[int, Pattern[str]]]):
+        self.positions = [position for position, _ in members]
+        self.union: Optional[Pattern[str]] = None
+        self.group_positions: Dict[str, int] = {}
+        if len(members) > 1:
+            parts = []
+            for position, compiled in members:
+                name = f"r{position}"
+                self.group_positions[name] = position
+                parts.append(f"(?P<{name}>{compiled.pattern})")
+            self.union = re.compile("|".join(parts), flags=re.IGNORECASE)
+
+
+def build_regex_groups(
+    members: List[Tuple[int, Pattern[str], RegexProfile]],
+) -> List[RegexGroup]:
+    """Group unionable patterns into alternations; the rest stay standalone."""
+    groups: List[RegexGroup] = []
+    batch: List[Tuple[int, Pattern[str]]] = []
+    for position, compiled, profile in members:
+        if not profile.unionable:
+            groups.append(RegexGroup([(position, compiled)]))
+            continue
+        batch.append((position, compiled))
+        if len(batch) == MAX_UNION_SIZE:
+            groups.append(RegexGroup(batch))
+            batch = []
+    if batch:
+        groups.append(RegexGroup(batch))
+    return groups
+
+
+def iter_group_matches(
+    group: RegexGroup,
+    candidates: List[int],
+    patterns: Dict[int, Pattern[str]],
+    text: str,
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yield (rule position, start, end) for the leftmost match of each candidate.
+
+    When the alternation matches at offset p, no member can match before p,
+    so the remaining candidates only need to be searched from p onwards.
+    """
+    if group.union is None or len(candidates) < 2:
+        for position in candidates:
+            match = patterns[position].search(text)
+            if match:
+                yield position, match.start(), match.end()
+        return
+
+    match = group.union.search(text)
+    if match is None:
+        return
+
+    # The winner may be a member scope routing left out of candidates
+    winner = group.group_positions[match.lastgroup or ""]
+    if winner in candidates:
+        yield winner, match.start(), match.end()
+
+    for position in candidates:
+        if position == winner:
+            continue
+        other = patterns[position].search(text, match.start())
+        if other:
+            yield position, other.start(), other.end()
@@ -10,6 +10,8 @@ SEVERITY_WEIGHTS = {
     "critical": 30,
 }
 
+RISK_SCORE_CAP = 100.0
+
 
 def _parse_timestamp(value: str | None) -> datetime | None:
     if not value:
@@ -20,6 +22,21 @@ def _parse_timestamp(value: str | None) -> datetime | None:
         return None
 
 
+def violation_score_floor(severity: Any, confidence: Any) -> float:
+    """
+    The least a violation can add to score_risk's total.
+
+    Recency and repeat multipliers never drop below 1, so once the floors of
+    the violations found so far reach RISK_SCORE_CAP the capped score (and the
+    Critical tier) is settled whatever else turns up.
+    """
+    base_weight = SEVERITY_WEIGHTS.get(
+        str(severity or "medium").lower(), SEVERITY_WEIGHTS["medium"]
+    )
+    confidence_factor = float(confidence) if isinstance(confidence, (int, float)) else 0.7
+    return base_weight * confidence_factor
+
+
 def score_risk(violations: List[Dict[str, Any]]) -> Dict[str, Any]:
     now = datetime.now(timezone.utc)
     recent_window = now - timedelta(days=7)
@@ -60,7 +77,7 @@ def score_risk(violations: List[Dict[str, Any]]) -> Dict[str, Any]:
             }
         )
 
-    capped_score = min(round(total, 2), 100.0)
+    capped_score = min(round(total, 2), RISK_SCORE_CAP)
 
     if capped_score >= 85:
         tier = "Critical"
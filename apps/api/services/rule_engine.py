@@ -1,6 +1,53 @@
+import json
+import os
 import re
-from difflib import SequenceMatcher
-from typing import Any, Dict, Iterable, List
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import sha256
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+from services.chunking import chunk_fingerprint
+from services.keyword_scanner import KeywordScanner
+from services.match_cache import CacheKey, CachedHits, SectionMatchCache
+from services.regex_union import (
+    RegexProfile,
+    analyze_pattern,
+    build_regex_groups,
+    iter_group_matches,
+)
+from services.regex_safety import assess_pattern
+from services.regex_sandbox import (
+    REGEX_SANDBOX,
+    REGEX_TIMEOUT_ERROR_CODE,
+    RegexTimeout,
+    get_regex_sandbox,
+)
+from services.rule_pool import (
+    get_rule_pool,
+    load_rule_set,
+    parallel_workers,
+    publish_rule_set,
+    shard,
+    shutdown_rule_pool,
+)
+from services.rule_stats import RuleStatsRecorder
+from services.scope_router import ScopeRouter
+from services.semantic_matcher import (
+    SEMANTIC_BACKEND,
+    embed_texts,
+    matching_rules,
+    score_matrix,
+)
+
+# Below this many keyword rules a plain substring search per rule is cheaper
+# than building and walking the automaton.
+KEYWORD_SCANNER_MIN_RULES = int(os.getenv("KEYWORD_SCANNER_MIN_RULES", "8"))
+
+_DIGIT = re.compile(r"\d")
 
 
 def _snippet(text: str, start: int, end: int, window: int = 80) -> str:
@@ -9,87 +56,885 @@ def _snippet(text: str, start: int, end: int, window: int = 80) -> str:
     return text[left:right].strip()
 
 
-def _semantic_score(a: str, b: str) -> float:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+def _parse_scope(scope: Any) -> Tuple[str, ...]:
+    """Normalize a stored PolicyRule.scope value into lowercase scope tokens."""
+    if scope is None:
+        return ()
+    if isinstance(scope, str):
+        stripped = scope.strip()
+        if stripped.startswith("["):
+            try:
+                return _parse_scope(json.loads(stripped))
+            except ValueError:
+                pass
+        return tuple(
+            part.strip().lower() for part in stripped.split(",") if part.strip()
+        )
+    if isinstance(scope, dict):
+        return _parse_scope(list(scope.keys()))
+    if isinstance(scope, (list, tuple, set)):
+        return tuple(str(part).strip().lower() for part in scope if str(part).strip())
+    return (str(scope).strip().lower(),)
+
+
+def _version_number(version: Any) -> int:
+    try:
+        return int(str(version or "v1").lstrip("v") or "1")
+    except ValueError:
+        return 1
+
+
+class CompiledRule:
+    """A policy rule with its pattern parsed once, ready for the hot loop."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "severity",
+        "pattern_type",
+        "remediation",
+        "version",
+        "scope",
+        "needle",
+        "intent",
+        "keyword",
+        "regex",
+        "profile",
+        "guarded",
+    )
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.id = rule.get("id")
+        self.name = rule.get("name")
+        self.severity = rule.get("severity")
+        self.pattern_type = rule.get("pattern_type", "keyword")
+        self.remediation = rule.get("remediation")
+        self.version = rule.get("version")
+        self.scope = _parse_scope(rule.get("scope"))
+
+        self.needle = (rule.get("pattern") or rule.get("name") or "").strip()
+        description = (rule.get("description") or "").strip()
+        self.intent = description or self.needle
+        self.keyword = self.needle.casefold()
+
+        self.regex: Optional[Pattern[str]] = None
+        self.profile = RegexProfile()
+        # Guarded patterns can backtrack badly and run in the regex sandbox
+        self.guarded = False
+        if self.pattern_type == "regex":
+            try:
+                self.regex = re.compile(self.needle, flags=re.IGNORECASE)
+            except re.error:
+                self.regex = None
+            if self.regex is not None:
+                self.profile = analyze_pattern(self.regex)
+                self.guarded = (
+                    REGEX_SANDBOX != "off" and assess_pattern(self.needle).guarded
+                )
+
+
+class CompiledRuleSet:
+    """Active policy rules compiled once per rule-set version."""
+
+    def __init__(self, rules: Iterable[Dict[str, Any]], version: str | None = None):
+        rule_list = [
+            r for r in rules if isinstance(r, dict) and "error" not in r
+        ]
+        self.version = version or rule_set_fingerprint(rule_list)
+        # Quarantined rules (repeated regex timeouts) are skipped like inactive ones
+        self.source_rules = [
+            r for r in rule_list if r.get("is_active", True) and not r.get("quarantined")
+        ]
+        self.rules: List[CompiledRule] = [CompiledRule(r) for r in self.source_rules]
+
+        self.regex_rules: List[Tuple[int, CompiledRule]] = []
+        self.semantic_rules: List[Tuple[int, CompiledRule]] = []
+        self.keyword_rules: List[Tuple[int, CompiledRule]] = []
+        for position, rule in enumerate(self.rules):
+            if rule.pattern_type == "regex":
+                self.regex_rules.append((position, rule))
+            elif rule.pattern_type == "semantic":
+                self.semantic_rules.append((position, rule))
+            elif rule.keyword:
+                self.keyword_rules.append((position, rule))
+
+        self.router = ScopeRouter(
+            (position, rule.scope) for position, rule in enumerate(self.rules)
+        )
+
+        self.semantic_intents = [rule.intent for _, rule in self.semantic_rules]
+        self.semantic_vectors = embed_texts(self.semantic_intents)
+
+        self.regex_patterns: Dict[int, Pattern[str]] = {
+            position: rule.regex
+            for position, rule in self.regex_rules
+            if rule.regex is not None and not rule.guarded
+        }
+        self.regex_groups = build_regex_groups(
+            [
+                (position, rule.regex, rule.profile)
+                for position, rule in self.regex_rules
+                if rule.regex is not None and not rule.guarded
+            ]
+        )
+        self.guarded_regex_rules: List[Tuple[int, CompiledRule]] = [
+            (position, rule) for position, rule in self.regex_rules if rule.guarded
+        ]
+
+        # Keyword -> rule positions, so duplicate keywords share one pattern.
+        self.keyword_scanner: Optional[KeywordScanner] = None
+        self.keyword_targets: List[List[int]] = []
+        if len(self.keyword_rules) >= KEYWORD_SCANNER_MIN_RULES:
+            pattern_ids: Dict[str, int] = {}
+            for position, rule in self.keyword_rules:
+                pattern_id = pattern_ids.setdefault(rule.keyword, len(pattern_ids))
+                if pattern_id == len(self.keyword_targets):
+                    self.keyword_targets.append([])
+                self.keyword_targets[pattern_id].append(position)
+            self.keyword_scanner = KeywordScanner(list(pattern_ids))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+def rule_set_fingerprint(rules: Iterable[Dict[str, Any]]) -> str:
+    """Stable digest of the rule ids, versions and active/quarantine flags."""
+    parts = sorted(
+        f"{r.get('id')}:{r.get('version')}:{int(bool(r.get('is_active', True)))}"
+        f":{int(bool(r.get('quarantined')))}"
+        for r in rules
+        if isinstance(r, dict) and "error" not in r
+    )
+    return sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+_compiled_cache: Dict[Tuple[Any, Any, int], CompiledRuleSet] = {}
+_compiled_cache_lock = threading.Lock()
+
+
+def get_compiled_rule_set(
+    rules: List[Dict[str, Any]],
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+) -> CompiledRuleSet:
+    """
+    Return the compiled rule set for a workspace, compiling only on a miss.
+
+    Entries are keyed by (org_id, workspace_id, max rule version) and
+    verified against the rule-set fingerprint, so edits made by another
+    process are never served stale.
+    """
+    rule_list = [r for r in rules if isinstance(r, dict) and "error" not in r]
+    max_version = max((_version_number(r.get("version")) for r in rule_list), default=0)
+    key = (org_id, workspace_id, max_version)
+    fingerprint = rule_set_fingerprint(rule_list)
+
+    with _compiled_cache_lock:
+        cached = _compiled_cache.get(key)
+    if cached is not None and cached.version == fingerprint:
+        return cached
+
+    compiled = CompiledRuleSet(rule_list, version=fingerprint)
+    with _compiled_cache_lock:
+        for stale_key in [k for k in _compiled_cache if k[:2] == key[:2]]:
+            del _compiled_cache[stale_key]
+        _compiled_cache[key] = compiled
+    return compiled
+
+
+def invalidate_compiled_rule_set(
+    org_id: int | None = None, workspace_id: int | None = None
+) -> None:
+    """Drop cached rule sets for a workspace (or every workspace when unscoped)."""
+    with _compiled_cache_lock:
+        for key in list(_compiled_cache):
+            if org_id is not None and key[0] != org_id:
+                continue
+            if workspace_id is not None and key[1] != workspace_id:
+                continue
+            del _compiled_cache[key]
+
+
+# A chunked section's span map: [start, end, row label, offset in row] per row
+Spans = Optional[List[List[Any]]]
+# What hit detection needs of a section: text, rule route and span map
+_Item = Tuple[str, Optional[FrozenSet[int]], Spans]
+
+
+class _Section:
+    """A section as run_rules needs it; the input dict is read once, up front."""
+
+    __slots__ = ("text", "allowed", "key", "chunk_id", "label", "spans", "starts")
+
+    def __init__(
+        self,
+        text: str,
+        allowed: Optional[FrozenSet[int]],
+        key: CacheKey,
+        chunk_id: Any,
+        label: Any,
+        spans: Spans = None,
+    ):
+        self.text = text
+        self.allowed = allowed
+        self.key = key
+        self.chunk_id = chunk_id
+        self.label = label
+        self.spans = spans
+        self.starts = [span[0] for span in spans] if spans else None
+
+
+def _violation(
+    rule: CompiledRule,
+    section: _Section,
+    evidence: str,
+    confidence: float,
+    label: Any = None,
+) -> Dict[str, Any]:
+    return {
+        "rule_id": rule.id,
+        "rule": rule.name,
+        "severity": rule.severity,
+        "evidence": evidence,
+        "location": {
+            "chunk_id": section.chunk_id,
+            "label": section.label if label is None else label,
+        },
+        "confidence": confidence,
+        "recommended_fix": rule.remediation,
+    }
+
+
+def _keyword_hits(
+    rule_set: CompiledRuleSet, folded: str, allowed: Optional[FrozenSet[int]]
+) -> List[Tuple[int, int]]:
+    """Return (rule position, start offset) for every keyword rule found in a section."""
+    if rule_set.keyword_scanner is None:
+        hits = []
+        for position, rule in rule_set.keyword_rules:
+            if allowed is not None and position not in allowed:
+                continue
+            start = folded.find(rule.keyword)
+            if start != -1:
+                hits.append((position, start))
+        return hits
+
+    return [
+        (position, start)
+        for pattern_id, start in rule_set.keyword_scanner.first_matches(folded).items()
+        for position in rule_set.keyword_targets[pattern_id]
+        if allowed is None or position in allowed
+    ]
+
+
+def _unfold_span(text: str, folded: str, start: int, end: int) -> Tuple[int, int]:
+    """A span of text.casefold() as offsets into text; ß folds to ss."""
+    if len(folded) == len(text):
+        return start, end
+    mapped_start = mapped_end = len(text)
+    position = 0
+    for index, char in enumerate(text):
+        if position <= start < position + len(char.casefold()):
+            mapped_start = index
+        position += len(char.casefold())
+        if position >= end:
+            mapped_end = index + 1
+            break
+    return mapped_start, mapped_end
+
+
+def _prefilter_view(text: str) -> Tuple[Optional[str], bool]:
+    # Literal prefilters are only sound for ASCII text, where IGNORECASE
+    # reduces to plain lowercasing.
+    lowered = text.lower() if text.isascii() else None
+    has_digit = lowered is not None and _DIGIT.search(text) is not None
+    return lowered, has_digit
+
+
+def _regex_hits(
+    rule_set: CompiledRuleSet,
+    text: str,
+    allowed: Optional[FrozenSet[int]],
+    stats: Optional[RuleStatsRecorder] = None,
+) -> List[Tuple[int, int, int]]:
+    """Return (rule position, start, end) for every regex rule matching a section."""
+    if not rule_set.regex_groups:
+        return []
+
+    lowered, has_digit = _prefilter_view(text)
+
+    hits: List[Tuple[int, int, int]] = []
+    for group in rule_set.regex_groups:
+        candidates = [
+            position
+            for position in group.positions
+            if (allowed is None or position in allowed)
+            and (
+                lowered is None
+                or rule_set.rules[position].profile.may_match(lowered, has_digit)
+            )
+        ]
+        if not candidates:
+            continue
+        started = time.perf_counter()
+        hits.extend(
+            iter_group_matches(group, candidates, rule_set.regex_patterns, text)
+        )
+        if stats is not None:
+            stats.split_wall(candidates, time.perf_counter() - started)
+    return hits
+
+
+def document_sections(structured: Any) -> List[Dict[str, Any]]:
+    """Sections of a ProcessedData.structured payload, or the whole text as one."""
+    structured = structured if isinstance(structured, dict) else {}
+    sections = structured.get("sections") or []
+    if sections:
+        return sections
+
+    fallback_text = str(
+        structured.get("full_content") or structured.get("raw_content") or ""
+    )
+    return [{"chunk_id": None, "label": "raw", "text": fallback_text}]
+
+
+def _route_key(allowed: Optional[FrozenSet[int]]) -> str:
+    if allowed is None:
+        return "all"
+    joined = ",".join(str(position) for position in sorted(allowed))
+    return sha256(joined.encode()).hexdigest()[:16]
+
+
+def _row_match(
+    rule: CompiledRule, text: str, start: int, end: int
+) -> Optional[Tuple[int, int]]:
+    """A regex or keyword rule's first match in text[start:end], as offsets into text."""
+    row_text = text[start:end]
+    if rule.regex is not None:
+        match = rule.regex.search(row_text)
+        return (start + match.start(), start + match.end()) if match else None
+    folded = row_text.casefold()
+    at = folded.find(rule.keyword)
+    if at == -1:
+        return None
+    hit_start, hit_end = _unfold_span(row_text, folded, at, at + len(rule.keyword))
+    return start + hit_start, start + hit_end
+
+
+def _piece_match(
+    rule: CompiledRule,
+    text: str,
+    folded: str,
+    aligned: bool,
+    start: int,
+    end: int,
+) -> Optional[Tuple[int, int]]:
+    """
+    A rule's first match starting in text[start:end], a piece of a split
+    row with row context around it. Searching from start, not slicing, ^
+    and lookbehinds see the row before the cut; a match that runs past a
+    cut into the context is left to the next piece.
+    """
+    if rule.regex is not None:
+        match = rule.regex.search(text, start)
+        span = (match.start(), match.end()) if match else None
+    elif aligned:
+        at = folded.find(rule.keyword, start)
+        span = (at, at + len(rule.keyword)) if at != -1 else None
+    else:
+        span = _row_match(rule, text, start, len(text))
+    if span is None or span[0] >= end or (end < len(text) and span[1] > end):
+        return None
+    return span
+
+
+def _is_split_piece(text: str, spans: Spans) -> bool:
+    """A piece of a split row: one span that leaves row context around it."""
+    return bool(spans) and len(spans) == 1 and (spans[0][0] > 0 or spans[0][1] < len(text))
+
+
+def _span_hits(
+    rule_set: CompiledRuleSet,
+    text: str,
+    folded: str,
+    allowed: Optional[FrozenSet[int]],
+    spans: List[List[Any]],
+    found: CachedHits,
+    stats: Optional[RuleStatsRecorder] = None,
+) -> CachedHits:
+    """
+    Regex and keyword hits of a chunked section, one per row a rule matches.
+
+    A rule's first match in the whole section cannot start after its first
+    match within a row, so each rule is searched again from the row its
+    first match is in. Searching the joined text from a row's start, a match
+    that ends inside the row is the row's own first match; one that runs
+    into the next row is checked against the row alone. Anchored and
+    lookaround patterns can miss in the joined text, so they are run on each
+    row the prefilter lets through.
+    """
+    starts = [span[0] for span in spans]
+    first_row: Dict[int, int] = {}
+    for position, start, _, _ in found:
+        row = max(bisect_right(starts, start) - 1, 0)
+        first_row[position] = min(first_row.get(position, row), row)
+
+    lowered, has_digit = _prefilter_view(text)
+    for position, rule in rule_set.regex_rules:
+        if rule.regex is None or rule.guarded or rule.profile.row_local:
+            continue
+        if allowed is not None and position not in allowed:
+            continue
+        if lowered is not None and not rule.profile.may_match(lowered, has_digit):
+            continue
+        first_row[position] = 0
+    if not first_row:
+        return []
+
+    started = time.perf_counter()
+    # Keyword offsets into the folded text only line up when no character
+    # folds to several
+    aligned = len(folded) == len(text)
+    hits: CachedHits = []
+    if _is_split_piece(text, spans):
+        piece_start, piece_end, _, _ = spans[0]
+        for position in first_row:
+            rule = rule_set.rules[position]
+            span = _piece_match(rule, text, folded, aligned, piece_start, piece_end)
+            if span is not None:
+                confidence = 0.9 if rule.regex is not None else 0.7
+                hits.append([position, span[0], span[1], confidence])
+        if stats is not None:
+            stats.split_wall(first_row, time.perf_counter() - started)
+        return hits
+    for position, row in first_row.items():
+        rule = rule_set.rules[position]
+        confidence = 0.9 if rule.regex is not None else 0.7
+        joined = rule.profile.row_local if rule.regex is not None else aligned
+        while row < len(spans):
+            row_start, row_end, _, _ = spans[row]
+            if not joined:
+                span = _row_match(rule, text, row_start, row_end)
+            else:
+                if rule.regex is not None:
+                    match = rule.regex.search(text, row_start)
+                    span = (match.start(), match.end()) if match else None
+                else:
+                    at = folded.find(rule.keyword, row_start)
+                    span = (at, at + len(rule.keyword)) if at != -1 else None
+                if span is None:
+                    break
+                row = bisect_right(starts, span[0]) - 1
+                row_start, row_end, _, _ = spans[row]
+                if span[1] > row_end:
+                    span = _row_match(rule, text, row_start, row_end)
+            if span is not None:
+                hits.append([position, span[0], span[1], confidence])
+            row += 1
+    if stats is not None:
+        stats.split_wall(first_row, time.perf_counter() - started)
+    return hits
+
+
+def _section_hits(
+    rule_set: CompiledRuleSet,
+    text: str,
+    allowed: Optional[FrozenSet[int]],
+    semantic_scores: Any = None,
+    row: int = 0,
+    stats: Optional[RuleStatsRecorder] = None,
+    spans: Spans = None,
+) -> CachedHits:
+    """
+    Raw [rule position, start, end, confidence] hits for one section.
+
+    A semantic hit covers a whole row: start is -1, or the row's start in a
+    chunked section, whose rows are scored from semantic_scores row on.
+    """
+    found: CachedHits = [
+        [position, start, end, 0.9]
+        for position, start, end in _regex_hits(rule_set, text, allowed, stats)
+    ]
+
+    started = time.perf_counter()
+    folded = text.casefold()
+    for position, start in _keyword_hits(rule_set, folded, allowed):
+        end = start + len(rule_set.rules[position].keyword)
+        found.append([position, *_unfold_span(text, folded, start, end), 0.7])
+    if stats is not None and rule_set.keyword_rules:
+        stats.add_shared(
+            (position for position, _ in rule_set.keyword_rules),
+            time.perf_counter() - started,
+        )
+
+    if spans:
+        found = _span_hits(rule_set, text, folded, allowed, spans, found, stats)
+
+    if semantic_scores is not None:
+        row_starts = [span[0] for span in spans] if spans else [-1]
+        for scored, start in enumerate(row_starts, row):
+            for column in matching_rules(semantic_scores, scored):
+                position, _ = rule_set.semantic_rules[column]
+                if allowed is not None and position not in allowed:
+                    continue
+                found.append(
+                    [position, start, -1, round(float(semantic_scores[scored, column]), 2)]
+                )
+    return found
+
+
+def _guarded_regex_hits(
+    rule_set: CompiledRuleSet,
+    pending: Dict[CacheKey, _Item],
+    skipped: List[Dict[str, Any]],
+    stats: Optional[RuleStatsRecorder] = None,
+) -> Tuple[Dict[CacheKey, CachedHits], set]:
+    """
+    Run guarded regex rules in the sandbox, one call per rule with the
+    budget applied to each candidate text.
+
+    Returns the hits per section key and the keys left incomplete by a
+    timed-out rule, which must not be cached. Chunked sections are searched
+    a row at a time.
+    """
+    found: Dict[CacheKey, CachedHits] = {}
+    incomplete: set = set()
+    if not rule_set.guarded_regex_rules or not pending:
+        return found, incomplete
+
+    views = {key: _prefilter_view(text) for key, (text, _, _) in pending.items()}
+    sandbox = get_regex_sandbox()
+    for position, rule in rule_set.guarded_regex_rules:
+        # (section key, text to search, its offset in the section, where the
+        # search starts and, for a split piece, where its own text ends)
+        candidates: List[Tuple[CacheKey, str, int, int, Optional[int]]] = []
+        for key, (text, allowed, spans) in pending.items():
+            if allowed is not None and position not in allowed:
+                continue
+            if views[key][0] is not None and not rule.profile.may_match(*views[key]):
+                continue
+            if _is_split_piece(text, spans):
+                # Whole, so the search sees the row around the piece
+                start, end, _, _ = spans[0]
+                candidates.append((key, text, 0, start, end))
+            elif spans:
+                candidates.extend(
+                    (key, text[start:end], start, 0, None) for start, end, _, _ in spans
+                )
+            else:
+                candidates.append((key, text, 0, 0, None))
+        if not candidates or rule.regex is None:
+            continue
+        started = time.perf_counter()
+        try:
+            spans = sandbox.search_many(
+                rule.regex.pattern,
+                rule.regex.flags,
+                [text for _, text, _, _, _ in candidates],
+                starts=[start for _, _, _, start, _ in candidates],
+            )
+        except RegexTimeout as timeout:
+            # One text ran past the budget: keep what was answered before it
+            # and skip the rule for the rest of the document
+            spans = timeout.completed
+            unchecked = {key for key, *_ in candidates[len(spans) :]}
+            skipped.append(
+                {
+                    "rule_id": rule.id,
+                    "rule": rule.name,
+                    "error_code": REGEX_TIMEOUT_ERROR_CODE,
+                    "sections": len(unchecked),
+                    "under_load": timeout.under_load,
+                }
+            )
+            incomplete.update(unchecked)
+        if stats is not None:
+            stats.add_wall(position, time.perf_counter() - started)
+        for (key, text, offset, _, end), span in zip(candidates, spans):
+            if span is None:
+                continue
+            # As in _piece_match: past a split piece's cut is the next piece's
+            if end is not None and (
+                span[0] >= end or (end < len(text) and span[1] > end)
+            ):
+                continue
+            found.setdefault(key, []).append(
+                [position, offset + span[0], offset + span[1], 0.9]
+            )
+    return found, incomplete
+
+
+def _pending_hits(
+    rule_set: CompiledRuleSet,
+    items: List[_Item],
+    semantic_backend: str,
+    stats: RuleStatsRecorder,
+) -> List[CachedHits]:
+    """Keyword, standalone regex and semantic hits for sections not in the cache."""
+    # Score rows: a section, or each row of a chunked section
+    score_texts: List[str] = []
+    first_rows: List[int] = []
+    for text, _, spans in items:
+        first_rows.append(len(score_texts))
+        if spans:
+            score_texts.extend(text[start:end] for start, end, _, _ in spans)
+        else:
+            score_texts.append(text)
+
+    # Every semantic rule against every pending row in one pass. The
+    # pgvector backend answers semantic rules from the section index instead.
+    semantic_scores = None
+    if items and rule_set.semantic_rules and semantic_backend != "pgvector":
+        started = time.perf_counter()
+        semantic_scores = score_matrix(
+            rule_set.semantic_vectors,
+            score_texts,
+            intents=rule_set.semantic_intents,
+            backend=semantic_backend,
+        )
+        stats.add_shared(
+            (position for position, _ in rule_set.semantic_rules),
+            time.perf_counter() - started,
+        )
+
+    return [
+        _section_hits(rule_set, text, allowed, semantic_scores, row, stats, spans)
+        for row, (text, allowed, spans) in zip(first_rows, items)
+    ]
+
+
+# Rule sets compiled in a rule pool worker, by version, most recent last
+_worker_rule_sets: "OrderedDict[str, CompiledRuleSet]" = OrderedDict()
+# Versions a worker keeps compiled; more than a few workspaces rarely
+# evaluate large documents at once
+_WORKER_RULE_SETS = 8
+
+
+def _worker_rule_set(version: str) -> CompiledRuleSet:
+    rule_set = _worker_rule_sets.get(version)
+    if rule_set is None:
+        rule_set = _worker_rule_sets[version] = CompiledRuleSet(
+            load_rule_set(version), version=version
+        )
+        while len(_worker_rule_sets) > _WORKER_RULE_SETS:
+            _worker_rule_sets.popitem(last=False)
+    _worker_rule_sets.move_to_end(version)
+    return rule_set
+
+
+def _evaluate_shard(
+    version: str,
+    items: List[_Item],
+    semantic_backend: str,
+) -> Tuple[List[CachedHits], List[float]]:
+    """Pool worker: hits for a slice of pending sections, plus per-rule wall time."""
+    rule_set = _worker_rule_set(version)
+    stats = RuleStatsRecorder(len(rule_set.rules))
+    for _, allowed, _ in items:
+        stats.scanned_section(allowed)
+    hits = _pending_hits(rule_set, items, semantic_backend, stats)
+    # as_dicts settles the shared-pass time into per-rule wall
+    stats.as_dicts(rule_set.rules)
+    return hits, stats.wall
+
+
+def _submit_shards(
+    rule_set: CompiledRuleSet,
+    items: List[_Item],
+    semantic_backend: str,
+    workers: int,
+) -> Optional[Tuple[ProcessPoolExecutor, List[Future]]]:
+    """Shard pending sections across the rule pool; None if the pool is broken."""
+    pool = get_rule_pool()
+    try:
+        publish_rule_set(rule_set.version, rule_set.source_rules)
+        return pool, [
+            pool.submit(_evaluate_shard, rule_set.version, shard_items, semantic_backend)
+            for shard_items in shard(items, workers * 4)
+        ]
+    except BrokenProcessPool:
+        shutdown_rule_pool(pool)
+        return None
+
+
+def _collect_shards(
+    pool: ProcessPoolExecutor, futures: List[Future], stats: RuleStatsRecorder
+) -> Optional[List[CachedHits]]:
+    """Shard results in order, or None if a worker died and broke the pool."""
+    hits: List[CachedHits] = []
+    walls: List[List[float]] = []
+    try:
+        for future in futures:
+            shard_hits, shard_wall = future.result()
+            hits.extend(shard_hits)
+            walls.append(shard_wall)
+    except BrokenProcessPool:
+        # Later documents get a new pool; this one is evaluated in-process
+        shutdown_rule_pool(pool)
+        return None
+    for shard_wall in walls:
+        for position, seconds in enumerate(shard_wall):
+            stats.add_wall(position, seconds)
+    return hits
+
+
+class EvaluationResult:
+    """Violations, the rules that could not be evaluated, and per-rule cost."""
+
+    def __init__(
+        self,
+        violations: List[Dict[str, Any]],
+        skipped: List[Dict[str, Any]],
+        rule_stats: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.violations = violations
+        self.skipped = skipped
+        self.rule_stats = rule_stats or []
 
 
 def evaluate_rules(
-    rules: Iterable[Dict[str, Any]],
+    rules: CompiledRuleSet | Iterable[Dict[str, Any]],
     sections: Iterable[Dict[str, Any]],
+    semantic_backend: str | None = None,
+    match_cache: Optional[SectionMatchCache] = None,
 ) -> List[Dict[str, Any]]:
-    violations: List[Dict[str, Any]] = []
+    """
+    Evaluate policy rules against document sections.
+
+    semantic_backend overrides SEMANTIC_BACKEND ("vector", "legacy" or
+    "pgvector", which leaves semantic rules to services.semantic_index).
+    With a match_cache, sections whose text was already evaluated under the
+    same rule-set version and route reuse the stored hits.
+    """
+    return run_rules(rules, sections, semantic_backend, match_cache).violations
+
+
+def run_rules(
+    rules: CompiledRuleSet | Iterable[Dict[str, Any]],
+    sections: Iterable[Dict[str, Any]],
+    semantic_backend: str | None = None,
+    match_cache: Optional[SectionMatchCache] = None,
+    positions: Optional[FrozenSet[int]] = None,
+) -> EvaluationResult:
+    """
+    evaluate_rules, also reporting guarded regex rules that timed out.
+
+    positions limits the run to those rules of the compiled set, which is
+    then reused as is instead of compiling a smaller one.
+    """
+    rule_set = rules if isinstance(rules, CompiledRuleSet) else CompiledRuleSet(rules)
+    rule_list = rule_set.rules
+    semantic_backend = semantic_backend or SEMANTIC_BACKEND
+    cache_version = f"{rule_set.version}:{semantic_backend}"
 
-    for rule in rules:
-        if not rule.get("is_active", True):
+    prepared: List[_Section] = []
+    route = rule_set.router.route
+    # Few distinct routes per document; hash each one once
+    route_keys: Dict[Optional[FrozenSet[int]], str] = {}
+    for section in sections:
+        text = str(section.get("text", ""))
+        if not text:
             continue
+        label = section.get("label")
+        allowed = route(label, section.get("fields"))
+        if positions is not None:
+            allowed = positions if allowed is None else allowed & positions
+        route_key = route_keys.get(allowed)
+        if route_key is None:
+            route_key = route_keys[allowed] = _route_key(allowed)
+        spans = section.get("spans") or None
+        fingerprint = section.get("fingerprint") or chunk_fingerprint(text, spans)
+        prepared.append(
+            _Section(
+                text,
+                allowed,
+                (fingerprint, cache_version, route_key),
+                section.get("chunk_id"),
+                label,
+                spans,
+            )
+        )
 
-        pattern_type = rule.get("pattern_type", "keyword")
-        needle = (rule.get("pattern") or rule.get("name") or "").strip()
-        description = (rule.get("description") or "").strip()
-        remediation = rule.get("remediation")
+    section_hits: Dict[CacheKey, CachedHits] = {}
+    if match_cache is not None:
+        section_hits = match_cache.get_many(section.key for section in prepared)
 
-        for section in sections:
-            text = str(section.get("text", ""))
-            if not text:
-                continue
+    # Sections still to evaluate, one per distinct key.
+    pending: Dict[CacheKey, _Item] = {}
+    for section in prepared:
+        if section.key not in section_hits:
+            pending.setdefault(
+                section.key, (section.text, section.allowed, section.spans)
+            )
+    if match_cache is not None:
+        match_cache.hits += len(prepared) - len(pending)
+        match_cache.misses += len(pending)
 
-            if pattern_type == "regex":
-                try:
-                    match = re.search(needle, text, flags=re.IGNORECASE)
-                except re.error:
-                    match = None
-
-                if match:
-                    start, end = match.span()
-                    violations.append(
-                        {
-                            "rule_id": rule.get("id"),
-                            "rule": rule.get("name"),
-                            "severity": rule.get("severity"),
-                            "evidence": _snippet(text, start, end),
-                            "location": {
-                                "chunk_id": section.get("chunk_id"),
-                                "label": section.get("label"),
-                            },
-                            "confidence": 0.9,
-                            "recommended_fix": remediation,
-                        }
-                    )
-            elif pattern_type == "semantic":
-                intent = description or needle
-                score = _semantic_score(intent, text)
-                if score >= 0.75:
-                    violations.append(
-                        {
-                            "rule_id": rule.get("id"),
-                            "rule": rule.get("name"),
-                            "severity": rule.get("severity"),
-                            "evidence": text[:200],
-                            "location": {
-                                "chunk_id": section.get("chunk_id"),
-                                "label": section.get("label"),
-                            },
-                            "confidence": round(score, 2),
-                            "recommended_fix": remediation,
-                        }
-                    )
-            else:
-                if needle and needle.lower() in text.lower():
-                    start = text.lower().find(needle.lower())
-                    end = start + len(needle)
-                    violations.append(
-                        {
-                            "rule_id": rule.get("id"),
-                            "rule": rule.get("name"),
-                            "severity": rule.get("severity"),
-                            "evidence": _snippet(text, start, end),
-                            "location": {
-                                "chunk_id": section.get("chunk_id"),
-                                "label": section.get("label"),
-                            },
-                            "confidence": 0.7,
-                            "recommended_fix": remediation,
-                        }
-                    )
-
-    return violations
+    stats = RuleStatsRecorder(len(rule_list))
+    for section in prepared:
+        if section.key in section_hits:
+            stats.cached_section(section.allowed)
+        else:
+            stats.scanned_section(section.allowed)
+
+    skipped: List[Dict[str, Any]] = []
+    workers = parallel_workers(len(pending))
+    # Shards go to the pool; the guarded regex pass already runs out of
+    # process, so the parent drives it while the workers scan.
+    submitted = None
+    if workers > 1:
+        submitted = _submit_shards(
+            rule_set, list(pending.values()), semantic_backend, workers
+        )
+    guarded, incomplete = _guarded_regex_hits(rule_set, pending, skipped, stats)
+    pending_hits = _collect_shards(*submitted, stats) if submitted else None
+    if pending_hits is None:
+        pending_hits = _pending_hits(
+            rule_set, list(pending.values()), semantic_backend, stats
+        )
+
+    fresh: Dict[CacheKey, CachedHits] = {}
+    for key, found in zip(pending, pending_hits):
+        fresh[key] = found
+        fresh[key].extend(guarded.get(key, ()))
+    section_hits.update(fresh)
+    if match_cache is not None:
+        match_cache.put_many(
+            {key: found for key, found in fresh.items() if key not in incomplete}
+        )
+
+    # Raw matches as (rule position, section position, start, end,
+    # confidence) tuples; a rule hits a section, or a row of a chunked one,
+    # at most once, so plain tuple order is the rule-major order callers
+    # rely on. Violation dicts are only built here, at the output boundary.
+    matches: List[Tuple[int, int, int, int, float]] = []
+    for section_position, section in enumerate(prepared):
+        for position, start, end, confidence in section_hits[section.key]:
+            matches.append((position, section_position, start, end, confidence))
+    matches.sort()
+
+    violations: List[Dict[str, Any]] = []
+    append = violations.append
+    matches_per_rule = stats.matches
+    # The pieces of a split row overlap, and columnar CSV cells share their
+    # row's label; report each rule once per row
+    reported_rows: set = set()
+    for position, section_position, start, end, confidence in matches:
+        section = prepared[section_position]
+        text = section.text
+        label = None
+        if section.starts is not None and section.spans is not None:
+            # Evidence and location come from the row the match is in
+            row_start, row_end, label, _ = section.spans[
+                max(bisect_right(section.starts, start) - 1, 0)
+            ]
+            text, start, end = text[row_start:row_end], start - row_start, end - row_start
+        row = section.label if label is None else label
+        if row is not None:
+            if (position, row) in reported_rows:
+                continue
+            reported_rows.add((position, row))
+        matches_per_rule[position] += 1
+        evidence = text[:200] if start < 0 or end < 0 else _snippet(text, start, end)
+        append(_violation(rule_list[position], section, evidence, confidence, label))
+    return EvaluationResult(violations, skipped, stats.as_dicts(rule_list))
@@ -0,0 +1,131 @@
+"""
+Process pool for evaluating one large document on several cores.
+
+One long-lived pool serves every workspace and rule-set version. A rule
+set's source rules are published once per pool, to a file in the pool's
+directory named after its version; tasks carry only the version, and a
+worker reads the rules the first time it sees one. Workers keep the last
+few versions they saw compiled, so concurrent evaluations under different
+rule sets share the pool instead of replacing it.
+
+A worker that dies (out of memory, a crash) breaks the whole pool; callers
+discard it with shutdown_rule_pool and the next document gets a new one.
+"""
+
+import atexit
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from typing import Any, Dict, List, Optional, Sequence
+
+# Documents with fewer sections to evaluate stay in-process
+RULE_ENGINE_PARALLEL_MIN_SECTIONS = int(
+    os.getenv("RULE_ENGINE_PARALLEL_MIN_SECTIONS", "5000")
+)
+# 0 = one worker per CPU; 1 disables the pool
+RULE_ENGINE_WORKERS = int(os.getenv("RULE_ENGINE_WORKERS", "0"))
+RULE_ENGINE_PARALLEL_START_METHOD = os.getenv(
+    "RULE_ENGINE_PARALLEL_START_METHOD", "spawn"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# The current pool's rule set directory and the versions published to it;
+# in a worker, the directory its pool was started with
+_rule_set_dir: Optional[str] = None
+_published: set = set()
+
+
+def worker_count() -> int:
+    return RULE_ENGINE_WORKERS or os.cpu_count() or 1
+
+
+def parallel_workers(section_count: int) -> int:
+    """Workers to shard this many sections across; 1 means stay in-process."""
+    workers = worker_count()
+    if workers <= 1 or section_count < RULE_ENGINE_PARALLEL_MIN_SECTIONS:
+        return 1
+    return workers
+
+
+def _init_worker(rule_set_dir: str) -> None:
+    global _rule_set_dir
+    _rule_set_dir = rule_set_dir
+
+
+def _rule_set_path(directory: str, version: str) -> str:
+    return os.path.join(directory, sha256(version.encode()).hexdigest() + ".pickle")
+
+
+def get_rule_pool() -> ProcessPoolExecutor:
+    global _pool, _rule_set_dir
+    with _pool_lock:
+        if _pool is None:
+            _rule_set_dir = tempfile.mkdtemp(prefix="rule-pool-")
+            _published.clear()
+            _pool = ProcessPoolExecutor(
+                max_workers=worker_count(),
+                mp_context=multiprocessing.get_context(
+                    RULE_ENGINE_PARALLEL_START_METHOD
+                ),
+                initializer=_init_worker,
+                initargs=(_rule_set_dir,),
+            )
+        return _pool
+
+
+def publish_rule_set(version: str, rules: List[Dict[str, Any]]) -> None:
+    """Make a rule set's source rules readable by the current pool's workers."""
+    with _pool_lock:
+        if _rule_set_dir is None or version in _published:
+            return
+        path = _rule_set_path(_rule_set_dir, version)
+        staged = f"{path}.{threading.get_ident()}"
+        with open(staged, "wb") as handle:
+            pickle.dump(rules, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staged, path)
+        _published.add(version)
+
+
+def load_rule_set(version: str) -> List[Dict[str, Any]]:
+    """In a worker: the source rules published for a version."""
+    if _rule_set_dir is None:
+        raise RuntimeError("not a rule pool worker")
+    with open(_rule_set_path(_rule_set_dir, version), "rb") as handle:
+        return pickle.load(handle)
+
+
+def shutdown_rule_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Shut the pool down; given a pool, only if it is still the current one."""
+    global _pool, _rule_set_dir
+    with _pool_lock:
+        if pool is not None and pool is not _pool:
+            return
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        if _rule_set_dir is not None:
+            shutil.rmtree(_rule_set_dir, ignore_errors=True)
+        _pool = None
+        _rule_set_dir = None
+        _published.clear()
+
+
+atexit.register(shutdown_rule_pool)
+
+
+def shard(items: Sequence[Any], shards: int) -> List[Sequence[Any]]:
+    """Contiguous, near-equal slices, so results concatenate back in order."""
+    size, extra = divmod(len(items), shards)
+    slices = []
+    start = 0
+    for index in range(shards):
+        end = start + size + (1 if index < extra else 0)
+        if end > start:
+            slices.append(items[start:end])
+        start = end
+    return slices
@@ -0,0 +1,98 @@
+"""
+Per-rule cost accounting for one evaluation.
+
+Wall time is attributed as precisely as the engine allows: standalone regex
+and sandboxed rules are timed individually, a regex alternation is split
+evenly across the rules it served in that section, and whole-document passes
+(the keyword automaton, the semantic score matrix) are split in proportion to
+the sections each rule was routed. Sections scanned and cache hits are counted
+per route, so scoped rules only count the sections routed to them.
+"""
+
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+class RuleStatsRecorder:
+    def __init__(self, rule_count: int):
+        self.wall = [0.0] * rule_count
+        self.scanned = [0] * rule_count
+        self.matches = [0] * rule_count
+        self.cache_hits = [0] * rule_count
+        self._scanned_routes: Dict[Optional[FrozenSet[int]], int] = {}
+        self._cached_routes: Dict[Optional[FrozenSet[int]], int] = {}
+        self._shared: List[Tuple[List[int], float]] = []
+
+    def add_wall(self, position: int, seconds: float) -> None:
+        self.wall[position] += seconds
+
+    def split_wall(self, positions: Iterable[int], seconds: float) -> None:
+        positions = list(positions)
+        if not positions:
+            return
+        share = seconds / len(positions)
+        for position in positions:
+            self.wall[position] += share
+
+    def add_shared(self, positions: Iterable[int], seconds: float) -> None:
+        """A pass over every section for these rules, split by sections scanned."""
+        self._shared.append((list(positions), seconds))
+
+    def scanned_section(self, allowed: Optional[FrozenSet[int]]) -> None:
+        self._scanned_routes[allowed] = self._scanned_routes.get(allowed, 0) + 1
+
+    def cached_section(self, allowed: Optional[FrozenSet[int]]) -> None:
+        self._cached_routes[allowed] = self._cached_routes.get(allowed, 0) + 1
+
+    def _expand(self, routes: Dict[Optional[FrozenSet[int]], int], counts: List[int]) -> None:
+        for allowed, count in routes.items():
+            positions = range(len(counts)) if allowed is None else allowed
+            for position in positions:
+                counts[position] += count
+
+    def as_dicts(self, rules: List[Any]) -> List[Dict[str, Any]]:
+        """One entry per rule that saw at least one section, most expensive first."""
+        self._expand(self._scanned_routes, self.scanned)
+        self._expand(self._cached_routes, self.cache_hits)
+        self._scanned_routes.clear()
+        self._cached_routes.clear()
+
+        for positions, seconds in self._shared:
+            weights = [self.scanned[position] for position in positions]
+            total = sum(weights)
+            if not total:
+                self.split_wall(positions, seconds)
+                continue
+            for position, weight in zip(positions, weights):
+                self.wall[position] += seconds * weight / total
+        self._shared.clear()
+
+        stats = [
+            {
+                "rule_id": rule.id,
+                "rule": rule.name,
+                "pattern_type": rule.pattern_type,
+                "wall_ms": round(self.wall[position] * 1000, 3),
+                "sections_scanned": self.scanned[position],
+                "matches": self.matches[position],
+                "cache_hits": self.cache_hits[position],
+            }
+            for position, rule in enumerate(rules)
+            if self.scanned[position] or self.cache_hits[position]
+        ]
+        stats.sort(key=lambda entry: entry["wall_ms"], reverse=True)
+        return stats
+
+
+def merge_rule_stats(*runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sum as_dicts() output from several evaluations of the same document."""
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for run in runs:
+        for entry in run:
+            current = merged.get(entry["rule_id"])
+            if current is None:
+                merged[entry["rule_id"]] = dict(entry)
+                continue
+            current["wall_ms"] = round(current["wall_ms"] + entry["wall_ms"], 3)
+            for field in ("sections_scanned", "matches", "cache_hits"):
+                current[field] += entry[field]
+    return sorted(merged.values(), key=lambda entry: entry["wall_ms"], reverse=True)
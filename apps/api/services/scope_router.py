@@ -0,0 +1,111 @@
+"""
+Scope-aware routing of policy rules to document sections.
+
+PolicyRule.scope holds tokens such as ["notes"] or ["body", "attachments"].
+A section is routed to the rules whose scope names one of its label parts
+(json.<key>, csv.row.N.<column>, text.line.N) or, for CSV rows, one of its
+columns.
+Document-wide scopes, an empty scope, whole-document sections and sections
+whose label names no field (text.line.N, json[N]) keep the previous "every
+rule on every section" behaviour: nothing says which field free text
+belongs to, so a scoped rule may still apply to it.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+UNIVERSAL_SCOPES = frozenset({"*", "all", "body", "document", "sections"})
+WHOLE_DOCUMENT_LABELS = frozenset({"", "raw"})
+# Label parts that only say where a section came from, not which field it is
+STRUCTURAL_PARTS = frozenset({"json", "csv", "row", "text", "line"})
+
+_PART_SPLIT = re.compile(r"[.\[\]]+")
+_WORD_SPLIT = re.compile(r"[\s_\-]+")
+
+# Distinct label shapes per document are few; cap the memo regardless.
+MAX_ROUTE_CACHE = 4096
+
+
+def label_shape(label: str) -> str:
+    """A label with its row and line numbers masked: csv.row.# for csv.row.7."""
+    return ".".join("#" if part.isdigit() else part for part in _PART_SPLIT.split(label))
+
+
+def names_field(label: str, fields: Sequence[str] = ()) -> bool:
+    """Whether a section's label or columns say which field it holds."""
+    if any(str(field).strip() for field in fields):
+        return True
+    return any(
+        part and not part.isdigit() and part not in STRUCTURAL_PARTS
+        for part in _PART_SPLIT.split(label.lower())
+    )
+
+
+def section_route_tokens(label: str, fields: Sequence[str] = ()) -> FrozenSet[str]:
+    """Scope tokens a section answers to: label parts, their words and dotted prefixes."""
+    tokens = set()
+    lowered = label.lower()
+    prefix = ""
+    for part in _PART_SPLIT.split(lowered):
+        if not part or part.isdigit():
+            continue
+        prefix = f"{prefix}.{part}" if prefix else part
+        tokens.add(part)
+        tokens.add(prefix)
+        tokens.update(word for word in _WORD_SPLIT.split(part) if word)
+
+    for field in fields:
+        name = str(field).lower().strip()
+        if name:
+            tokens.add(name)
+            tokens.update(word for word in _WORD_SPLIT.split(name) if word)
+    return frozenset(tokens)
+
+
+class ScopeRouter:
+    """Label -> applicable rule positions, built once per compiled rule set."""
+
+    def __init__(self, scopes: Iterable[Tuple[int, Tuple[str, ...]]]):
+        self.universal: List[int] = []
+        self.by_token: Dict[str, List[int]] = {}
+        self.all_positions: List[int] = []
+
+        for position, scope in scopes:
+            self.all_positions.append(position)
+            if not scope or UNIVERSAL_SCOPES.intersection(scope):
+                self.universal.append(position)
+                continue
+            for token in scope:
+                self.by_token.setdefault(token, []).append(position)
+
+        self.scoped = bool(self.by_token)
+        self._routes: Dict[Tuple[str, Tuple[str, ...]], Optional[FrozenSet[int]]] = {}
+
+    def route(
+        self, label: Optional[str], fields: Optional[Sequence[str]] = None
+    ) -> Optional[FrozenSet[int]]:
+        """
+        Rule positions that apply to a section, or None when all of them do.
+        """
+        label = label or ""
+        if not self.scoped or label in WHOLE_DOCUMENT_LABELS:
+            return None
+
+        field_key = tuple(fields or ())
+        # Row and line numbers never affect routing, so csv.row.1 and
+        # csv.row.2 share one memo entry.
+        signature = (label_shape(label), field_key)
+        if signature in self._routes:
+            return self._routes[signature]
+
+        route: Optional[FrozenSet[int]] = None
+        if names_field(label, field_key):
+            positions = set(self.universal)
+            for token in section_route_tokens(label, field_key):
+                positions.update(self.by_token.get(token, ()))
+            route = frozenset(positions)
+
+        if len(self._routes) >= MAX_ROUTE_CACHE:
+            self._routes.clear()
+        self._routes[signature] = route
+        return route
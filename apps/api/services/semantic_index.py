@@ -0,0 +1,83 @@
+"""
+Semantic rule evaluation against the pgvector section index.
+
+With SEMANTIC_BACKEND=pgvector, sections are embedded when they are
+processed. Each semantic rule then becomes one nearest-neighbour query,
+scoped to a single document or to a whole workspace's corpus, instead of
+a Python loop over sections.
+"""
+
+from typing import Any, Callable, Dict, List
+
+from services.embeddings import get_embedder
+from services.rule_engine import CompiledRuleSet
+from services.semantic_matcher import SEMANTIC_BACKEND, SEMANTIC_THRESHOLD
+
+# Upper bound on hits returned per rule and query.
+MAX_MATCHES_PER_RULE = 500
+
+
+def index_enabled() -> bool:
+    return SEMANTIC_BACKEND == "pgvector"
+
+
+def embed_sections(sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Embed section texts with the configured embedder."""
+    embedder = get_embedder()
+    vectors = embedder.embed([str(section.get("text", "")) for section in sections])
+    return {"embedder": embedder.name, "embeddings": vectors.tolist()}
+
+
+def semantic_index_violations(
+    rule_set: CompiledRuleSet,
+    search: Callable[..., List[Dict[str, Any]]],
+    processed_id: int | None = None,
+    org_id: int | None = None,
+    workspace_id: int | None = None,
+    limit: int = MAX_MATCHES_PER_RULE,
+) -> List[Dict[str, Any]]:
+    """
+    Run every semantic rule as a nearest-neighbour query.
+
+    `search` is the `search_similar_sections` tool. Without a processed_id
+    the query spans the whole workspace and each location carries the
+    processed_id it was found in.
+    """
+    if not rule_set.semantic_rules:
+        return []
+
+    vectors = get_embedder().embed(rule_set.semantic_intents)
+    violations: List[Dict[str, Any]] = []
+
+    for (position, rule), vector in zip(rule_set.semantic_rules, vectors):
+        matches = search(
+            embedding=vector.tolist(),
+            org_id=org_id,
+            workspace_id=workspace_id,
+            processed_id=processed_id,
+            min_score=SEMANTIC_THRESHOLD,
+            limit=limit,
+        )
+        for match in sorted(matches, key=lambda m: m.get("section_index") or 0):
+            allowed = rule_set.router.route(match.get("label"))
+            if allowed is not None and position not in allowed:
+                continue
+            location: Dict[str, Any] = {
+                "chunk_id": match.get("chunk_id"),
+                "label": match.get("label"),
+            }
+            if processed_id is None:
+                location["processed_id"] = match.get("processed_id")
+            violations.append(
+                {
+                    "rule_id": rule.id,
+                    "rule": rule.name,
+                    "severity": rule.severity,
+                    "evidence": match.get("preview"),
+                    "location": location,
+                    "confidence": round(float(match["score"]), 2),
+                    "recommended_fix": rule.remediation,
+                }
+            )
+
+    return violations
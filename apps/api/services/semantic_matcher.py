@@ -0,0 +1,91 @@
+"""
+Vectorized semantic matching for semantic policy rules.
+
+Texts are embedded as hashed character-trigram vectors (sublinear term
+frequency, L2-normalized), so scoring every semantic rule against every
+section of a document is one matrix multiply. Scores are cosine
+similarities in [0, 1] and use the same 0.75 threshold as the legacy
+SequenceMatcher scorer, which stays available via SEMANTIC_BACKEND=legacy
+for parity testing.
+"""
+
+import os
+from difflib import SequenceMatcher
+from typing import List, Sequence
+
+import numpy as np
+
+SEMANTIC_BACKEND = os.getenv("SEMANTIC_BACKEND", "vector")
+SEMANTIC_THRESHOLD = 0.75
+
+HASH_DIMENSIONS = int(os.getenv("SEMANTIC_HASH_DIMENSIONS", str(1 << 14)))
+# Sections are embedded in batches to keep the dense matrix small.
+SECTION_BATCH_SIZE = 512
+
+_PRIME = np.uint64(1_000_003)
+
+
+def legacy_score(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def embed_text(text: str, dimensions: int = HASH_DIMENSIONS) -> np.ndarray:
+    padded = f" {text.lower()} "
+    codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(
+        np.uint64
+    )
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if codes.size < 3:
+        return vector
+
+    hashes = (codes[:-2] * _PRIME + codes[1:-1]) * _PRIME + codes[2:]
+    buckets = (hashes % np.uint64(dimensions)).astype(np.int64)
+    counts = np.bincount(buckets, minlength=dimensions).astype(np.float32)
+    np.log1p(counts, out=vector)
+
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector
+
+
+def embed_texts(texts: Sequence[str], dimensions: int = HASH_DIMENSIONS) -> np.ndarray:
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        matrix[row] = embed_text(text, dimensions)
+    return matrix
+
+
+def score_matrix(
+    intent_vectors: np.ndarray,
+    texts: Sequence[str],
+    intents: Sequence[str] | None = None,
+    backend: str | None = None,
+) -> np.ndarray:
+    """
+    Score every text against every rule intent.
+
+    Returns a (len(texts), len(intents)) array of similarities. The legacy
+    backend needs the raw intents and runs the pairwise SequenceMatcher.
+    """
+    backend = backend or SEMANTIC_BACKEND
+    rule_count = intent_vectors.shape[0] if intents is None else len(intents)
+    scores = np.zeros((len(texts), rule_count), dtype=np.float64)
+    if not texts or not rule_count:
+        return scores
+
+    if backend == "legacy":
+        for row, text in enumerate(texts):
+            for column, intent in enumerate(intents or []):
+                scores[row, column] = legacy_score(intent, text)
+        return scores
+
+    for start in range(0, len(texts), SECTION_BATCH_SIZE):
+        batch = embed_texts(texts[start : start + SECTION_BATCH_SIZE])
+        scores[start : start + len(batch)] = batch @ intent_vectors.T
+    return scores
+
+
+def matching_rules(scores: np.ndarray, row: int) -> List[int]:
+    """Column indexes of rules at or above the threshold for one text."""
+    return np.flatnonzero(scores[row] >= SEMANTIC_THRESHOLD).tolist()
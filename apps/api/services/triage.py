@@ -0,0 +1,152 @@
+"""
+Fast-triage evaluation for risk-capped runs.
+
+score_risk caps at RISK_SCORE_CAP, so a triage run only has to prove the cap
+is reached. Rules are evaluated in order of expected risk contribution
+(severity weight x past hit rate), in batches that double in size, and over
+the sections a chunk at a time. Violation score floors are summed as they
+come in; once they reach the cap the run stops and is reported as partial,
+keeping just the violations that proved it.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from services.risk_model import (
+    RISK_SCORE_CAP,
+    SEVERITY_WEIGHTS,
+    violation_score_floor,
+)
+from services.rule_engine import CompiledRule, CompiledRuleSet, run_rules
+from services.rule_stats import merge_rule_stats
+
+TRIAGE_FIRST_BATCH = int(os.getenv("TRIAGE_FIRST_BATCH", "4"))
+TRIAGE_SECTION_CHUNK = int(os.getenv("TRIAGE_SECTION_CHUNK", "500"))
+# Hit rate assumed for rules without recorded stats yet
+TRIAGE_DEFAULT_HIT_RATE = float(os.getenv("TRIAGE_DEFAULT_HIT_RATE", "0.05"))
+
+EVALUATION_MODES = ("full", "triage")
+
+
+def rule_priority(rule: CompiledRule, hit_rates: Dict[int, float]) -> float:
+    """Expected score contribution per section: severity weight x hit rate."""
+    weight = SEVERITY_WEIGHTS.get(
+        str(rule.severity or "medium").lower(), SEVERITY_WEIGHTS["medium"]
+    )
+    hit_rate = hit_rates.get(rule.id, TRIAGE_DEFAULT_HIT_RATE)
+    return weight * hit_rate
+
+
+def order_rules(rule_set: CompiledRuleSet, hit_rates: Dict[int, float]) -> List[int]:
+    """Positions of the rule set's active rules, highest priority first."""
+    # sorted is stable, so equal priorities keep the stored rule order
+    return sorted(
+        range(len(rule_set.rules)),
+        key=lambda position: rule_priority(rule_set.rules[position], hit_rates),
+        reverse=True,
+    )
+
+
+class TriageResult:
+    def __init__(self):
+        self.violations: List[Dict[str, Any]] = []
+        self.skipped: List[Dict[str, Any]] = []
+        self.rule_stats: List[Dict[str, Any]] = []
+        self.score_floor = 0.0
+        self.saturated = False
+        # Rules run over every section, and rules cut short by saturation
+        self.rules_evaluated = 0
+        self.rules_partial = 0
+        self.rules_total = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "saturated": self.saturated,
+            "score_floor": round(self.score_floor, 2),
+            "rules_evaluated": self.rules_evaluated,
+            "rules_partial": self.rules_partial,
+            "rules_total": self.rules_total,
+        }
+
+
+def _merge_skipped(
+    skipped: List[Dict[str, Any]], more: List[Dict[str, Any]]
+) -> None:
+    """One entry per timed-out rule, however many chunks it timed out in."""
+    by_rule = {entry["rule_id"]: entry for entry in skipped}
+    for entry in more:
+        if entry["rule_id"] in by_rule:
+            merged = by_rule[entry["rule_id"]]
+            merged["sections"] += entry["sections"]
+            # One overrun of its own is enough to count towards quarantine
+            merged["under_load"] = bool(
+                merged.get("under_load") and entry.get("under_load")
+            )
+        else:
+            by_rule[entry["rule_id"]] = dict(entry)
+            skipped.append(by_rule[entry["rule_id"]])
+
+
+def triage_rules(
+    rule_set: CompiledRuleSet,
+    sections: List[Dict[str, Any]],
+    hit_rates: Optional[Dict[int, float]] = None,
+    semantic_backend: str | None = None,
+) -> TriageResult:
+    """
+    Evaluate rules most-likely-to-saturate first, stopping at the risk cap.
+
+    Each batch runs on the workspace's compiled rule set, limited to the
+    batch's rule positions. The match cache is not used: batches change
+    with the hit rates, so their entries would rarely be read again.
+    """
+    ordered = order_rules(rule_set, hit_rates or {})
+    result = TriageResult()
+    result.rules_total = len(ordered)
+    chunk = max(TRIAGE_SECTION_CHUNK, 1)
+
+    # A row's columnar CSV cells can fall in different section chunks;
+    # count each rule once per row, as a single run_rules call does
+    reported_rows: set = set()
+    start, batch_size = 0, max(TRIAGE_FIRST_BATCH, 1)
+    while start < len(ordered) and not result.saturated:
+        batch = ordered[start : start + batch_size]
+        positions = frozenset(batch)
+        complete = True
+        for offset in range(0, len(sections), chunk):
+            evaluation = run_rules(
+                rule_set,
+                sections[offset : offset + chunk],
+                semantic_backend=semantic_backend,
+                positions=positions,
+            )
+            _merge_skipped(result.skipped, evaluation.skipped)
+            result.rule_stats = merge_rule_stats(
+                result.rule_stats, evaluation.rule_stats
+            )
+            # Keep only the violations needed to prove the cap; storing the
+            # rest is what a full run is for
+            for violation in evaluation.violations:
+                label = violation["location"]["label"]
+                if label is not None:
+                    if (violation["rule_id"], label) in reported_rows:
+                        continue
+                    reported_rows.add((violation["rule_id"], label))
+                result.violations.append(violation)
+                result.score_floor += violation_score_floor(
+                    violation.get("severity"), violation.get("confidence")
+                )
+                if result.score_floor >= RISK_SCORE_CAP:
+                    result.saturated = True
+                    break
+            if result.saturated:
+                complete = offset + chunk >= len(sections)
+                break
+        if complete:
+            result.rules_evaluated += len(batch)
+        else:
+            result.rules_partial += len(batch)
+        start += len(batch)
+        batch_size *= 2
+
+    return result
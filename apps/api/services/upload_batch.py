@@ -0,0 +1,209 @@
+"""
+Batch uploads.
+
+POST /upload/batch takes many multipart files, zip/tar archives among them,
+or an NDJSON request body with one document per line. Each file is stored in
+the blob store as it is read; the raw_data and adk_runs rows for the whole
+batch are then inserted in one transaction, and the workflows run from a
+single background task.
+"""
+
+import io
+import lzma
+import os
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from functools import partial
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, List, Optional
+
+from fastapi import UploadFile
+from services.blob_store import delete_blob
+from services.compression import (
+    DECOMPRESSION_ERRORS,
+    MAGIC_BYTES,
+    CorruptUpload,
+    detect_encoding,
+    open_decompressed,
+)
+from services.ingest import (
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_MAX_BYTES,
+    StoredUpload,
+    UploadTooLarge,
+    build_raw_content,
+    store_stream,
+)
+
+UPLOAD_BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "10000"))
+# Total size of the batch after archives are expanded
+UPLOAD_BATCH_MAX_BYTES = int(os.getenv("UPLOAD_BATCH_MAX_BYTES", str(4 * 1024**3)))
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+ARCHIVE_CONTENT_TYPES = (
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/x-tar",
+)
+
+
+# What a corrupt or truncated archive raises while it is listed or read:
+# a bad zip directory or member CRC, a broken deflate/gzip/xz stream, a
+# tar cut short, a zip compression method Python does not support
+ARCHIVE_ERRORS = (
+    zipfile.BadZipFile,
+    tarfile.TarError,
+    zlib.error,
+    lzma.LZMAError,
+    EOFError,
+    NotImplementedError,
+)
+
+
+class BatchError(ValueError):
+    """A batch the client has to fix: unreadable archive, too many files."""
+
+
+def is_archive(file_name: Optional[str], content_type: str) -> bool:
+    name = (file_name or "").lower()
+    return name.endswith(ARCHIVE_SUFFIXES) or content_type in ARCHIVE_CONTENT_TYPES
+
+
+class BatchCollector:
+    """
+    Stores the files of one batch and builds their raw_data content, in
+    upload order, within UPLOAD_BATCH_MAX_FILES and UPLOAD_BATCH_MAX_BYTES.
+    """
+
+    def __init__(self):
+        self.files: List[Dict[str, Any]] = []
+        self.total_bytes = 0
+        # Blobs this batch added to the store, for discard()
+        self.created_digests: List[str] = []
+
+    def _store(
+        self, source: BinaryIO, file_name: Optional[str], content_encoding: str
+    ) -> StoredUpload:
+        if len(self.files) >= UPLOAD_BATCH_MAX_FILES:
+            raise BatchError(f"Batch exceeds {UPLOAD_BATCH_MAX_FILES} files")
+        remaining = UPLOAD_BATCH_MAX_BYTES - self.total_bytes
+        # Stop a decompression bomb as soon as it passes either limit
+        limit = min(UPLOAD_MAX_BYTES, remaining)
+        try:
+            stored = store_stream(
+                source, file_name, content_encoding, max_bytes=limit
+            )
+        except UploadTooLarge:
+            raise UploadTooLarge(
+                UPLOAD_MAX_BYTES if limit == UPLOAD_MAX_BYTES else UPLOAD_BATCH_MAX_BYTES
+            )
+        self.total_bytes += stored.size
+        if stored.created:
+            self.created_digests.append(stored.digest)
+        return stored
+
+    def discard(self, keep: Iterable[str] = ()) -> None:
+        """Delete the blobs a rejected batch added, except digests in keep."""
+        kept = set(keep)
+        for digest in self.created_digests:
+            if digest not in kept:
+                delete_blob(digest)
+        self.created_digests = []
+
+    def add_file(
+        self,
+        source: BinaryIO,
+        file_name: Optional[str],
+        content_type: str = "",
+        content_encoding: str = "",
+    ) -> None:
+        stored = self._store(source, file_name, content_encoding)
+        self.files.append(build_raw_content(stored, file_name, content_type))
+
+    def add_upload(self, upload: UploadFile) -> None:
+        """A multipart file: the files in it if it is an archive, else itself."""
+        content_type = upload.content_type or ""
+        if not is_archive(upload.filename, content_type):
+            self.add_file(
+                upload.file,
+                upload.filename,
+                content_type,
+                upload.headers.get("content-encoding", ""),
+            )
+            return
+        if upload.size is not None and upload.size > UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(UPLOAD_MAX_BYTES)
+        self.add_archive(upload.file, upload.filename)
+
+    def add_archive(self, source: BinaryIO, archive_name: Optional[str]) -> None:
+        """Every regular file in a zip or tar archive, named by its path in it."""
+        name = archive_name or "archive"
+        try:
+            self._add_archive_members(source, f"{archive_name}/" if archive_name else "")
+        except ARCHIVE_ERRORS as exc:
+            raise BatchError(f"{name} is corrupt or truncated") from exc
+
+    def _add_archive_members(self, source: BinaryIO, prefix: str) -> None:
+        if zipfile.is_zipfile(source):
+            source.seek(0)
+            with zipfile.ZipFile(source) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                        continue
+                    with archive.open(info) as member:
+                        self.add_file(member, prefix + info.filename)
+            return
+
+        source.seek(0)
+        try:
+            archive = tarfile.open(fileobj=source, mode="r:*")
+        except tarfile.TarError:
+            raise BatchError(f"{prefix.rstrip('/') or 'archive'} is not a zip or tar archive")
+        with archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                member = archive.extractfile(info)
+                if member is not None:
+                    with member:
+                        self.add_file(member, prefix + info.name)
+
+    def add_ndjson(self, source: BinaryIO, content_encoding: str = "") -> None:
+        """One JSON document per non-blank line of an NDJSON body."""
+        head = source.read(MAGIC_BYTES)
+        source.seek(0)
+        encoding = detect_encoding(head, content_encoding=content_encoding)
+        if encoding:
+            with open_decompressed(source, encoding) as decompressed:
+                try:
+                    self._add_ndjson_lines(decompressed)
+                except DECOMPRESSION_ERRORS as exc:
+                    raise CorruptUpload(f"Body is not valid {encoding} data") from exc
+        else:
+            self._add_ndjson_lines(source)
+
+    def _add_ndjson_lines(self, source: BinaryIO) -> None:
+        # A line longer than the per-file limit comes back without its newline
+        read_line = partial(source.readline, UPLOAD_MAX_BYTES + 1)
+        for index, line in enumerate(iter(read_line, b"")):
+            if len(line.rstrip(b"\r\n")) > UPLOAD_MAX_BYTES:
+                raise UploadTooLarge(UPLOAD_MAX_BYTES)
+            if line.strip():
+                self.add_file(
+                    io.BytesIO(line.strip()), f"line-{index}.json", "application/json"
+                )
+
+
+async def spool_body(chunks: AsyncIterator[bytes]) -> BinaryIO:
+    """A request body in a temp file, within UPLOAD_BATCH_MAX_BYTES."""
+    body = tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_BYTES)
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > UPLOAD_BATCH_MAX_BYTES:
+            body.close()
+            raise UploadTooLarge(UPLOAD_BATCH_MAX_BYTES)
+        body.write(chunk)
+    body.seek(0)
+    return body
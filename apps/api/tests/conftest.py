@@ -0,0 +1,126 @@
+"""Database fixtures; tests that use them skip when DATABASE_URL is unreachable."""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# Rows a tenant owns, children first
+TENANT_TABLES = (
+    "section_embeddings",
+    "violations",
+    "reports",
+    "processed_data",
+    "adk_runs",
+    "raw_data",
+    "policy_rule_stats",
+    "policy_rules",
+    "workspaces",
+)
+
+
+@pytest.fixture(scope="session")
+def database():
+    import db
+
+    db.engine.echo = False
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("database not reachable")
+    return db
+
+
+@pytest.fixture
+def tenant(database):
+    """A fresh org and workspace, deleted with everything in them afterwards."""
+    from models import Org, Workspace
+
+    now = datetime.now(timezone.utc)
+    with database.SessionLocal() as session:
+        org = Org(name=f"test-{uuid4().hex[:8]}", created_at=now)
+        session.add(org)
+        session.flush()
+        workspace = Workspace(org_id=org.id, name="test", created_at=now)
+        session.add(workspace)
+        session.commit()
+        ids = {"org_id": org.id, "workspace_id": workspace.id}
+
+    yield ids
+
+    with database.engine.begin() as conn:
+        for table in TENANT_TABLES:
+            # section_embeddings exists only with the pgvector backend
+            if conn.execute(text("SELECT to_regclass(:table)"), {"table": table}).scalar():
+                conn.execute(text(f"DELETE FROM {table} WHERE org_id = :org_id"), ids)
+        conn.execute(text("DELETE FROM orgs WHERE id = :org_id"), ids)
+
+
+@pytest.fixture
+def processed_document(database, tenant):
+    """Store a processed document with the given sections; returns its id."""
+    from models import ProcessedData, RawData
+
+    def store(sections, run_id=None):
+        now = datetime.now(timezone.utc)
+        with database.SessionLocal() as session:
+            raw = RawData(
+                **tenant,
+                content={"raw_text": "", "file_type": "text"},
+                source="test",
+                created_at=now,
+            )
+            session.add(raw)
+            session.flush()
+            processed = ProcessedData(
+                **tenant,
+                raw_id=raw.id,
+                run_id=run_id,
+                structured={"raw_id": raw.id, "sections": sections},
+                created_at=now,
+            )
+            session.add(processed)
+            session.commit()
+            return processed.id
+
+    return store
+
+
+@pytest.fixture
+def client(database, tenant, tmp_path, monkeypatch):
+    """
+    An API client acting as the tenant, with its own blob store. Workflows
+    are recorded in client.queued instead of run.
+    """
+    # The routers import the ADK runner
+    pytest.importorskip("google.adk")
+    from fastapi.testclient import TestClient
+
+    import main
+    from routers import upload
+    from security import AuthContext, get_auth_context
+    from services import blob_store
+
+    monkeypatch.setattr(blob_store, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    queued = []
+    monkeypatch.setattr(upload, "run_compliance_workflow", lambda *args: queued.append(args))
+    monkeypatch.setattr(upload, "run_compliance_batch", lambda *args: queued.append(args))
+    main.app.dependency_overrides[get_auth_context] = lambda: AuthContext(**tenant)
+    try:
+        with TestClient(main.app) as test_client:
+            test_client.queued = queued
+            yield test_client
+    finally:
+        main.app.dependency_overrides.pop(get_auth_context, None)
+
+
+def stored_blobs(root):
+    """Digests in a blob store directory, staging files aside."""
+    return sorted(
+        path.name.split(".")[0]
+        for path in root.glob("blobs/*/*")
+        if path.parent.name != "tmp"
+    )
@@ -0,0 +1,86 @@
+"""gzip and zstd uploads are stored as their content; broken streams are CorruptUpload."""
+
+import gzip
+import io
+from hashlib import sha256
+
+import pytest
+import zstandard
+
+from services import blob_store, ingest
+from services.compression import CorruptUpload
+from services.ingest import UploadTooLarge, store_stream
+from tests.conftest import stored_blobs
+
+CONTENT = b"".join(b"ticket %d: card 4111 1111 1111 1111\n" % i for i in range(5000))
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "zstd": lambda data: zstandard.ZstdCompressor().compress(data),
+}
+
+
+@pytest.fixture
+def blobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+
+@pytest.mark.parametrize("keep_compressed", [False, True])
+@pytest.mark.parametrize(
+    "encoding, file_name, header",
+    [
+        ("gzip", "notes.txt.gz", ""),
+        ("zstd", "notes.txt.zst", ""),
+        ("gzip", "notes.txt", "gzip"),
+        # Recognised by the magic bytes alone
+        ("zstd", "notes.txt", ""),
+    ],
+)
+def test_round_trip(blobs, monkeypatch, keep_compressed, encoding, file_name, header):
+    monkeypatch.setattr(ingest, "UPLOAD_KEEP_COMPRESSED", keep_compressed)
+    compressed = COMPRESSORS[encoding](CONTENT)
+
+    stored = store_stream(io.BytesIO(compressed), file_name, header)
+
+    assert stored.digest == sha256(CONTENT).hexdigest()
+    assert (stored.size, stored.encoding) == (len(CONTENT), encoding)
+    assert stored.compressed_size == len(compressed)
+    with blob_store.open_blob(stored.digest) as blob:
+        assert blob.read() == CONTENT
+
+
+def test_multi_frame_zstd_reads_every_frame(blobs):
+    compressor = zstandard.ZstdCompressor()
+    half = len(CONTENT) // 2
+    frames = compressor.compress(CONTENT[:half]) + compressor.compress(CONTENT[half:])
+
+    stored = store_stream(io.BytesIO(frames), "notes.zst")
+
+    assert stored.digest == sha256(CONTENT).hexdigest()
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+@pytest.mark.parametrize("keep", [0.5, 0.99])
+def test_truncated_stream_is_corrupt(blobs, encoding, keep):
+    compressed = COMPRESSORS[encoding](CONTENT)
+    cut = compressed[: int(len(compressed) * keep)]
+
+    with pytest.raises(CorruptUpload, match=encoding):
+        store_stream(io.BytesIO(cut), f"notes.{'gz' if encoding == 'gzip' else 'zst'}")
+    # Nothing committed and no staging file left behind
+    assert stored_blobs(blobs) == []
+    assert not list(blobs.glob("blobs/tmp/*"))
+
+
+def test_garbage_with_a_gzip_name_is_corrupt(blobs):
+    with pytest.raises(CorruptUpload):
+        store_stream(io.BytesIO(b"plain text, not gzip"), "notes.gz")
+
+
+def test_size_limit_applies_to_the_decompressed_content(blobs):
+    compressed = gzip.compress(CONTENT)
+    assert len(compressed) < len(CONTENT) // 4
+
+    with pytest.raises(UploadTooLarge):
+        store_stream(io.BytesIO(compressed), "notes.gz", max_bytes=len(CONTENT) // 2)
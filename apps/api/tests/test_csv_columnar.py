@@ -0,0 +1,56 @@
+"""Columnar CSV sections must report what whole-row sections report."""
+
+import json
+from copy import deepcopy
+from io import BytesIO
+
+import pytest
+
+from seed.demo_policy_rules import DEMO_POLICY_RULES
+from services.chunking import chunk_rows
+from services.ingest import iter_csv_cells, iter_csv_rows
+from services.rule_engine import evaluate_rules
+
+CSV_UPLOAD = (
+    b"ticket,notes,ssn,body\n"
+    b"9921,Card number 4111 1111 1111 1111 pasted,,HIPAA consent statement missing\n"
+    b"9922,Customer shared SSN 555-23-9144,555-23-9144,\n"
+    b"9923,no issues,,\"multi-line\nbody, quoted\"\n"
+    b"9924,HIPAA and PHI mentioned,,card 4111 1111 1111 1111 again\n"
+    b"9925,ragged row,,,surplus,fields\n"
+)
+
+# Matches a column name, which only the row's JSON spells out
+HEADER_RULE = {"name": "ssn column", "pattern_type": "keyword", "pattern": "\"ssn\""}
+
+
+def _rules():
+    rules = deepcopy(DEMO_POLICY_RULES) + [dict(HEADER_RULE)]
+    for rule_id, rule in enumerate(rules, start=1):
+        rule["id"] = rule_id
+        rule["scope"] = []
+    return rules
+
+
+def _hits(rows):
+    sections = [
+        {"label": label, "text": text, "fields": fields, "spans": spans}
+        for label, text, fields, spans in chunk_rows(rows, max_chars=400, overlap=20)
+    ]
+    return sorted(
+        (v["rule_id"], v["location"]["label"])
+        for v in evaluate_rules(_rules(), sections, semantic_backend="vector")
+    )
+
+
+@pytest.mark.parametrize("batch_rows", [1, 2, 1000])
+def test_columnar_cells_match_whole_rows(batch_rows):
+    records = list(iter_csv_rows(BytesIO(CSV_UPLOAD)))
+    whole_rows = [
+        (f"csv.row.{index}", json.dumps(row), [str(key) for key in row.keys()])
+        for index, row in enumerate(records)
+    ]
+    cells = list(iter_csv_cells(records, batch_rows=batch_rows))
+
+    assert _hits(cells) == _hits(whole_rows)
+    assert any(rule_id == len(_rules()) for rule_id, _ in _hits(cells))
@@ -0,0 +1,83 @@
+"""Rule re-evaluation keeps retired violations and skips edits that match nothing new."""
+
+from models import Violation
+
+
+def _rule(tools, tenant, pattern):
+    return tools["create_policy_rule"](
+        name="card number",
+        description=None,
+        severity="high",
+        category="pci",
+        pattern_type="keyword",
+        pattern=pattern,
+        scope=None,
+        remediation=None,
+        is_active=True,
+        **tenant,
+    )
+
+
+def _rows(database, processed_id):
+    with database.SessionLocal() as session:
+        return (
+            session.query(Violation)
+            .filter(Violation.processed_id == processed_id)
+            .order_by(Violation.id)
+            .all()
+        )
+
+
+def test_reevaluation_retires_instead_of_deleting(database, tenant, processed_document):
+    from adk.tools.tools_registry import get_adk_tools
+    from services.delta_compliance import reevaluate_policy_rule
+
+    tools = get_adk_tools()
+    processed_id = processed_document(
+        [
+            {"chunk_id": 0, "label": "text.line.0", "text": "card on file"},
+            {"chunk_id": 1, "label": "text.line.1", "text": "account closed"},
+        ]
+    )
+    rule = _rule(tools, tenant, "card")
+
+    first = reevaluate_policy_rule(rule["id"], **tenant)
+    assert first["violations_inserted"] == 1
+    (found,) = tools["get_violations_by_processed_id"](processed_id, **tenant)
+
+    updated = tools["update_policy_rule"](
+        rule["id"], {"pattern": "account"}, **tenant
+    )
+    assert updated["matching_changed"]
+    second = reevaluate_policy_rule(rule["id"], **tenant)
+    assert (second["violations_retired"], second["violations_inserted"]) == (1, 1)
+
+    rows = _rows(database, processed_id)
+    assert [row.id for row in rows if row.retired_at is not None] == [found["id"]]
+    live = tools["get_violations_by_processed_id"](processed_id, **tenant)
+    assert [v["details"]["evidence"] for v in live] == ["account closed"]
+
+    deactivated = tools["deactivate_policy_rule"](rule["id"], **tenant)
+    assert deactivated["matching_changed"]
+    reevaluate_policy_rule(rule["id"], **tenant)
+    assert tools["get_violations_by_processed_id"](processed_id, **tenant) == []
+    # Both violations stay as the rule's history
+    assert len(_rows(database, processed_id)) == 2
+
+
+def test_edits_that_match_the_same_skip_reevaluation(database, tenant):
+    from adk.tools.tools_registry import get_adk_tools
+
+    tools = get_adk_tools()
+    rule = _rule(tools, tenant, "card")
+
+    renamed = tools["update_policy_rule"](
+        rule["id"], {"name": "card on file", "remediation": "Mask it"}, **tenant
+    )
+    assert not renamed["matching_changed"]
+    same_pattern = tools["update_policy_rule"](rule["id"], {"pattern": "card"}, **tenant)
+    assert not same_pattern["matching_changed"]
+
+    tools["deactivate_policy_rule"](rule["id"], **tenant)
+    again = tools["deactivate_policy_rule"](rule["id"], **tenant)
+    assert not again["matching_changed"]
@@ -0,0 +1,100 @@
+"""Rule changes leave cached hits alone; the prune removes dead ones in batches."""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from models import SectionMatchCacheEntry
+
+
+@pytest.fixture
+def cache_rows(database):
+    """Insert cache rows by (rule set fingerprint, age in days); yields their ids."""
+    prefix = uuid4().hex[:8]
+    ids = []
+
+    def insert(fingerprint, age_days=0):
+        with database.SessionLocal() as session:
+            row = SectionMatchCacheEntry(
+                fingerprint=f"{prefix}{len(ids)}",
+                rule_set_version=f"{fingerprint}:vector",
+                route_key="",
+                hits=[],
+                created_at=datetime.now(timezone.utc) - timedelta(days=age_days),
+            )
+            session.add(row)
+            session.commit()
+            ids.append(row.id)
+        return ids[-1]
+
+    yield insert
+
+    with database.SessionLocal() as session:
+        session.query(SectionMatchCacheEntry).filter(
+            SectionMatchCacheEntry.id.in_(ids)
+        ).delete(synchronize_session=False)
+        session.commit()
+
+
+def _remaining(database, ids):
+    with database.SessionLocal() as session:
+        rows = session.query(SectionMatchCacheEntry.id).filter(
+            SectionMatchCacheEntry.id.in_(ids)
+        )
+        return sorted(row.id for row in rows)
+
+
+def _rule(tools, tenant, pattern):
+    return tools["create_policy_rule"](
+        name=pattern,
+        description=None,
+        severity="high",
+        category="pii",
+        pattern_type="keyword",
+        pattern=pattern,
+        scope=None,
+        remediation=None,
+        is_active=True,
+        **tenant,
+    )
+
+
+def _live_version(database, tools, tenant):
+    """The rule-set version the tenant's checks cache their hits under."""
+    from adk.tools.db_tools import _live_rule_set_versions
+    from services.rule_engine import rule_set_fingerprint
+
+    version = rule_set_fingerprint(tools["get_policy_rules"](**tenant))
+    with database.SessionLocal() as session:
+        assert version in _live_rule_set_versions(session)
+    return version
+
+
+def test_rule_change_leaves_cache_to_the_batched_prune(
+    database, tenant, cache_rows, monkeypatch
+):
+    from adk.tools import db_tools
+    from adk.tools.tools_registry import get_adk_tools
+
+    tools = get_adk_tools()
+    _rule(tools, tenant, "card")
+    before = _live_version(database, tools, tenant)
+    old = [cache_rows(before) for _ in range(5)]
+
+    # The new rule makes every cached version above stale, but the change
+    # itself deletes nothing
+    _rule(tools, tenant, "ssn")
+    assert _remaining(database, old) == old
+
+    current = _live_version(database, tools, tenant)
+    kept = [cache_rows(current), cache_rows(current, age_days=1)]
+    expired = cache_rows(current, age_days=400)
+
+    monkeypatch.setattr(db_tools, "MATCH_CACHE_PRUNE_BATCH", 3)
+    monkeypatch.setattr(db_tools, "MATCH_CACHE_TTL_DAYS", 30)
+    result = tools["prune_section_match_cache"]()
+
+    assert result["stale"] >= len(old)
+    assert result["expired"] >= 1
+    assert _remaining(database, old + kept + [expired]) == kept
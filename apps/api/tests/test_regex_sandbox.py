@@ -0,0 +1,61 @@
+"""Backtracking-prone patterns run under the budget, charged in CPU time."""
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from services.regex_safety import assess_pattern
+from services.regex_sandbox import RegexSandbox, RegexTimeout, _cpu_seconds
+from services.rule_engine import REGEX_TIMEOUT_ERROR_CODE, run_rules
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"\d*\d*\d*\d*x", r".*a.*b.*c.*d.*e", r"\s*\s*\s*\s*!", r"(\d*)(\d*)x"],
+)
+def test_overlapping_repeats_are_guarded(pattern):
+    assessment = assess_pattern(pattern)
+    assert not assessment.rejected
+    assert assessment.guarded
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"\w+@\w+\.com", r"\b\d{3}-\d{2}-\d{4}\b", r"[a-z]+\s*=\s*\d+", r"\w+\s+\w+"],
+)
+def test_repeats_that_cannot_trade_characters_stay_inline(pattern):
+    assert not assess_pattern(pattern).guarded
+
+
+def test_overlapping_repeats_time_out_instead_of_hanging():
+    rules = [
+        {"id": 1, "name": "digits", "pattern_type": "regex", "pattern": r"\d*\d*\d*\d*x"}
+    ]
+    # The x gets past the literal prefilter; the digits before it do not match
+    started = time.monotonic()
+    evaluation = run_rules(rules, [{"label": "text.line.0", "text": "1" * 600 + "-x"}])
+
+    assert time.monotonic() - started < 10
+    (skipped,) = evaluation.skipped
+    assert skipped["error_code"] == REGEX_TIMEOUT_ERROR_CODE
+    assert not skipped["under_load"]
+
+
+@pytest.mark.skipif(_cpu_seconds(os.getpid()) is None, reason="needs /proc")
+def test_starved_worker_times_out_under_load():
+    sandbox = RegexSandbox()
+    sandbox._ensure_worker()
+    pid = sandbox._process.pid
+    # Stop the worker right after it starts, as a saturated machine would
+    stopper = threading.Timer(0.01, os.kill, (pid, signal.SIGSTOP))
+    stopper.start()
+    try:
+        with pytest.raises(RegexTimeout) as timeout:
+            sandbox.search_many(r"(\d*)(\d*)(\d*)x", 0, ["1" * 3000], budget_ms=100)
+        assert timeout.value.under_load
+    finally:
+        stopper.cancel()
+        sandbox.close()
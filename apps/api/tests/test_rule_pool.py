@@ -0,0 +1,45 @@
+"""A rule pool broken by a dead worker is replaced, not reused."""
+
+import os
+
+import pytest
+
+from services import rule_pool
+from services.rule_engine import run_rules
+
+RULES = [
+    {"id": 1, "name": "card", "pattern_type": "keyword", "pattern": "card"},
+    {"id": 2, "name": "ssn", "pattern_type": "regex", "pattern": r"\b\d{3}-\d{2}-\d{4}\b"},
+]
+SECTIONS = [
+    {"label": f"text.line.{index}", "text": f"row {index} card 123-45-{index:04d}"}
+    for index in range(40)
+]
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    monkeypatch.setattr(rule_pool, "RULE_ENGINE_WORKERS", 2)
+    monkeypatch.setattr(rule_pool, "RULE_ENGINE_PARALLEL_MIN_SECTIONS", 10)
+    rule_pool.shutdown_rule_pool()
+    yield
+    rule_pool.shutdown_rule_pool()
+
+
+def _hits(evaluation):
+    return sorted((v["rule_id"], v["location"]["label"]) for v in evaluation.violations)
+
+
+def test_broken_pool_falls_back_in_process_and_is_replaced(small_pool):
+    expected = _hits(run_rules(RULES, SECTIONS))
+    assert len(expected) == 80
+
+    broken = rule_pool.get_rule_pool()
+    with pytest.raises(Exception):
+        broken.submit(os._exit, 1).result()
+
+    assert _hits(run_rules(RULES, SECTIONS)) == expected
+    # The next document gets a new pool, whose workers read the rules once
+    assert _hits(run_rules(RULES, SECTIONS)) == expected
+    assert rule_pool.get_rule_pool() is not broken
+    assert len(rule_pool._published) == 1
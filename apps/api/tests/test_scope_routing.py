@@ -0,0 +1,67 @@
+"""Scope routing must not lose hits that every-rule-on-every-section found."""
+
+from copy import deepcopy
+from io import BytesIO
+
+from seed.demo_policy_rules import DEMO_POLICY_RULES
+from services.ingest import iter_lines
+from services.rule_engine import evaluate_rules
+
+TEXT_UPLOAD = (
+    b"Support ticket #9921\n"
+    b"Card number 4111 1111 1111 1111 pasted into the notes.\n"
+    b"Customer shared SSN 555-23-9144 in chat transcript.\n"
+    b"HIPAA consent statement missing.\n"
+)
+
+
+def _rules(scoped: bool):
+    rules = deepcopy(DEMO_POLICY_RULES)
+    for rule_id, rule in enumerate(rules, start=1):
+        rule["id"] = rule_id
+        if not scoped:
+            rule["scope"] = []
+    return rules
+
+
+def _hits(violations):
+    return sorted(
+        (v["rule_id"], v["location"]["label"], v["evidence"]) for v in violations
+    )
+
+
+def test_text_upload_matches_unscoped_baseline():
+    sections = [
+        {"label": f"text.line.{index}", "text": line.strip()}
+        for index, line in enumerate(iter_lines(BytesIO(TEXT_UPLOAD)))
+        if line.strip()
+    ]
+    scoped = evaluate_rules(_rules(scoped=True), sections, semantic_backend="vector")
+    baseline = evaluate_rules(_rules(scoped=False), sections, semantic_backend="vector")
+
+    assert _hits(scoped) == _hits(baseline)
+    # The "notes"-scoped card rule still sees free text
+    assert any(rule_id == 2 for rule_id, _, _ in _hits(scoped))
+
+
+def test_union_winner_outside_the_route_is_not_reported():
+    def rule(rule_id, pattern, scope):
+        return {
+            "id": rule_id,
+            "name": pattern,
+            "pattern_type": "regex",
+            "pattern": pattern,
+            "scope": [scope],
+        }
+
+    # One alternation; A wins it on this text but is not routed to email
+    rules = [
+        rule(1, r"secret\w*", "notes"),
+        rule(2, r"foo\w*", "email"),
+        rule(3, r"bar\w*", "email"),
+    ]
+    sections = [{"label": "json.email", "text": "secret foo bar"}]
+
+    hits = evaluate_rules(rules, sections, semantic_backend="vector")
+
+    assert sorted(v["rule_id"] for v in hits) == [2, 3]
@@ -0,0 +1,93 @@
+"""Nearest-section search returns a document's matches however busy the index is."""
+
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from models import EMBEDDING_DIMENSIONS, SectionEmbedding
+
+pytestmark = pytest.mark.skipif(
+    SectionEmbedding is None, reason="needs SEMANTIC_BACKEND=pgvector"
+)
+
+
+def _unit(vector):
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@contextmanager
+def _planned_as_a_large_table():
+    """
+    Run the tools in one transaction that plans like a table too large to
+    sort: ordered by the HNSW index wherever the query allows it.
+    """
+    from adk.tools.unit_of_work import unit_of_work
+
+    with unit_of_work() as db:
+        for name in ("enable_seqscan", "enable_bitmapscan", "enable_sort"):
+            db.execute(text("SELECT set_config(:name, 'off', true)"), {"name": name})
+        yield
+
+
+def _store(tools, processed_id, vectors):
+    sections = [
+        {"label": f"text.line.{i}", "text": f"line {i}"} for i in range(len(vectors))
+    ]
+    tools["create_section_embeddings"](
+        processed_id=processed_id, sections=sections, embeddings=vectors
+    )
+
+
+def test_document_search_is_not_crowded_out_by_other_documents(
+    database, tenant, processed_document
+):
+    from adk.tools.tools_registry import get_adk_tools
+
+    tools = get_adk_tools()
+    rng = np.random.default_rng(7)
+    query = np.zeros(EMBEDDING_DIMENSIONS)
+    query[0] = 1.0
+
+    # A busy document whose sections are all closer to the query
+    busy = processed_document([])
+    near = query + rng.normal(0, 0.01, (400, EMBEDDING_DIMENSIONS))
+    _store(tools, busy, [_unit(vector) for vector in near])
+    # The document being checked: five sections at cosine similarity ~0.8
+    target = processed_document([])
+    far = 0.8 * query + 0.6 * np.eye(EMBEDDING_DIMENSIONS)[1:6]
+    _store(tools, target, [_unit(vector) for vector in far])
+
+    with _planned_as_a_large_table():
+        hits = tools["search_similar_sections"](
+            query.tolist(), processed_id=target, min_score=0.7, limit=50, **tenant
+        )
+
+    assert len(hits) == 5
+    assert {hit["processed_id"] for hit in hits} == {target}
+    assert all(hit["score"] == pytest.approx(0.8) for hit in hits)
+
+
+def test_workspace_search_returns_more_than_the_default_ef_search(
+    database, tenant, processed_document
+):
+    from adk.tools.tools_registry import get_adk_tools
+
+    tools = get_adk_tools()
+    rng = np.random.default_rng(11)
+    query = np.zeros(EMBEDDING_DIMENSIONS)
+    query[0] = 1.0
+    busy = processed_document([])
+    near = query + rng.normal(0, 0.01, (400, EMBEDDING_DIMENSIONS))
+    _store(tools, busy, [_unit(vector) for vector in near])
+
+    with _planned_as_a_large_table():
+        hits = tools["search_similar_sections"](
+            query.tolist(), min_score=0.5, limit=150, **tenant
+        )
+
+    # hnsw.ef_search defaults to 40, which caps the scan at 40 rows; past
+    # that, how many of the 400 it reaches is up to the approximate index
+    assert 40 < len(hits) <= 150
+    assert {hit["processed_id"] for hit in hits} == {busy}
@@ -0,0 +1,60 @@
+"""Rows split across sections must hit the same rules as the whole row."""
+
+import pytest
+
+from services.chunking import chunk_rows
+from services.rule_engine import evaluate_rules
+
+RULES = [
+    {"id": 1, "name": "starts", "pattern_type": "regex", "pattern": r"^Patient"},
+    {"id": 2, "name": "ends", "pattern_type": "regex", "pattern": r"notes$"},
+    {"id": 3, "name": "word", "pattern_type": "regex", "pattern": r"\bcard\b"},
+    {"id": 4, "name": "behind", "pattern_type": "regex", "pattern": r"(?<!no )consent"},
+    {"id": 5, "name": "keyword", "pattern_type": "keyword", "pattern": "hipaa"},
+    {
+        "id": 6,
+        "name": "card number",
+        "pattern_type": "regex",
+        "pattern": r"\b(?:\d[ -]*?){13,16}\b",
+    },
+]
+
+
+def _placed(words, length=120):
+    """A row of dashes with each word written at its offset."""
+    row = ["-"] * length
+    for offset, word in words:
+        row[offset : offset + len(word)] = word
+    return "".join(row)
+
+
+# Words at and next to the cuts of every max_chars below (overlap 20), where
+# an edge would pass for a row start, row end or word boundary
+ROWS = [
+    _placed([(offset, "Patient") for offset in (20, 30, 44, 60)]),
+    _placed([(end - 5, "notes") for end in (40, 64, 80)] + [(100, "card")]),
+    _placed([(offset, "card") for offset in (20, 30, 44, 60)]),
+    _placed([(20, "consent"), (57, "consent"), (90, "no consent")]),
+    "discount card 4111 1111 1111 1111 noted; creditcard and cardholder terms apply",
+    "no consent given and HIPAA waiver pending review by compliance staff members",
+]
+
+
+def _sections(max_chars):
+    rows = [(f"text.line.{index}", row, None) for index, row in enumerate(ROWS)]
+    return [
+        {"label": label, "text": text, "spans": spans}
+        for label, text, _, spans in chunk_rows(rows, max_chars=max_chars, overlap=20)
+    ]
+
+
+def _hits(sections):
+    return sorted(
+        {(v["rule_id"], v["location"]["label"]) for v in evaluate_rules(RULES, sections)}
+    )
+
+
+# The card number is 19 characters; an overlap of 20 keeps it whole
+@pytest.mark.parametrize("max_chars", [40, 50, 64, 80])
+def test_split_rows_match_whole_rows(max_chars):
+    assert _hits(_sections(max_chars)) == _hits(_sections(0))
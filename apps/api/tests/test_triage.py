@@ -0,0 +1,81 @@
+"""Triage stops once the violations found settle the capped risk score."""
+
+from services import triage
+from services.risk_model import RISK_SCORE_CAP, score_risk
+from services.rule_engine import CompiledRuleSet, run_rules
+from services.triage import triage_rules
+
+
+def _rules(count, severity="critical", pattern=lambda rule_id: "card"):
+    return CompiledRuleSet(
+        [
+            {
+                "id": rule_id,
+                "name": f"rule {rule_id}",
+                "severity": severity,
+                "pattern_type": "keyword",
+                "pattern": pattern(rule_id),
+            }
+            for rule_id in range(1, count + 1)
+        ]
+    )
+
+
+def _sections(count, text="card number on file"):
+    return [{"label": f"text.line.{i}", "text": text} for i in range(count)]
+
+
+def _score(violations):
+    return score_risk(
+        [
+            {
+                "severity": v["severity"],
+                "rule": v["rule"],
+                "details": {"rule_id": v["rule_id"], "confidence": v["confidence"]},
+            }
+            for v in violations
+        ]
+    )["score"]
+
+
+def test_stops_at_the_cap_with_the_full_run_score(monkeypatch):
+    monkeypatch.setattr(triage, "TRIAGE_SECTION_CHUNK", 10)
+    rule_set, sections = _rules(40), _sections(50)
+
+    result = triage_rules(rule_set, sections)
+    full = run_rules(rule_set, sections).violations
+
+    assert result.saturated
+    assert result.score_floor >= RISK_SCORE_CAP
+    # Stopped on the first batch, inside its first chunk of sections
+    assert (result.rules_evaluated, result.rules_partial) == (0, triage.TRIAGE_FIRST_BATCH)
+    assert len(result.violations) < len(full)
+    assert _score(result.violations) == _score(full) == RISK_SCORE_CAP
+
+
+def test_runs_every_rule_when_the_cap_is_out_of_reach():
+    rule_set, sections = _rules(10, severity="low"), _sections(1)
+
+    result = triage_rules(rule_set, sections)
+    full = run_rules(rule_set, sections).violations
+
+    assert not result.saturated
+    assert (result.rules_evaluated, result.rules_partial) == (10, 0)
+    key = lambda v: (v["rule_id"], v["location"]["label"])  # noqa: E731
+    assert sorted(map(key, result.violations)) == sorted(map(key, full))
+    assert _score(result.violations) == _score(full) < RISK_SCORE_CAP
+
+
+def test_likely_rules_run_first():
+    # Rule 40 is the only one that fires; with its hit rate known it runs in
+    # the first batch and the rest never do
+    rule_set = _rules(40, pattern=lambda rule_id: "card" if rule_id == 40 else "never")
+    sections = _sections(20)
+
+    cold = triage_rules(rule_set, sections)
+    warm = triage_rules(rule_set, sections, hit_rates={40: 1.0})
+
+    assert cold.saturated and warm.saturated
+    assert warm.rules_evaluated + warm.rules_partial == triage.TRIAGE_FIRST_BATCH
+    assert cold.rules_evaluated + cold.rules_partial == 40
+    assert {v["rule_id"] for v in warm.violations} == {40}
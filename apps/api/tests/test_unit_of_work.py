@@ -0,0 +1,55 @@
+"""A tool failing inside a unit of work leaves the run able to record it."""
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+
+def _queued_run(database, tenant, tools):
+    from models import RawData
+
+    with database.SessionLocal() as session:
+        raw = RawData(**tenant, content={"raw_text": ""}, source="test")
+        session.add(raw)
+        session.commit()
+        raw_id = raw.id
+    return tools["create_adk_run"](raw_id=raw_id, status="queued", **tenant)["id"]
+
+
+def test_failed_tool_rolls_back_and_the_run_records_it(database, tenant):
+    from adk.tools.tools_registry import get_adk_tools
+    from adk.tools.unit_of_work import release, unit_of_work
+
+    tools = get_adk_tools()
+    run_id = _queued_run(database, tenant, tools)
+
+    with unit_of_work():
+        tools["update_adk_run"](run_id=run_id, status="processing")
+        tools["log_agent_action"](agent_name="test", action="before", details={})
+        release()
+        # status is NOT NULL: the flush fails and the session must recover
+        with pytest.raises(IntegrityError):
+            tools["update_adk_run"](run_id=run_id, status=None)
+        tools["update_adk_run"](
+            run_id=run_id, status="failed", error_code="COMPLIANCE_CHECK_FAILED"
+        )
+
+    run = tools["get_adk_run_by_id"](run_id)
+    assert (run["status"], run["error_code"]) == ("failed", "COMPLIANCE_CHECK_FAILED")
+    assert run["processing_at"] is not None
+
+
+def test_exception_outside_a_tool_keeps_earlier_writes(database, tenant):
+    from adk.tools.tools_registry import get_adk_tools
+    from adk.tools.unit_of_work import unit_of_work
+
+    tools = get_adk_tools()
+    run_id = _queued_run(database, tenant, tools)
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            step = tools["create_adk_run_step"](run_id, "data_engineering", "started")
+            tools["finish_adk_run_step"](step["id"])
+            raise RuntimeError("agent bug")
+
+    (step_row,) = tools["get_adk_run_steps"](run_id)
+    assert step_row["finished_at"] is not None
@@ -0,0 +1,164 @@
+"""Batch uploads expand archives and NDJSON bodies and reject bad ones with 4xx."""
+
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from services import blob_store
+from services.compression import CorruptUpload
+from services.upload_batch import BatchCollector, BatchError
+from tests.conftest import stored_blobs
+
+
+@pytest.fixture
+def blobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+
+def _zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _tar(members, mode="w"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _corrupt_zip():
+    """A zip whose second member's deflate stream is overwritten."""
+    data = bytearray(
+        _zip([("good.txt", b"first member " * 50), ("bad.txt", b"second member " * 500)])
+    )
+    with zipfile.ZipFile(io.BytesIO(bytes(data))) as archive:
+        info = archive.getinfo("bad.txt")
+    start = info.header_offset + 30 + len(info.filename) + len(info.extra)
+    data[start + 5 : start + 25] = b"\xff" * 20
+    return bytes(data)
+
+
+def test_archives_expand_into_their_files(blobs):
+    collector = BatchCollector()
+    collector.add_archive(
+        io.BytesIO(_zip([("a.txt", b"card 1"), ("dir/b.txt", b"card 2")])), "notes.zip"
+    )
+    collector.add_archive(io.BytesIO(_tar([("c.txt", b"card 3")], mode="w:gz")), "more.tgz")
+
+    assert [f["file_name"] for f in collector.files] == [
+        "notes.zip/a.txt",
+        "notes.zip/dir/b.txt",
+        "more.tgz/c.txt",
+    ]
+    assert len(stored_blobs(blobs)) == 3
+
+
+def test_ndjson_body_is_one_file_per_line(blobs):
+    lines = [json.dumps({"id": 1, "note": "card"}), "", json.dumps({"id": 2})]
+    collector = BatchCollector()
+    collector.add_ndjson(io.BytesIO("\n".join(lines).encode()))
+
+    assert [f["file_name"] for f in collector.files] == ["line-0.json", "line-2.json"]
+
+
+@pytest.mark.parametrize(
+    "name, data",
+    [
+        ("broken.zip", _corrupt_zip()),
+        ("cut.tar", _tar([("big.txt", bytes(range(256)) * 40)])[:2000]),
+        ("cut.tar.gz", _tar([("big.txt", bytes(range(256)) * 40)], mode="w:gz")[:300]),
+        ("fake.zip", b"not an archive at all"),
+    ],
+)
+def test_corrupt_archives_are_batch_errors(blobs, name, data):
+    collector = BatchCollector()
+    with pytest.raises(BatchError, match=name):
+        collector.add_archive(io.BytesIO(data), name)
+
+
+def test_truncated_ndjson_body_is_corrupt(blobs):
+    import gzip
+
+    body = gzip.compress(b'{"id": 1}\n' * 1000)[:-40]
+    with pytest.raises(CorruptUpload):
+        BatchCollector().add_ndjson(io.BytesIO(body), "gzip")
+
+
+def test_discard_keeps_blobs_that_were_already_stored(blobs):
+    earlier = BatchCollector()
+    earlier.add_file(io.BytesIO(b"stored by an earlier upload"), "old.txt")
+    (kept,) = stored_blobs(blobs)
+
+    collector = BatchCollector()
+    collector.add_file(io.BytesIO(b"stored by an earlier upload"), "again.txt")
+    with pytest.raises(BatchError):
+        collector.add_archive(io.BytesIO(_corrupt_zip()), "broken.zip")
+    # good.txt from the archive is new; the repeat of old.txt is not
+    assert len(collector.created_digests) == 1
+    collector.discard()
+
+    assert stored_blobs(blobs) == [kept]
+
+
+def test_discard_keeps_digests_the_database_references(blobs, database, tenant):
+    from adk.tools.tools_registry import get_adk_tools
+    from models import RawData
+
+    tools = get_adk_tools()
+    collector = BatchCollector()
+    collector.add_file(io.BytesIO(b"first"), "a.txt")
+    collector.add_file(io.BytesIO(b"second"), "b.txt")
+    referenced = collector.files[0]
+    with database.SessionLocal() as session:
+        session.add(
+            RawData(
+                **tenant,
+                content=referenced,
+                source="test",
+                blob_digest=referenced["blob_digest"],
+            )
+        )
+        session.commit()
+
+    keep = tools["find_referenced_blob_digests"](collector.created_digests)
+    assert keep == [referenced["blob_digest"]]
+    collector.discard(keep=keep)
+    assert stored_blobs(blobs) == [referenced["blob_digest"]]
+
+
+def test_rejected_batch_is_a_client_error(client, tmp_path):
+    response = client.post(
+        "/upload/batch", files=[("files", ("broken.zip", _corrupt_zip()))]
+    )
+
+    assert response.status_code == 400
+    assert "broken.zip" in response.json()["detail"]
+    assert stored_blobs(tmp_path) == []
+
+
+def test_batch_expands_archives_over_http(client):
+    response = client.post(
+        "/upload/batch",
+        files=[
+            ("files", ("notes.zip", _zip([("a.txt", b"card 1")]))),
+            ("files", ("plain.txt", b"card 2")),
+        ],
+    )
+
+    assert response.status_code == 200, response.text
+    assert [f["file_name"] for f in response.json()["files"]] == [
+        "notes.zip/a.txt",
+        "plain.txt",
+    ]
+    assert len(client.queued) == 1
@@ -0,0 +1,90 @@
+"""Duplicate uploads reuse a live or completed run for the same bytes and file type."""
+
+from datetime import datetime, timedelta, timezone
+
+DIGEST = "ab" * 32
+VERSION = "rules-v1"
+
+
+def _run(database, tenant, status, file_type="csv", version=VERSION, age=None):
+    from models import ADKRun, RawData
+
+    now = datetime.now(timezone.utc)
+    with database.SessionLocal() as session:
+        raw = RawData(
+            **tenant,
+            content={"blob_digest": DIGEST, "file_type": file_type},
+            file_type=file_type,
+            source="upload",
+            blob_digest=DIGEST,
+        )
+        session.add(raw)
+        session.flush()
+        run = ADKRun(
+            **tenant,
+            raw_id=raw.id,
+            status=status,
+            rule_set_version=version,
+            created_at=now - (age or timedelta()),
+            updated_at=now - age if age else None,
+        )
+        session.add(run)
+        session.commit()
+        return run.id
+
+
+def _lookup(tenant, *keys, version=VERSION):
+    from adk.tools.tools_registry import get_adk_tools
+
+    return get_adk_tools()["find_reusable_upload_runs"](list(keys), version, **tenant)
+
+
+def test_completed_run_is_reused_for_the_same_digest_and_type(database, tenant):
+    _run(database, tenant, "failed")
+    completed = _run(database, tenant, "completed", age=timedelta(days=30))
+
+    found = _lookup(tenant, (DIGEST, "csv"))
+    assert found[(DIGEST, "csv")]["id"] == completed
+    # Same bytes read as JSON, or under other rules, were never checked
+    assert _lookup(tenant, (DIGEST, "json")) == {}
+    assert _lookup(tenant, (DIGEST, "csv"), version="rules-v2") == {}
+
+
+def test_stale_in_flight_run_is_not_reused(database, tenant):
+    from adk.tools.tools_registry import get_adk_tools
+
+    stuck = _run(database, tenant, "processing", age=timedelta(hours=3))
+    assert _lookup(tenant, (DIGEST, "csv")) == {}
+
+    # A workflow step shows the run is alive again
+    get_adk_tools()["create_adk_run_step"](stuck, "compliance", "started")
+    assert _lookup(tenant, (DIGEST, "csv"))[(DIGEST, "csv")]["id"] == stuck
+
+
+def test_batch_repeats_share_a_run_per_file_type(client):
+    files = [
+        ("files", ("a.csv", b"id,note\n1,card\n")),
+        ("files", ("copy.csv", b"id,note\n1,card\n")),
+        ("files", ("a.txt", b"id,note\n1,card\n")),
+    ]
+    first = client.post("/upload/batch", files=files).json()["files"]
+    assert first[1]["duplicate"] and first[1]["run_id"] == first[0]["run_id"]
+    assert first[2]["run_id"] != first[0]["run_id"]
+
+    again = client.post("/upload/batch", files=files[:1]).json()
+    assert again["queued_count"] == 0
+    assert again["files"][0]["run_id"] == first[0]["run_id"]
+
+    forced = client.post("/upload/batch?force=true", files=files[:2]).json()
+    assert forced["queued_count"] == 2
+
+
+def test_single_upload_duplicate_and_force(client):
+    upload = {"file": ("notes.txt", b"card on file")}
+    first = client.post("/upload", files=upload).json()
+    duplicate = client.post("/upload", files=upload).json()
+    assert duplicate["status"] == "duplicate"
+    assert duplicate["run_id"] == first["run_id"]
+
+    forced = client.post("/upload?force=true", files=upload).json()
+    assert forced["run_id"] != first["run_id"]
@@ -0,0 +1,59 @@
+"""Bulk violation inserts return ids in input order, by INSERT or by COPY."""
+
+import pytest
+
+from models import Violation
+
+
+def _violations(count):
+    return [
+        {
+            "rule": f"rule {i}",
+            "severity": ("low", "high")[i % 2],
+            # Characters COPY's text format has to escape
+            "details": {"rule_id": i, "evidence": f"tab\\t\"quote\"\nline {i} é"},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("copy_threshold", [0, 1])
+@pytest.mark.parametrize("in_unit_of_work", [False, True])
+def test_ids_follow_input_order(
+    database, tenant, processed_document, monkeypatch, copy_threshold, in_unit_of_work
+):
+    from adk.tools import db_tools
+    from adk.tools.tools_registry import get_adk_tools
+    from adk.tools.unit_of_work import unit_of_work
+
+    monkeypatch.setattr(db_tools, "VIOLATION_COPY_THRESHOLD", copy_threshold)
+    tools = get_adk_tools()
+    processed_id = processed_document([])
+    violations = _violations(25)
+
+    if in_unit_of_work:
+        with unit_of_work():
+            created = tools["create_violations_bulk"](processed_id, violations, **tenant)
+    else:
+        created = tools["create_violations_bulk"](processed_id, violations, **tenant)
+
+    assert len(created["ids"]) == len(violations)
+    with database.SessionLocal() as session:
+        rows = {
+            row.id: row
+            for row in session.query(Violation).filter(
+                Violation.processed_id == processed_id
+            )
+        }
+    for violation_id, violation in zip(created["ids"], violations):
+        row = rows[violation_id]
+        assert (row.rule, row.severity) == (violation["rule"], violation["severity"])
+        assert row.details == {"processed_id": processed_id, **violation["details"]}
+        assert row.retired_at is None
+
+    # The sequence moved past the copied ids, so plain inserts still work
+    monkeypatch.setattr(db_tools, "VIOLATION_COPY_THRESHOLD", 0)
+    (later,) = tools["create_violations_bulk"](
+        processed_id, _violations(1), **tenant
+    )["ids"]
+    assert later > max(created["ids"])